@@ -0,0 +1,67 @@
+"""
+Bytes on disk, save time and load time of the compression codecs.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/compression.py --contacts 100000 --notes 20000 --edits 5
+
+Every codec and level is measured under JsonStorage, and with --secure also under
+SecureJsonStorage (compressed before encrypting), on the synthetic contacts and on
+notes with `--edits` history entries each.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import timed
+
+LEVELS = {'zlib': (1, 6, 9), 'bz2': (1, 9), 'lzma': (0, 6)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, default=100_000)
+    parser.add_argument('--notes', type=int, default=20_000)
+    parser.add_argument('--edits', type=int, default=5, help="history entries per note")
+    parser.add_argument('--secure', action='store_true', help="also measure under SecureJsonStorage")
+    args = parser.parse_args()
+
+    if not os.getenv('SECRET_KEY'):
+        from cryptography.fernet import Fernet
+        os.environ['SECRET_KEY'] = Fernet.generate_key().decode()
+
+    import personal_assistant.services
+    from personal_assistant.services.storage.compressed_storage import CompressedStorage
+    from personal_assistant.services.storage.json_storage import JsonStorage
+    from personal_assistant.services.storage.secure_json_storage import SecureJsonStorage
+    from synthetic import contacts, notes
+
+    def strategies():
+        """Yield (description, strategy) pairs for every codec and level."""
+        wrappers = [('json', lambda inner: inner)]
+        if args.secure:
+            wrappers.append(('secure_json', SecureJsonStorage))
+        for name, wrap in wrappers:
+            yield f"{name} none", wrap(JsonStorage()) if name == 'json' else SecureJsonStorage()
+            for codec, levels in LEVELS.items():
+                for level in levels:
+                    yield f"{name} {codec}-{level}", wrap(CompressedStorage(JsonStorage(), codec, level))
+
+    datasets = [('contacts', lambda: contacts(args.contacts)), ('notes', lambda: notes(args.notes, edits=args.edits))]
+    print(f"{'dataset':>9} {'strategy':>20} {'size MB':>8} {'save s':>8} {'load s':>8}")
+    for dataset, build in datasets:
+        data = build()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, dataset)
+            for description, strategy in strategies():
+                _, save_time = timed(strategy.save, data, path)
+                loaded, load_time = timed(strategy.load, path)
+                assert len(loaded) == len(data)
+                del loaded
+                size_mb = os.path.getsize(path) / (1024 * 1024)
+                print(f"{dataset:>9} {description:>20} {size_mb:>8.2f} {save_time:>8.2f} {load_time:>8.2f}", flush=True)
+        del data
+
+if __name__ == '__main__':
+    main()
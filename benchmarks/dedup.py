@@ -0,0 +1,92 @@
+"""
+Deduplication ratio and bytes on disk of the content-addressed blob store.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/dedup.py --contacts 50000 --notes 20000 --edits 5 --templated 0.3
+
+The synthetic records are passed through Contact/Note so they have the shape the
+application writes today (delta-encoded note history). `--templated` is the share
+of notes whose text is one of a few templates. Every dataset is saved with and
+without the blob store (STORAGE_BLOBS) under JsonStorage and SecureJsonStorage.
+The dedup ratio is the length of all externalized texts over the length of the
+distinct ones.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATES = [
+    "Щотижнева нарада: перевірити бюджет, статус задач, ризики та план на наступний тиждень",
+    "Reminder: renew the subscription, check the invoice and forward the receipt to accounting",
+    "Дзвінок клієнту: уточнити терміни доставки, адресу та контактну особу для отримання",
+]
+
+def directory_size(path: str) -> int:
+    """Return the bytes of all files under the path."""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, default=50_000)
+    parser.add_argument('--notes', type=int, default=20_000)
+    parser.add_argument('--edits', type=int, default=5, help="history entries per note")
+    parser.add_argument('--templated', type=float, default=0.3, help="share of notes with a template text")
+    args = parser.parse_args()
+
+    if not os.getenv('SECRET_KEY'):
+        from cryptography.fernet import Fernet
+        os.environ['SECRET_KEY'] = Fernet.generate_key().decode()
+
+    import personal_assistant.services
+    from personal_assistant.models import Note
+    from personal_assistant.models.contact import Contact
+    from personal_assistant.services import StorageService, TagManagerService
+    from personal_assistant.services.storage.blob_store import BlobStore
+    from personal_assistant.services.storage.json_storage import JsonStorage
+    from personal_assistant.services.storage.secure_json_storage import SecureJsonStorage
+    from synthetic import iter_contacts, iter_notes
+
+    rng = random.Random(7)
+    tag_manager = TagManagerService()
+    contacts = {key: Contact.from_dict(value).to_dict() for key, value in iter_contacts(args.contacts)}
+    notes = {}
+    for key, value in iter_notes(args.notes, edits=0):
+        note = Note.from_dict(value, tag_manager)
+        if rng.random() < args.templated:
+            note.text = rng.choice(TEMPLATES)
+        for edit in range(args.edits):
+            note.update_text(f"{note.text} ({edit + 1})" if rng.random() < 0.5 else note.text + " ok")
+        notes[key] = note.to_dict()
+    datasets = {"contacts_data": contacts, "notes_data": notes}
+
+    probe = BlobStore(JsonStorage(), os.path.join(tempfile.gettempdir(), "dedup-probe-missing"), int(os.getenv('BLOB_MIN_SIZE', '64')))
+    references, logical, distinct = 0, 0, {}
+    for data in datasets.values():
+        for record in data.values():
+            for digest in BlobStore.references(probe.externalize(record)):
+                size = distinct.setdefault(digest, len(probe.get(digest).encode('utf-8')))
+                references += 1
+                logical += size
+    print(f"{references} text references, {len(distinct)} distinct blobs, "
+          f"dedup ratio {logical / max(sum(distinct.values()), 1):.2f}")
+
+    print(f"{'strategy':>12} {'inline MB':>10} {'blobs MB':>9} {'saved':>7}")
+    for name, create in (('json', JsonStorage), ('secure_json', SecureJsonStorage)):
+        sizes = []
+        for blobs in (False, True):
+            with tempfile.TemporaryDirectory() as directory:
+                storage_service = StorageService(create(), directory, blobs=blobs)
+                for path, data in datasets.items():
+                    storage_service.save_data(data, path)
+                sizes.append(directory_size(directory))
+        print(f"{name:>12} {sizes[0] / 2**20:>10.2f} {sizes[1] / 2**20:>9.2f} {1 - sizes[1] / sizes[0]:>7.1%}", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Peak memory of loading the address book: json.load of the whole file versus
+the streaming loader that hydrates contacts one record at a time.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/load_memory.py --contacts 500000
+
+Every mode runs in a fresh process, so ru_maxrss reflects only that load.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_child(mode: str, path: str) -> None:
+    """Load the file in the given mode and print: contacts, seconds, start RSS, peak RSS."""
+    from personal_assistant.services import AddressBook, StorageService
+    from personal_assistant.models.contact import Contact
+    from personal_assistant.services.storage.json_storage import JsonStorage
+
+    start_rss = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == 'json.load':
+        data = JsonStorage().load(path)
+        contacts = {contact_id: Contact.from_dict(contact_data) for contact_id, contact_data in data.items()}
+    else:
+        address_book = AddressBook(StorageService(JsonStorage(), os.path.dirname(path)))
+        address_book.load()
+        contacts = address_book.contacts
+    elapsed = time.perf_counter() - started
+    print(len(contacts), elapsed, start_rss, peak_rss_mb())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, default=500_000)
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    from synthetic import write_contacts_json
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'contacts_data')
+        write_contacts_json(path, args.contacts)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"{args.contacts} contacts, {size_mb:.1f} MB of JSON")
+        print(f"{'mode':<12}{'load, s':>10}{'peak RSS, MB':>15}{'load delta, MB':>17}")
+
+        for mode in ('json.load', 'streaming'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', mode, path],
+                check=True, capture_output=True, text=True, env=os.environ
+            ).stdout.split()
+            _, elapsed, start_rss, peak = (float(value) for value in output[-4:])
+            print(f"{mode:<12}{elapsed:>10.2f}{peak:>15.1f}{peak - start_rss:>17.1f}")
+
+if __name__ == '__main__':
+    main()
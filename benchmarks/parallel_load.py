@@ -0,0 +1,70 @@
+"""
+Startup time of the address book with the shards loaded by 1 to N workers.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/parallel_load.py --contacts 200000 --shards 32 --workers 1 2 4 8
+
+For every engine ("sharded", "segmented_secure") and executor ("process", "thread")
+the table shows the time of reading, decrypting and parsing the chunks (load) and
+of AddressBook.load() plus the creation of all Contact objects (startup); with one
+worker the contacts are created lazily, so they are all accessed after the load.
+Scaling is bounded by the number of CPU cores of the machine.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import timed
+
+def load_all(address_book) -> int:
+    """Load the address book and create all its contacts."""
+    address_book.load()
+    return len(list(address_book.contacts.values()))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, default=200_000)
+    parser.add_argument('--shards', type=int, default=32)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    if not os.getenv('SECRET_KEY'):
+        from cryptography.fernet import Fernet
+        os.environ['SECRET_KEY'] = Fernet.generate_key().decode()
+
+    import personal_assistant.services
+    from personal_assistant.services import AddressBook, StorageService
+    from personal_assistant.services.storage.secure_json_storage import SecureJsonStorage
+    from personal_assistant.services.storage.segmented_secure_storage import SegmentedSecureStorage
+    from personal_assistant.services.storage.sharded_storage import ShardedStorage
+    from synthetic import contacts
+
+    engines = {
+        'sharded': lambda: ShardedStorage(SecureJsonStorage(), args.shards),
+        'segmented_secure': lambda: SegmentedSecureStorage(args.shards),
+    }
+
+    print(f"{os.cpu_count()} CPU cores, {args.contacts} contacts in {args.shards} chunks")
+    print(f"{'engine':>17} {'executor':>9} {'workers':>8} {'load s':>8} {'startup s':>10}")
+    data = contacts(args.contacts)
+    with tempfile.TemporaryDirectory() as directory:
+        for engine, create in engines.items():
+            StorageService(create(), directory).save_data(data, "contacts_data")
+            for executor in ('process', 'thread'):
+                for workers in args.workers:
+                    storage_service = StorageService(create(), directory, load_workers=workers, load_executor=executor)
+                    loaded, load_time = timed(storage_service.load_data, "contacts_data")
+                    assert len(loaded) == args.contacts
+                    del loaded
+
+                    address_book = AddressBook(StorageService(create(), directory, load_workers=workers, load_executor=executor))
+                    count, startup_time = timed(load_all, address_book)
+                    assert count == args.contacts
+                    del address_book
+                    print(f"{engine:>17} {executor:>9} {workers:>8} {load_time:>8.2f} {startup_time:>10.2f}", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Save and load time of the address book in the JSON, pickle, encrypted JSON
+and binary snapshot formats.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/snapshot_formats.py --contacts 10000 100000 1000000
+
+Columns:
+- save: writing the dictionary built by AddressBook.save();
+- load: reading the file back into a dictionary;
+- hydrate: reading the file and creating the Contact objects, as AddressBook.load() does.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import timed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--no-hydrate', action='store_true', help="skip creating the Contact objects")
+    args = parser.parse_args()
+
+    if not os.getenv('SECRET_KEY'):
+        from cryptography.fernet import Fernet
+        os.environ['SECRET_KEY'] = Fernet.generate_key().decode()
+
+    import personal_assistant.services
+    from personal_assistant.models.contact import Contact
+    from personal_assistant.services.storage.binary_snapshot_storage import BinarySnapshotStorage
+    from personal_assistant.services.storage.json_storage import JsonStorage
+    from personal_assistant.services.storage.pickle_storage import PickleStorage
+    from personal_assistant.services.storage.secure_json_storage import SecureJsonStorage
+    from synthetic import contacts
+
+    strategies = [JsonStorage(), PickleStorage(), SecureJsonStorage(), BinarySnapshotStorage()]
+
+    def hydrate(strategy, path):
+        return {contact_id: Contact.from_dict(data) for contact_id, data in strategy.iter_load(path)}
+
+    print(f"{'contacts':>9} {'format':>22} {'size MB':>8} {'save s':>8} {'load s':>8} {'hydrate s':>10}")
+    for count in args.contacts:
+        data = contacts(count)
+        with tempfile.TemporaryDirectory() as directory:
+            for strategy in strategies:
+                path = os.path.join(directory, type(strategy).__name__)
+                _, save_time = timed(strategy.save, data, path)
+                loaded, load_time = timed(strategy.load, path)
+                assert len(loaded) == count
+                del loaded
+                hydrate_time = float('nan')
+                if not args.no_hydrate:
+                    hydrated, hydrate_time = timed(hydrate, strategy, path)
+                    del hydrated
+                size_mb = os.path.getsize(path) / (1024 * 1024)
+                print(f"{count:>9} {type(strategy).__name__:>22} {size_mb:>8.1f} "
+                      f"{save_time:>8.2f} {load_time:>8.2f} {hydrate_time:>10.2f}", flush=True)
+                os.remove(path)
+        del data
+
+if __name__ == '__main__':
+    main()
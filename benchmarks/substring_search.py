@@ -0,0 +1,97 @@
+"""
+Build time, memory and query time of the trigram and phone indexes behind AddressBook.find
+and of the trigram index behind Notebook.find_note_by_content, against a full scan with the
+same test. The notes also report the BM25 top 10 of Notebook.rank_notes_by_content.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/substring_search.py --contacts 1000000 --notes 200000
+
+Queries report the best of three runs. The memory of the index is the size of the Python allocations traced while it is built.
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import timed
+
+CONTACT_QUERIES = [
+    ('name', 'ван ш'),
+    ('name', 'шевч'),
+    ('phone', '(099) 12'),
+    ('phone_end', '45 67'),
+    ('phone_exact', '+38 (089) 538 99 73'),
+    ('email', 'user12345.'),
+    ('address', 'незалежності, 1'),
+    ('any', 'nobody-has-this'),
+]
+NOTE_QUERIES = ['budget', 'звіт проект', 'deadline subscription reminder', 'nobody-has-this']
+
+def build_index(owner) -> None:
+    """Build the indexes of the address book or the notebook and report their time and memory."""
+    for name in ('index', 'phone_index', 'ranked_index'):
+        if not hasattr(type(owner), name):
+            continue
+        index, elapsed = timed(getattr, owner, name)
+        # Tracing slows the build down, so the memory is measured on a second build
+        setattr(owner, '_' + name, None)
+        gc.collect()
+        tracemalloc.start()
+        getattr(owner, name)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.collect()
+        print(f"  {name} of {len(index)} records: {elapsed:.2f} s, {size / (1024 * 1024):.1f} MB")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, default=200_000)
+    parser.add_argument('--notes', type=int, default=50_000)
+    args = parser.parse_args()
+
+    import personal_assistant.services
+    from personal_assistant.models import Note
+    from personal_assistant.models.contact import Contact
+    from personal_assistant.services import AddressBook, Notebook, StorageService
+    from personal_assistant.services.storage.json_storage import JsonStorage
+    from personal_assistant.utils.normalization import normalize
+    from synthetic import iter_contacts, iter_notes
+
+    storage_service = StorageService(JsonStorage(), os.getcwd())
+
+    address_book = AddressBook(storage_service)
+    address_book.contacts = {key: Contact.from_dict(value) for key, value in iter_contacts(args.contacts)}
+    print(f"{args.contacts} contacts")
+    build_index(address_book)
+    print(f"  {'field':<13}{'query':<20}{'found':>8}{'index, ms':>12}{'scan, ms':>12}")
+    for field, query in CONTACT_QUERIES:
+        found, indexed = timed(address_book.find, query, field, repeat=3)
+        _, scanned = timed(lambda: [
+            contact for contact in address_book.contacts.values()
+            if address_book.matches(contact, query, field)
+        ].sort(key=lambda contact: (contact.name, contact.id)), repeat=3)
+        print(f"  {field:<13}{query:<20}{len(found):>8}{indexed * 1000:>12.1f}{scanned * 1000:>12.1f}")
+
+    notebook = Notebook(storage_service)
+    notebook.notes = {
+        key: Note(text=value['text'], tag_manager=notebook.tag_manager, note_id=key)
+        for key, value in iter_notes(args.notes, edits=0)
+    }
+    print(f"{args.notes} notes")
+    build_index(notebook)
+    print(f"  {'query':<32}{'found':>8}{'index, ms':>12}{'scan, ms':>12}{'top 10, ms':>12}")
+    for query in NOTE_QUERIES:
+        found, indexed = timed(notebook.find_note_by_content, query, repeat=3)
+        _, scanned = timed(
+            lambda: [note for note in notebook.notes.values() if normalize(query) in note.normalized_text], repeat=3
+        )
+        _, ranked = timed(notebook.rank_notes_by_content, query, 10, repeat=3)
+        print(
+            f"  {query:<32}{len(found):>8}{indexed * 1000:>12.1f}{scanned * 1000:>12.1f}{ranked * 1000:>12.1f}"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Synthetic contacts and notes for the storage benchmarks, and the timing helper they share.
+
+The records have the same shape as Contact.to_dict() and Note.to_dict()
+and pass the model validators, so they can be loaded by the application.
+"""
+import gc
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+FIRST_NAMES = ["Іван", "Петро", "Олена", "Марія", "Андрій", "Оксана", "Taras", "Sofia", "Dmytro", "Iryna"]
+LAST_NAMES = ["Шевченко", "Коваленко", "Бондаренко", "Ткаченко", "Kravchenko", "Melnyk", "Boyko", "Lysenko"]
+STREETS = ["Хрещатик", "Шевченка", "Franka", "Sadova", "Lesi Ukrainky", "Незалежності"]
+CITIES = ["Київ", "Львів", "Odesa", "Kharkiv", "Дніпро"]
+TAGS = ["work", "family", "friends", "urgent", "друзі", "робота", "побратими", "sport"]
+WORDS = (
+    "зустріч дзвінок звіт проект бюджет план нарада lorem ipsum dolor sit amet "
+    "meeting report budget review deadline subscription reminder задача покупки"
+).split()
+
+def timed(function: Callable[..., Any], *args, repeat: int = 1) -> Tuple[Any, float]:
+    """Return the result of the call and its best duration over the runs in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+def synthetic_note(index: int, rng: random.Random, edits: int = 2) -> dict:
+    """Return a note dictionary with a few history entries."""
+    created_at = datetime(2024, 1, 1) + timedelta(minutes=index)
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+    history = []
+    for edit in range(edits):
+        new_text = text + " " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+        history.append({
+            "previous_text": text,
+            "new_text": new_text,
+            "timestamp": (created_at + timedelta(hours=edit + 1)).isoformat()
+        })
+        text = new_text
+    return {
+        "note_id": f"n{index:07x}",
+        "text": text,
+        "created_at": created_at.isoformat(),
+        "updated_at": (created_at + timedelta(hours=edits)).isoformat(),
+        "tags": rng.sample(TAGS, rng.randint(0, 2)),
+        "is_archived": rng.random() < 0.1,
+        "note_history": history
+    }
+
+def synthetic_contact(index: int, rng: random.Random) -> dict:
+    """Return a contact dictionary with phones, emails, an address and, sometimes, a note."""
+    birthday = date(1950, 1, 1) + timedelta(days=rng.randint(0, 365 * 55))
+    return {
+        "id": f"{index:08x}",
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "birthday": birthday.strftime("%d.%m.%Y") if rng.random() < 0.8 else None,
+        "phone_numbers": [f"380{rng.randint(500000000, 999999999)}" for _ in range(rng.randint(1, 3))],
+        "emails": [f"user{index}.{n}@example.com" for n in range(rng.randint(0, 2))],
+        "addresses": [{
+            "street": rng.choice(STREETS),
+            "house_number": str(rng.randint(1, 200)),
+            "apartment_number": str(rng.randint(1, 300)),
+            "city": rng.choice(CITIES),
+            "state": None,
+            "postal_code": None,
+            "country": None
+        }],
+        "tags": rng.sample(TAGS, rng.randint(0, 3)),
+        "note": synthetic_note(index, rng, edits=0) if rng.random() < 0.2 else None
+    }
+
+def iter_contacts(count: int, seed: int = 42) -> Iterator[Tuple[str, dict]]:
+    """Yield (id, contact) pairs."""
+    rng = random.Random(seed)
+    for index in range(count):
+        contact = synthetic_contact(index, rng)
+        yield contact["id"], contact
+
+def iter_notes(count: int, seed: int = 42, edits: int = 2) -> Iterator[Tuple[str, dict]]:
+    """Yield (id, note) pairs."""
+    rng = random.Random(seed)
+    for index in range(count):
+        note = synthetic_note(index, rng, edits)
+        yield note["note_id"], note
+
+def contacts(count: int, seed: int = 42) -> Dict[str, dict]:
+    """Return a dictionary of synthetic contacts, as AddressBook.save() would build it."""
+    return dict(iter_contacts(count, seed))
+
+def notes(count: int, seed: int = 42, edits: int = 2) -> Dict[str, dict]:
+    """Return a dictionary of synthetic notes, as Notebook.save() would build it."""
+    return dict(iter_notes(count, seed, edits))
+
+def write_contacts_json(path: str, count: int, seed: int = 42) -> None:
+    """Write a contacts_data JSON file record by record, without building it in memory."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for position, (contact_id, contact) in enumerate(iter_contacts(count, seed)):
+            if position:
+                f.write(', ')
+            f.write(json.dumps(contact_id))
+            f.write(': ')
+            f.write(json.dumps(contact))
+        f.write('}')
@@ -0,0 +1,105 @@
+"""
+Memory of the tag index of TagManagerService, with the numbers of the notes in bitmaps,
+against the sets of their string ids it kept before, the time of AND/OR queries of two
+tags over both, and the time of the load of the saved index against its rebuild from
+the tags of every note. The bitmaps are combined alone, then with the ids of the result looked up.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/tag_index.py --notes 500000
+
+Queries report the best of three runs. The memory is the size of the Python allocations traced while the index is built.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import timed
+
+QUERIES = [('work', 'urgent'), ('друзі', 'sport'), ('робота', 'nobody-has-this')]
+
+def traced(function, *args):
+    """Return the result of the call and the size of its traced allocations in MB."""
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size / (1024 * 1024)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--notes', type=int, default=200_000)
+    args = parser.parse_args()
+
+    import personal_assistant.services
+    from personal_assistant.enums import EntityType
+    from personal_assistant.services import StorageService, TagManagerService
+    from personal_assistant.services.storage.json_storage import JsonStorage
+    from personal_assistant.utils.bitmap import Bitmap
+    from personal_assistant.utils.normalization import normalize
+    from synthetic import iter_notes
+
+    tagged = [(note_id, note['tags']) for note_id, note in iter_notes(args.notes, edits=0)]
+    associations = sum(len(tags) for _, tags in tagged)
+    print(f"{args.notes} notes, {associations} tag associations")
+
+    def build_sets():
+        sets = {}
+        for note_id, tags in tagged:
+            for tag in tags:
+                sets.setdefault(normalize(tag), set()).add(note_id)
+        return sets
+
+    def build_bitmaps():
+        tag_manager = TagManagerService()
+        for note_id, tags in tagged:
+            for tag in tags:
+                tag_manager.add_tag(tag, EntityType.NOTE, note_id)
+        return tag_manager
+
+    sets, sets_size = traced(build_sets)
+    tag_manager, bitmaps_size = traced(build_bitmaps)
+    bitmaps_only = sum(
+        len(tag.to_dict(EntityType.NOTE)['bitmap']) * 3 / 4 for tag in tag_manager.tags.values()
+    ) / (1024 * 1024)
+    print(f"  sets of ids: {sets_size:.1f} MB, {sets_size * 1024 * 1024 / associations:.0f} bytes per association")
+    print(
+        f"  bitmaps with the id map: {bitmaps_size:.1f} MB, "
+        f"bitmaps alone: {bitmaps_only:.2f} MB, {bitmaps_only * 8 * 1024 * 1024 / associations:.1f} bits per association"
+    )
+
+    print(f"  {'tags':<26}{'':<5}{'found':>8}{'sets, ms':>10}{'bitmaps, ms':>13}{'with ids, ms':>14}")
+    for first, second in QUERIES:
+        first_ids, second_ids = sets.get(normalize(first), set()), sets.get(normalize(second), set())
+        first_tag, second_tag = tag_manager.tags.get(normalize(first)), tag_manager.tags.get(normalize(second))
+        first_numbers = first_tag.associations[EntityType.NOTE] if first_tag else Bitmap()
+        second_numbers = second_tag.associations[EntityType.NOTE] if second_tag else Bitmap()
+        for operator, match_all in (('and', True), ('or', False)):
+            combine = (lambda a, b: a & b) if match_all else (lambda a, b: a | b)
+            found, with_sets = timed(combine, first_ids, second_ids, repeat=3)
+            _, with_bitmaps = timed(combine, first_numbers, second_numbers, repeat=3)
+            _, with_ids = timed(tag_manager.search_by_tags, (first, second), EntityType.NOTE, match_all, repeat=3)
+            print(
+                f"  {first + ' ' + second:<26}{operator:<5}{len(found):>8}"
+                f"{with_sets * 1000:>10.2f}{with_bitmaps * 1000:>13.2f}{with_ids * 1000:>14.2f}"
+            )
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage_service = StorageService(JsonStorage(), directory)
+        tag_manager.save(storage_service, EntityType.NOTE, "notes_tags_data")
+        tag_manager.clear(EntityType.NOTE)
+        _, loaded = timed(tag_manager.load, storage_service, EntityType.NOTE, "notes_tags_data")
+        tag_manager.clear(EntityType.NOTE)
+        _, rebuilt = timed(build_bitmaps)
+        print(
+            f"  load of the saved index: {loaded * 1000:.0f} ms, "
+            f"rebuild from the tags of the notes: {rebuilt * 1000:.0f} ms"
+        )
+
+if __name__ == '__main__':
+    main()
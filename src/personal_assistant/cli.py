@@ -11,7 +11,8 @@ from personal_assistant.utils.cli_setup import (
     setup_parsers,
     handle_command,
     clear_screen,
-    hello_screen
+    hello_screen,
+    flush_data
 )
 
 def main() -> None:
@@ -53,6 +54,9 @@ def main() -> None:
     except KeyboardInterrupt:
         clear_screen()  # Clear the screen before exiting wuth Ctrl+C
         print("Програму перервано користувачем")
+    finally:
+        # Write the changes the save policy has been holding back
+        flush_data()
 
 if __name__ == '__main__':
     main()
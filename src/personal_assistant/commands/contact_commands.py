@@ -8,8 +8,7 @@ from dotenv import load_dotenv
 
 from personal_assistant.models.contact import Contact
 from personal_assistant.models import PhoneNumber, Birthday, Note, EmailAddress, Address
-from personal_assistant.services import AddressBook, StorageService
-from personal_assistant.services.storage.secure_json_storage import SecureJsonStorage
+from personal_assistant.services import StorageContext
 from personal_assistant.utils.decorators import input_error
 
 load_dotenv()
@@ -56,8 +55,11 @@ def handle_contact_commands(parser: argparse.ArgumentParser) -> None:
 
     # Contact search
     search_parser = subparsers.add_parser(Command.SEARCH.value, help=HelpText.SEARCH.value)
-    search_parser.add_argument('--' + Argument.QUERY.value, required=True, help=HelpText.ARGUMENT_QUERY.value)
+    search_query = search_parser.add_mutually_exclusive_group(required=True)
+    search_query.add_argument('--' + Argument.QUERY.value, help=HelpText.ARGUMENT_QUERY.value)
+    search_query.add_argument('--' + Argument.WHERE.value, help=HelpText.ARGUMENT_WHERE.value)
     search_parser.add_argument('--' + Argument.BY.value, help=HelpText.ARGUMENT_BY.value)
+    search_parser.add_argument('--' + Argument.FUZZY.value, type=int, help=HelpText.ARGUMENT_FUZZY.value)
     search_parser.set_defaults(func=search_contacts)
 
     # Phone add
@@ -131,14 +133,8 @@ def handle_contact_commands(parser: argparse.ArgumentParser) -> None:
     aniversaries_parser.add_argument('--' + Argument.DAYS.value, help=HelpText.ARGUMENT_DAYS.value)
     aniversaries_parser.set_defaults(func=congratulations_date)
 
-storage_service = StorageService(SecureJsonStorage())
-address_book = AddressBook(storage_service)
-try:
-    address_book.load()
-except FileNotFoundError:
-    print(Messages.NO_ADDRESS_BOOK_FOUND.value)
-except Exception as e:
-    print(Messages.ERROR_LOADING_ADDRESS_BOOK.value.format(e))
+# The contacts are loaded from the shared storage when a command first needs them
+address_book = StorageContext().address_book
 
 def contact_list(args: argparse.Namespace) -> None:
     """
@@ -212,7 +208,13 @@ def search_contacts(args: argparse.Namespace) -> None:
     """
     Search for contacts in the address book
     """
-    results = address_book.find(getattr(args, Argument.QUERY.value), getattr(args, Argument.BY.value, 'any'))
+    max_distance = getattr(args, Argument.FUZZY.value, None)
+    if getattr(args, Argument.WHERE.value, None):
+        results = address_book.query(getattr(args, Argument.WHERE.value))
+    elif max_distance is not None:
+        results = address_book.find_fuzzy(getattr(args, Argument.QUERY.value), max_distance)
+    else:
+        results = address_book.find(getattr(args, Argument.QUERY.value), getattr(args, Argument.BY.value, 'any'))
     if results:
         address_book.print_contacts_table(results)
     else:
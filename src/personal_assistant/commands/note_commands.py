@@ -9,9 +9,7 @@ from tabulate import tabulate
 from colorama import Fore, Style
 from personal_assistant.enums.military_command_types import Command, Argument, HelpText, Messages
 from personal_assistant.models.note import Note
-from personal_assistant.services.notebook import Notebook
-from personal_assistant.services.storage.secure_json_storage import SecureJsonStorage
-from personal_assistant.services.storage_service import StorageService
+from personal_assistant.services import StorageContext
 from personal_assistant.utils.decorators import input_error
 
 load_dotenv()
@@ -49,8 +47,13 @@ def handle_note_commands(parser: argparse.ArgumentParser) -> None:
     # Search notes
     search_parser = subparsers.add_parser(Command.SEARCH.value, help=HelpText.SEARCH_NOTE.value)
     search_parser.add_argument('--' + Argument.CONTENT.value, help=HelpText.ARGUMENT_SEARCH_CONTENT.value, nargs='+')
-    search_parser.add_argument('--' + Argument.TAG.value, help=HelpText.ARGUMENT_SEARCH_TAG.value)
+    search_parser.add_argument('--' + Argument.TAG.value, help=HelpText.ARGUMENT_SEARCH_TAG.value, nargs='+')
     search_parser.add_argument('--' + Argument.ID.value, help=HelpText.ARGUMENT_ID.value)
+    search_parser.add_argument('--' + Argument.TOP.value, type=int, help=HelpText.ARGUMENT_TOP.value)
+    search_parser.add_argument('--' + Argument.WHERE.value, help=HelpText.ARGUMENT_WHERE_NOTES.value)
+    search_parser.add_argument(
+        '--' + Argument.INCLUDE_ARCHIVED.value, action='store_true', help=HelpText.ARGUMENT_INCLUDE_ARCHIVED.value
+    )
     search_parser.set_defaults(func=search_notes)
 
     # Add tag to note
@@ -88,16 +91,8 @@ def handle_note_commands(parser: argparse.ArgumentParser) -> None:
     view_history_parser.add_argument('--' + Argument.ID.value, required=True, help=HelpText.ARGUMENT_ID.value)
     view_history_parser.set_defaults(func=view_note_history)
 
-storage_service = StorageService(SecureJsonStorage())
-notebook = Notebook(storage_service)
-
-try:
-    print(Messages.LOADING_NOTEBOOK.value)
-    notebook.load()
-except FileNotFoundError:
-    print(Messages.NO_NOTEBOOK_FOUND.value)
-except Exception as e:
-    print(Messages.ERROR_LOADING_NOTEBOOK.value.format(e))
+# The notes are loaded from the shared storage when a command first needs them
+notebook = StorageContext().notebook
 
 @input_error
 def add_note(args: argparse.Namespace) -> None:
@@ -125,17 +120,27 @@ def delete_note(args: argparse.Namespace) -> None:
 
 @input_error
 def search_notes(args: argparse.Namespace) -> None:
-    """Search notes by content or tag or ID"""
+    """Search notes by a query, content, tag or ID"""
     content = ' '.join(getattr(args, Argument.CONTENT.value)) if getattr(args, Argument.CONTENT.value) else None
-    tag = getattr(args, Argument.TAG.value) if getattr(args, Argument.TAG.value) else None
+    tags = getattr(args, Argument.TAG.value) or None
+    tag = ', '.join(tags) if tags else None
     note_id = getattr(args, Argument.ID.value) if getattr(args, Argument.ID.value) else None
     print(Messages.SEARCHING_NOTES.value.format(content, tag, note_id))
     
     notes = []
-    if content:
+    scores = None
+    if getattr(args, Argument.WHERE.value, None):
+        notes = notebook.query(getattr(args, Argument.WHERE.value))
+    elif content and getattr(args, Argument.TOP.value, None):
+        ranked = notebook.rank_notes_by_content(
+            content, getattr(args, Argument.TOP.value), getattr(args, Argument.INCLUDE_ARCHIVED.value, False)
+        )
+        notes = [note for note, _ in ranked]
+        scores = [score for _, score in ranked]
+    elif content:
         notes = notebook.find_note_by_content(content)
-    elif tag:
-        notes = notebook.find_notes_by_tag(tag)
+    elif tags:
+        notes = notebook.find_notes_by_tags(tags)
     elif note_id:
         note = notebook.find_note_by_id(note_id)
         notes = [note] if note else []
@@ -151,6 +156,9 @@ def search_notes(args: argparse.Namespace) -> None:
             f"{Fore.YELLOW}Tags{Style.RESET_ALL}", 
             f"{Fore.RED}Archived{Style.RESET_ALL}"
         ]
+        if scores is not None:
+            table = [row + [f"{score:.2f}"] for row, score in zip(table, scores)]
+            headers.append(f"{Fore.GREEN}Score{Style.RESET_ALL}")
         print(tabulate(table, headers=headers, tablefmt="grid"))
     else:
         print(Messages.NO_NOTES_FOUND.value)
@@ -159,36 +167,32 @@ def search_notes(args: argparse.Namespace) -> None:
 def add_tag_to_note(args: argparse.Namespace) -> None:
     """Add a tag to a note by ID"""
     print(Messages.ADDING_TAG.value.format(getattr(args, Argument.TAG.value), getattr(args, Argument.ID.value)))
-    note = notebook.find_note_by_id(getattr(args, Argument.ID.value))
+    note = notebook.add_tag_to_note(getattr(args, Argument.ID.value), getattr(args, Argument.TAG.value))
     if note:
-        note.add_tag(getattr(args, Argument.TAG.value))
         print(Messages.TAG_ADDED_TO_NOTE.value.format(getattr(args, Argument.TAG.value), getattr(args, Argument.ID.value)))
     notebook.save()
 
 @input_error
 def delete_tag_from_note(args: argparse.Namespace) -> None:
     print(Messages.DELETING_TAG.value.format(getattr(args, Argument.TAG.value), getattr(args, Argument.ID.value)))
-    note = notebook.find_note_by_id(getattr(args, Argument.ID.value))
+    note = notebook.remove_tag_from_note(getattr(args, Argument.ID.value), getattr(args, Argument.TAG.value))
     if note:
-        note.remove_tag(getattr(args, Argument.TAG.value))
         print(Messages.TAG_DELETED_FROM_NOTE.value.format(getattr(args, Argument.TAG.value), getattr(args, Argument.ID.value)))
     notebook.save()
 
 @input_error
 def archive_note(args: argparse.Namespace) -> None:
     """Archive a note by ID"""
-    note = notebook.find_note_by_id(getattr(args, Argument.ID.value))
+    note = notebook.archive_note(getattr(args, Argument.ID.value))
     if note:
-        note.archive()
         print(Messages.NOTE_ARCHIVED.value.format(getattr(args, Argument.ID.value)))
     notebook.save()
 
 @input_error
 def restore_note(args: argparse.Namespace) -> None:
     """Restore a note by ID"""
-    note = notebook.find_note_by_id(getattr(args, Argument.ID.value))
+    note = notebook.restore_note(getattr(args, Argument.ID.value))
     if note:
-        note.restore()
         print(Messages.NOTE_RESTORED.value.format(getattr(args, Argument.ID.value)))
     notebook.save()
 
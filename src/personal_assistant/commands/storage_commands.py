@@ -0,0 +1,57 @@
+"""
+Module for storage maintenance commands
+"""
+import argparse
+import importlib
+import os
+from dotenv import load_dotenv
+
+from personal_assistant.services import StorageContext
+from personal_assistant.utils.decorators import input_error
+
+load_dotenv()
+commands_parser = os.getenv('COMMANDS_PARSER', 'command_types')
+module_path = f'personal_assistant.enums.{commands_parser}'
+command_module = importlib.import_module(module_path)
+
+Command = command_module.Command
+Argument = command_module.Argument
+HelpText = command_module.HelpText
+Messages = command_module.Messages
+
+def handle_storage_commands(parser: argparse.ArgumentParser) -> None:
+    """
+    Add subparsers for storage commands
+    """
+    subparsers = parser.add_subparsers(dest='storage_command', help=HelpText.STORAGE_COMMANDS.value)
+
+    # Reshard the stored data
+    reshard_parser = subparsers.add_parser(Command.RESHARD.value, help=HelpText.RESHARD.value)
+    reshard_parser.add_argument('--' + Argument.SHARDS.value, required=True, type=int, help=HelpText.ARGUMENT_SHARDS.value)
+    reshard_parser.set_defaults(func=reshard)
+
+    # Remove the unreferenced blobs
+    collect_garbage_parser = subparsers.add_parser(Command.COLLECT_GARBAGE.value, help=HelpText.COLLECT_GARBAGE.value)
+    collect_garbage_parser.set_defaults(func=collect_garbage)
+
+@input_error
+def reshard(args: argparse.Namespace) -> None:
+    """
+    Repartition the stored contacts and notes into the given number of shards
+    """
+    shards = getattr(args, Argument.SHARDS.value)
+    context = StorageContext()
+    if not context.storage_service.supports_resharding:
+        print(Messages.RESHARD_NOT_SUPPORTED.value.format(type(context.storage_service.strategy).__name__))
+        return
+
+    context.address_book.reshard(shards)
+    context.notebook.reshard(shards)
+    print(Messages.DATA_RESHARDED.value.format(shards))
+
+@input_error
+def collect_garbage(args: argparse.Namespace) -> None:
+    """
+    Remove the stored texts that are not referenced by any contact or note
+    """
+    print(Messages.BLOBS_COLLECTED.value.format(StorageContext().collect_garbage()))
@@ -27,6 +27,8 @@ class Command(Enum):
     VIEW_ACTIVE = "view_active"
     VIEW_ARCHIVED = "view_archived"
     VIEW_HISTORY = "view_history"
+    RESHARD = "reshard"
+    COLLECT_GARBAGE = "gc"
 
 class Argument(Enum):
     """
@@ -46,6 +48,11 @@ class Argument(Enum):
     CONTENT = "content"
     SEARCH_CONTENT = "search_content"
     SEARCH_TAG = "search_tag"
+    SHARDS = "shards"
+    TOP = "top"
+    INCLUDE_ARCHIVED = "archived"
+    FUZZY = "fuzzy"
+    WHERE = "where"
 
 class HelpText(Enum):
     """
@@ -74,7 +81,9 @@ class HelpText(Enum):
     ARGUMENT_BIRTHDAY = 'Дата народження'
     ARGUMENT_NOTE = 'Примітка'
     ARGUMENT_QUERY = 'Фраза для пошуку'
-    ARGUMENT_BY = 'Поле для пошуку (name, email, phone, address, tag, birthday, any)'
+    ARGUMENT_BY = 'Поле для пошуку (name, email, phone, phone_end, phone_exact, address, city, tag, birthday, id, any)'
+    ARGUMENT_FUZZY = 'Пошук за ім\'ям з допустимою кількістю помилок N (кирилицею чи латиницею)'
+    ARGUMENT_WHERE = 'Запит з умовами поле:значення, AND, OR, NOT і дужками, напр. name:іван AND tag:робота AND NOT city:київ'
     ARGUMENT_PHONE = 'Телефонний номер'
     ARGUMENT_EMAIL = 'Електронна адреса'
     ARGUMENT_ADDRESS = 'Адреса'
@@ -82,7 +91,10 @@ class HelpText(Enum):
     ARGUMENT_DAYS = 'Період в днях (7 за замовчуванням)'
     ARGUMENT_CONTENT = 'Зміст нотатки'
     ARGUMENT_SEARCH_CONTENT = 'Текст для пошуку в нотатках'
-    ARGUMENT_SEARCH_TAG = 'Тег для фільтрації нотаток'
+    ARGUMENT_SEARCH_TAG = 'Теги для фільтрації нотаток (нотатки з усіма тегами)'
+    ARGUMENT_TOP = 'Показати N найрелевантніших нотаток за текстом (BM25)'
+    ARGUMENT_INCLUDE_ARCHIVED = 'Включити заархівовані нотатки в ранжований пошук'
+    ARGUMENT_WHERE_NOTES = 'Запит з умовами поле:значення (content, tag, id), AND, OR, NOT і дужками, напр. tag:терміново OR content:"звіт"'
 
     ADD_NOTE = 'Додати нотатку'
     EDIT_NOTE = 'Редагувати нотатку'
@@ -96,6 +108,11 @@ class HelpText(Enum):
     VIEW_ARCHIVED_NOTES = 'Показати всі заархівовані нотатки'
     VIEW_HISTORY_NOTE = 'Переглянути історію нотатки'
 
+    STORAGE_COMMANDS = 'Команди для обслуговування сховища даних'
+    RESHARD = 'Перерозподілити дані між вказаною кількістю файлів'
+    COLLECT_GARBAGE = 'Видалити тексти (блоби), на які більше не посилаються контакти чи нотатки'
+    ARGUMENT_SHARDS = 'Кількість файлів (шардів) для контактів і нотаток'
+
 class Messages(Enum):
     """
     Enum for messages
@@ -139,6 +156,10 @@ class Messages(Enum):
     LOADING_NOTEBOOK = "Loading notebook..."
     NO_NOTEBOOK_FOUND = "No notebook found. Creating a new one."
     ERROR_LOADING_NOTEBOOK = "An error occurred while loading the notebook: {0}"
+    DATA_SAVED = "Збережено записів: контактів {0}, нотаток {1}"
+    DATA_RESHARDED = "Дані перерозподілено між {0} шардами"
+    RESHARD_NOT_SUPPORTED = "Формат збереження {0} не підтримує перерозподіл даних"
+    BLOBS_COLLECTED = "Видалено невикористаних блобів: {0}"
 
 class Entity(Enum):
     """
@@ -146,3 +167,4 @@ class Entity(Enum):
     """
     CONTACT = "contacts"
     NOTE = "notes"
+    STORAGE = "storage"
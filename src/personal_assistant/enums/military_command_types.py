@@ -26,6 +26,8 @@ class Command(Enum):
     VIEW_ACTIVE = "інфа"
     VIEW_ARCHIVED = "схованка"
     VIEW_HISTORY = "зміни"
+    RESHARD = "перерозподіл"
+    COLLECT_GARBAGE = "прибрати"
 
 class Argument(Enum):
     """
@@ -45,6 +47,11 @@ class Argument(Enum):
     CONTENT = "текст"
     SEARCH_CONTENT = "текст"
     SEARCH_TAG = "патч"
+    SHARDS = "частини"
+    TOP = "топ"
+    INCLUDE_ARCHIVED = "архів"
+    FUZZY = "приблизно"
+    WHERE = "умова"
 
 class HelpText(Enum):
     """
@@ -73,7 +80,9 @@ class HelpText(Enum):
     ARGUMENT_BIRTHDAY = 'Дата народження'
     ARGUMENT_NOTE = 'Примітка'
     ARGUMENT_QUERY = 'Фраза для пошуку'
-    ARGUMENT_BY = 'Поле для пошуку (name, email, phone, address, tag, birthday, any)'
+    ARGUMENT_BY = 'Поле для пошуку (name, email, phone, phone_end, phone_exact, address, city, tag, birthday, id, any)'
+    ARGUMENT_FUZZY = 'Розвідка за позивним з допустимою кількістю помилок N (кирилицею чи латиницею)'
+    ARGUMENT_WHERE = 'Запит з умовами поле:значення, AND, OR, NOT і дужками, напр. name:іван AND tag:робота AND NOT city:київ'
     ARGUMENT_PHONE = 'Телефонний номер'
     ARGUMENT_EMAIL = 'Електронна адреса'
     ARGUMENT_ADDRESS = 'Адреса'
@@ -81,7 +90,10 @@ class HelpText(Enum):
     ARGUMENT_DAYS = 'Період в днях (7 за замовчуванням)'
     ARGUMENT_CONTENT = 'Зміст нотатки'
     ARGUMENT_SEARCH_CONTENT = 'Текст для пошуку в нотатках'
-    ARGUMENT_SEARCH_TAG = 'Патч для фільтрації нотаток'
+    ARGUMENT_SEARCH_TAG = 'Патчі для фільтрації нотаток (нотатки з усіма патчами)'
+    ARGUMENT_TOP = 'Показати N найрелевантніших нотаток за текстом (BM25)'
+    ARGUMENT_INCLUDE_ARCHIVED = 'Включити заархівовані нотатки в ранжовану розвідку'
+    ARGUMENT_WHERE_NOTES = 'Запит з умовами поле:значення (content, tag, id), AND, OR, NOT і дужками, напр. tag:терміново OR content:"звіт"'
 
     ADD_NOTE = 'Додати нотатку'
     EDIT_NOTE = 'Редагувати нотатку'
@@ -95,6 +107,11 @@ class HelpText(Enum):
     VIEW_ARCHIVED_NOTES = 'Показати всі заархівовані нотатки'
     VIEW_HISTORY_NOTE = 'Переглянути історію нотатки'
 
+    STORAGE_COMMANDS = 'Команди для обслуговування складу даних'
+    RESHARD = 'Перерозподілити дані між вказаною кількістю файлів'
+    COLLECT_GARBAGE = 'Видалити тексти (блоби), на які більше не посилаються побратими чи нотатки'
+    ARGUMENT_SHARDS = 'Кількість файлів (частин) для побратимів і нотаток'
+
 class Messages(Enum):
     """
     Enum for messages
@@ -138,6 +155,10 @@ class Messages(Enum):
     LOADING_NOTEBOOK = "Loading notebook..."
     NO_NOTEBOOK_FOUND = "No notebook found. Creating a new one."
     ERROR_LOADING_NOTEBOOK = "An error occurred while loading the notebook: {0}"
+    DATA_SAVED = "Збережено записів: побратимів {0}, нотаток {1}"
+    DATA_RESHARDED = "Дані перерозподілено між {0} частинами"
+    RESHARD_NOT_SUPPORTED = "Формат збереження {0} не підтримує перерозподіл даних"
+    BLOBS_COLLECTED = "Прибрано невикористаних блобів: {0}"
 
 class Entity(Enum):
     """
@@ -145,3 +166,4 @@ class Entity(Enum):
     """
     CONTACT = "побратими"
     NOTE = "нотатки"
+    STORAGE = "склад"
@@ -2,6 +2,7 @@
 A package that contains the models used in the personal assistant application.
 """
 from personal_assistant.models.note import Note
+from personal_assistant.models.note_history import NoteHistory
 from personal_assistant.models.note_history_entry import NoteHistoryEntry
 from personal_assistant.models.tag import Tag
 from personal_assistant.models.email_address import EmailAddress
@@ -11,6 +12,7 @@ from personal_assistant.models.phone_number import PhoneNumber
 
 __all__ = [ 
     "Note", 
+    "NoteHistory",
     "NoteHistoryEntry",
     "Tag",
     "EmailAddress",
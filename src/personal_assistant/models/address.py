@@ -87,10 +87,22 @@ class Address:
         }
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, trusted: bool = False):
         """
-        Create a new Address object from a dictionary
+        Create a new Address object from a dictionary.
+        Trusted data, read from verified storage, is assigned field by field without parsing and validation.
         """
+        if trusted:
+            address = cls.__new__(cls)
+            address.street = data["street"]
+            address.house_number = data["house_number"]
+            address.apartment_number = data["apartment_number"]
+            address.city = data["city"]
+            address.state = data["state"]
+            address.postal_code = data["postal_code"]
+            address.country = data["country"]
+            return address
+
         parts = [
             data["street"],
             data["house_number"],
@@ -39,17 +39,23 @@ class Birthday:
         if today is None:
             today = date.today()
 
-        year = today.year if today <= date(today.year, self.date.month, self.date.day) else today.year + 1
+        next_birthday = self.date_in_year(self.date.month, self.date.day, today.year)
+        if next_birthday < today:
+            next_birthday = self.date_in_year(self.date.month, self.date.day, today.year + 1)
 
+        return next_birthday
+
+    @staticmethod
+    def date_in_year(month: int, day: int, year: int) -> date:
+        """
+        Return the birthday with the given month and day in the year.
+        """
         try:
-            next_birthday = date(year, self.date.month, self.date.day)
+            return date(year, month, day)
         except ValueError:  # 29 лютого у не-високосний рік
-            if self.date.month == 2 and self.date.day == 29:
-                next_birthday = date(year, 3, 1)  # Переносимо на 1 березня
-            else:
-                raise
-
-        return next_birthday
+            if month == 2 and day == 29:
+                return date(year, 3, 1)  # Переносимо на 1 березня
+            raise
 
     def get_age(self, today=None):
         """
@@ -69,10 +75,16 @@ class Birthday:
         return self.date.strftime("%d.%m.%Y")
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, trusted: bool = False):
         """
-        Create a new Birthday object from a dictionary
+        Create a new Birthday object from a dictionary.
+        Trusted data, read from verified storage, is not validated again
+        and its "DD.MM.YYYY" string is split instead of parsed with strptime.
         """
+        if trusted:
+            birthday = cls.__new__(cls)
+            birthday.date = data if isinstance(data, date) else date(int(data[6:]), int(data[3:5]), int(data[:2]))
+            return birthday
         return cls(date_input=data)
 
     def __str__(self):
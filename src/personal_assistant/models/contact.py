@@ -6,11 +6,12 @@ to check upcoming birthdays and to manage tags associated with the contact.
 """
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 from personal_assistant.models import EmailAddress, Address, Birthday, Note, PhoneNumber
 from personal_assistant.services import TagManagerService
 from personal_assistant.enums import EntityType
 from personal_assistant.utils.helpers import to_comma_separated_string
+from personal_assistant.utils.normalization import normalize
 
 class Contact:
     """
@@ -22,9 +23,15 @@ class Contact:
             birthday: Optional[Birthday] = None,
             note: Optional[Note] = None,
             tags: Optional[List[str]] = None,
-            contact_id: Optional[str] = None
+            contact_id: Optional[str] = None,
+            register_tags: bool = True
         ) -> None:
         self.tag_manager: TagManagerService = TagManagerService()
+        # New contacts are dirty until they are saved
+        self.is_dirty: bool = True
+        self._change_listener: Optional[Callable[['Contact'], None]] = None
+        # The normalized texts of the searchable fields, computed on first use after every change
+        self._search_keys: Optional[Dict[str, List[str]]] = None
         self.id: str = contact_id or str(uuid.uuid4())[:8]
         self.name: str = name
         self.birthday: Birthday = birthday or None
@@ -34,7 +41,10 @@ class Contact:
         self.note: Note = note or None
         self.tags: List[str] = []
 
-        if tags is not None:
+        if tags is not None and not register_tags:
+            # The tags of a loaded contact are already in the tag index if it is loaded from the storage
+            self.tags = list(tags)
+        elif tags is not None:
             for tag in tags:
                 self.add_tag(tag)
 
@@ -48,6 +58,49 @@ class Contact:
             f"{to_comma_separated_string(self.tags):10}"
         )
 
+    def __reduce__(self):
+        # Pickled as its dictionary, without the change listener and the tag manager singleton
+        return Contact.from_dict, (self.to_dict(), True), {"is_dirty": self.is_dirty}
+
+    def mark_dirty(self) -> None:
+        """
+        Mark the contact as changed since the last save and notify the listener
+        """
+        self.is_dirty = True
+        self._search_keys = None
+        if self._change_listener:
+            self._change_listener(self)
+
+    @property
+    def search_keys(self) -> Dict[str, List[str]]:
+        """
+        The normalized texts of the searchable fields of the contact, as search compares them.
+        Phone numbers are compared by their digits.
+        """
+        if self._search_keys is None:
+            self._search_keys = {
+                'name': [normalize(self.name)],
+                'email': [normalize(str(email)) for email in self.emails],
+                'address': [normalize(str(address)) for address in self.addresses],
+                'city': [normalize(address.city) for address in self.addresses if address.city],
+                'note': [normalize(str(self.note))] if self.note else [],
+                'tag': [normalize(tag) for tag in self.tags],
+                'birthdate': [str(self.birthday)] if self.birthday else [],
+            }
+        return self._search_keys
+
+    def mark_clean(self) -> None:
+        """
+        Mark the contact as saved
+        """
+        self.is_dirty = False
+
+    def set_change_listener(self, listener: Optional[Callable[['Contact'], None]]) -> None:
+        """
+        Set the callback that is called with the contact every time it changes
+        """
+        self._change_listener = listener
+
     def formatted_birthday(self, no_date: str = "No Birthday") -> str:
         """
         Return the formatted birthday of the contact
@@ -67,15 +120,16 @@ class Contact:
         next_birthday = self.birthday.get_next_birthday(today)
         return next_birthday <= today + timedelta(days=days)
 
-    def congratulations_date(self) -> Optional[datetime.date]:
+    def congratulations_date(self, next_birthday: Optional[datetime.date] = None) -> Optional[datetime.date]:
         """
-        Return the date when the contact's birthday is celebrated
+        Return the date when the contact's birthday is celebrated.
+        The next birthday is computed unless it is given.
         """
         if not self.birthday:
             return None
 
-        today = datetime.now().date()
-        next_birthday = self.birthday.get_next_birthday(today)
+        if next_birthday is None:
+            next_birthday = self.birthday.get_next_birthday(datetime.now().date())
         if next_birthday.weekday() in (5, 6):  # 5 is Saturday, 6 is Sunday
             next_birthday += timedelta(days=7 - next_birthday.weekday())
         return next_birthday
@@ -85,18 +139,21 @@ class Contact:
         Add phone number to the contact
         """
         self.phone_numbers.append(phone)
+        self.mark_dirty()
 
     def add_email(self, email: EmailAddress) -> None:
         """
         Add email address to the contact
         """
         self.emails.append(email)
+        self.mark_dirty()
 
     def add_address(self, address: Address) -> None:
         """
         Add address to the contact
         """
         self.addresses.append(address)
+        self.mark_dirty()
 
     def add_tag(self, tag_name: str) -> None:
         """
@@ -105,18 +162,21 @@ class Contact:
         if tag_name not in self.tags:
             self.tags.append(tag_name)
             self.tag_manager.add_tag(tag_name, EntityType.CONTACT, self.id)
+            self.mark_dirty()
 
     def set_name(self, name: str) -> None:
         """
         Edit the name of the contact
         """
         self.name = name
+        self.mark_dirty()
 
     def set_birthday(self, birthday: Birthday) -> None:
         """
         Edit the birthday of the contact
         """
         self.birthday = birthday
+        self.mark_dirty()
 
     def edit_phone(self, old_phone: PhoneNumber, new_phone: PhoneNumber) -> None:
         """
@@ -126,6 +186,7 @@ class Contact:
             phone for phone in self.phone_numbers if phone != old_phone
         ]
         self.phone_numbers.append(new_phone)
+        self.mark_dirty()
 
     def edit_email(self, old_email: EmailAddress, new_email: EmailAddress) -> None:
         """
@@ -133,6 +194,7 @@ class Contact:
         """
         self.emails = [email for email in self.emails if email != old_email]
         self.emails.append(new_email)
+        self.mark_dirty()
 
     def edit_address(self, old_address: Address, new_address: Address) -> None:
         """
@@ -142,30 +204,41 @@ class Contact:
             address for address in self.addresses if address != old_address
         ]
         self.addresses.append(new_address)
+        self.mark_dirty()
 
     def set_note(self, note: Note) -> None:
         """
         Edit the note of the contact
         """
         self.note = note
+        self.mark_dirty()
 
     def remove_phone(self, phone: PhoneNumber):
         """
         Remove the phone number of the contact
         """
-        self.phone_numbers = [p for p in self.phone_numbers if p != phone]
+        phone_numbers = [p for p in self.phone_numbers if p != phone]
+        if len(phone_numbers) != len(self.phone_numbers):
+            self.phone_numbers = phone_numbers
+            self.mark_dirty()
 
     def remove_email(self, email: EmailAddress):
         """
         Remove the email address of the contact
         """
-        self.emails = [e for e in self.emails if e != email]
+        emails = [e for e in self.emails if e != email]
+        if len(emails) != len(self.emails):
+            self.emails = emails
+            self.mark_dirty()
 
     def remove_address(self, address: Address):
         """
         Remove the address of the contact
         """
-        self.addresses = [a for a in self.addresses if a != address]
+        addresses = [a for a in self.addresses if a != address]
+        if len(addresses) != len(self.addresses):
+            self.addresses = addresses
+            self.mark_dirty()
 
     def remove_tag(self, tag_name):
         """
@@ -173,7 +246,9 @@ class Contact:
         """
         tag_manager = TagManagerService()
         tag_manager.remove_tag(tag_name, EntityType.CONTACT, self.id)
-        self.tags = [tag for tag in self.tags if tag != tag_name]
+        if tag_name in self.tags:
+            self.tags = [tag for tag in self.tags if tag != tag_name]
+            self.mark_dirty()
 
     def to_dict(self, stringify: bool = False):
         """
@@ -186,20 +261,23 @@ class Contact:
             "phone_numbers": [phone.to_dict() for phone in self.phone_numbers],
             "emails": [email.to_dict() for email in self.emails],
             "addresses": [address.to_dict() if not stringify else address.to_dict(stringify) for address in self.addresses],
-            "tags": self.tags,
+            "tags": list(self.tags),
             "note": self.note.to_dict(stringify) if self.note else None
         }
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, trusted: bool = False, register_tags: bool = True):
         """
-        Create a Contact object from a dictionary
+        Create a Contact object from a dictionary.
+        Trusted data, read from verified storage, skips the validation of the fields.
+        The tags are registered with the tag manager unless its index is loaded from the storage.
         """
         tag_manager = TagManagerService()
-        obj = cls(name=data["name"], contact_id=data["id"], tags=data.get("tags"))
-        obj.note = Note.from_dict(data["note"], tag_manager) if data["note"] else None
-        obj.birthday = Birthday.from_dict(data["birthday"]) if data["birthday"] else None
-        obj.phone_numbers = [PhoneNumber.from_dict(phone) for phone in data["phone_numbers"]]
-        obj.emails = [EmailAddress.from_dict(email) for email in data["emails"]]
-        obj.addresses = [Address.from_dict(address) for address in data["addresses"]]
+        obj = cls(name=data["name"], contact_id=data["id"], tags=data.get("tags"), register_tags=register_tags)
+        obj.note = Note.from_dict(data["note"], tag_manager, register_tags) if data["note"] else None
+        obj.birthday = Birthday.from_dict(data["birthday"], trusted) if data["birthday"] else None
+        obj.phone_numbers = [PhoneNumber.from_dict(phone, trusted) for phone in data["phone_numbers"]]
+        obj.emails = [EmailAddress.from_dict(email, trusted) for email in data["emails"]]
+        obj.addresses = [Address.from_dict(address, trusted) for address in data["addresses"]]
+        obj.mark_clean()
         return obj
@@ -27,10 +27,15 @@ class EmailAddress:
         return self.email
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, trusted: bool = False):
         """
-        Create a new EmailAddress object from a dictionary
+        Create a new EmailAddress object from a dictionary.
+        Trusted data, read from verified storage, is not validated again.
         """
+        if trusted:
+            email = cls.__new__(cls)
+            email.email = data
+            return email
         return cls(email=data)
 
     def __eq__(self, other):
@@ -4,39 +4,96 @@ A module for the Note class
 import uuid
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 
 from personal_assistant.enums import EntityType
+from personal_assistant.models.note_history import NoteHistory
 from personal_assistant.models.note_history_entry import NoteHistoryEntry
+from personal_assistant.utils.helpers import to_datetime
+from personal_assistant.utils.normalization import normalize, stemmed_words
 
 class Note:
     """
     A class to represent a note
     """
-    def __init__(self, text: str, tag_manager, tags: Optional[List[str]] = None, note_id: Optional[str] = None, default_tags: Optional[List[str]] = None) -> None:
+    def __init__(
+            self,
+            text: str,
+            tag_manager,
+            tags: Optional[List[str]] = None,
+            note_id: Optional[str] = None,
+            default_tags: Optional[List[str]] = None,
+            register_tags: bool = True
+        ) -> None:
         self.note_id: str = note_id or str(uuid.uuid4())[:8]
+        # New notes are dirty until they are saved
+        self.is_dirty: bool = True
+        self._change_listener: Optional[Callable[['Note'], None]] = None
         self.text: str = text
+        # The text with its normalized form and stemmed words, computed on first use after every change
+        self._search_text: Optional[Tuple[str, str, List[str]]] = None
         self.created_at: datetime = datetime.now()
         self.updated_at: datetime = datetime.now()
         self.tags: List[str] = tags or []
         self.tag_manager = tag_manager
         self.is_archived: bool = False
-        self.note_history: List[NoteHistoryEntry] = []
+        self.note_history: NoteHistory = NoteHistory()
 
         if default_tags:
             self.tags.extend(default_tags)
 
-        for tag in self.tags:
-            self.tag_manager.add_tag(tag, EntityType.NOTE, self.note_id)
+        # Loaded notes are already in the tag index if it is loaded from the storage
+        if register_tags:
+            for tag in self.tags:
+                self.tag_manager.add_tag(tag, EntityType.NOTE, self.note_id)
 
     def update_text(self, new_text: str) -> None:
         """
         Update the text of the note
         """
-        history_entry = NoteHistoryEntry(previous_text=self.text, new_text=new_text, timestamp=datetime.now())
-        self.note_history.append(history_entry)
+        self.note_history.append(previous_text=self.text, new_text=new_text, timestamp=datetime.now())
         self.text = new_text
         self.updated_at = datetime.now()
+        self.mark_dirty()
+
+    @property
+    def normalized_text(self) -> str:
+        """
+        The normalized text of the note, as search by content compares it
+        """
+        return self._search_forms()[1]
+
+    @property
+    def search_words(self) -> List[str]:
+        """
+        The normalized and stemmed words of the text of the note, as ranked search compares them
+        """
+        return self._search_forms()[2]
+
+    def _search_forms(self) -> Tuple[str, str, List[str]]:
+        if self._search_text is None or self._search_text[0] is not self.text:
+            self._search_text = (self.text, normalize(self.text), stemmed_words(self.text))
+        return self._search_text
+
+    def mark_dirty(self) -> None:
+        """
+        Mark the note as changed since the last save and notify the listener
+        """
+        self.is_dirty = True
+        if self._change_listener:
+            self._change_listener(self)
+
+    def mark_clean(self) -> None:
+        """
+        Mark the note as saved
+        """
+        self.is_dirty = False
+
+    def set_change_listener(self, listener: Optional[Callable[['Note'], None]]) -> None:
+        """
+        Set the callback that is called with the note every time it changes
+        """
+        self._change_listener = listener
 
     def add_tag(self, tag: str) -> None:
         """
@@ -45,6 +102,7 @@ class Note:
         if tag not in self.tags:
             self.tags.append(tag)
             self.tag_manager.add_tag(tag, EntityType.NOTE, self.note_id)
+            self.mark_dirty()
 
     def remove_tag(self, tag: str) -> None:
         """
@@ -53,6 +111,7 @@ class Note:
         if tag in self.tags:
             self.tags.remove(tag)
             self.tag_manager.remove_tag(tag, EntityType.NOTE, self.note_id)
+            self.mark_dirty()
 
     def get_tags(self) -> List[str]:
         """
@@ -70,19 +129,23 @@ class Note:
         """
         Archive the note
         """
-        self.is_archived = True
+        if not self.is_archived:
+            self.is_archived = True
+            self.mark_dirty()
 
     def restore(self) -> None:
         """
         Restore the note
         """
-        self.is_archived = False
+        if self.is_archived:
+            self.is_archived = False
+            self.mark_dirty()
 
     def get_history(self) -> List[NoteHistoryEntry]:
         """
-        Get the history of the note
+        Get the history of the note, the versions are rebuilt from the stored deltas
         """
-        return self.note_history
+        return list(self.note_history)
 
     def to_dict(self, stringify: bool = False):
         """
@@ -96,24 +159,29 @@ class Note:
             "text": self.text,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
-            "tags": self.tags,
+            "tags": list(self.tags),
             "is_archived": self.is_archived,
-            "note_history": [entry.to_dict() for entry in self.note_history]
+            "note_history": self.note_history.to_dict()
         }
 
     @classmethod
-    def from_dict(cls, data, tag_manager):
+    def from_dict(cls, data, tag_manager, register_tags: bool = True):
         """
         Create a note object from a dictionary
         """
-        note = cls(data['text'], tag_manager, data.get('tags', []), data['note_id'])
-        note.created_at = datetime.fromisoformat(data['created_at'])
-        note.updated_at = datetime.fromisoformat(data['updated_at'])
+        note = cls(data['text'], tag_manager, data.get('tags', []), data['note_id'], register_tags=register_tags)
+        note.created_at = to_datetime(data['created_at'])
+        note.updated_at = to_datetime(data['updated_at'])
         note.is_archived = data['is_archived']
-        note.note_history = [NoteHistoryEntry.from_dict(entry) for entry in data['note_history']]
+        note.note_history = NoteHistory.from_dict(data['note_history'])
+        note.mark_clean()
         return note
 
 
+    def __reduce__(self):
+        # Pickled as its dictionary, without the change listener and the tag manager singleton
+        return _note_from_dict, (self.to_dict(),), {"is_dirty": self.is_dirty}
+
     def __str__(self) -> str:
         return (f"Note(id={self.note_id}, text={self.text}, created_at={self.created_at}, "
                 f"updated_at={self.updated_at}, tags={self.tags}, is_archived={self.is_archived})")
@@ -133,3 +201,10 @@ class Note:
 
     def __iter__(self):
         return iter(self.tags)
+
+def _note_from_dict(data: dict) -> Note:
+    """
+    Recreate a pickled note, registering its tags with the tag manager of this process
+    """
+    from personal_assistant.services import TagManagerService
+    return Note.from_dict(data, TagManagerService())
@@ -0,0 +1,275 @@
+"""
+A module for the NoteHistory class
+
+The history of a note is stored as a base text (the text before the oldest kept edit)
+and one entry per edit. An entry holds either a forward delta against the previous
+version or, every `keyframe_interval` edits, the full text of its version (a keyframe),
+so a version is rebuilt from the nearest keyframe by applying at most that many deltas.
+
+A delta is a list of `[start, end, text]` operations: the previous version with its
+`[start:end]` slices replaced by the texts, in order.
+"""
+import os
+import re
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Iterator, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+
+from personal_assistant.models.note_history_entry import NoteHistoryEntry
+from personal_assistant.utils.helpers import to_datetime
+
+# Texts are compared by words and separators, the offsets of the delta are in characters
+TOKEN_PATTERN = re.compile(r'\w+|\s+|[^\w\s]+')
+
+Delta = List[list]
+
+def diff_texts(previous_text: str, new_text: str) -> Delta:
+    """
+    Return the delta that turns the previous text into the new text
+    """
+    previous_tokens = TOKEN_PATTERN.findall(previous_text)
+    new_tokens = TOKEN_PATTERN.findall(new_text)
+    previous_offsets = _offsets(previous_tokens)
+    new_offsets = _offsets(new_tokens)
+
+    delta = []
+    matcher = SequenceMatcher(None, previous_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            delta.append([previous_offsets[i1], previous_offsets[i2], new_text[new_offsets[j1]:new_offsets[j2]]])
+    return delta
+
+def apply_delta(text: str, delta: Delta) -> str:
+    """
+    Apply a delta to the text it was computed against
+    """
+    parts = []
+    position = 0
+    for start, end, replacement in delta:
+        parts.append(text[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+def _offsets(tokens: List[str]) -> List[int]:
+    """Return the character offset of every token and the length of the text."""
+    offsets = [0]
+    for token in tokens:
+        offsets.append(offsets[-1] + len(token))
+    return offsets
+
+
+class HistoryPolicy:
+    """
+    Policy for encoding and compacting note histories:
+    - keyframe_interval: every N-th edit stores the full text;
+    - keep_last: only the last N edits are kept (0 keeps all);
+    - thin_after_days: edits older than N days are thinned to the last edit of every day (0 disables).
+    The retention rules are applied when the history is compacted.
+    """
+    _default: Optional['HistoryPolicy'] = None
+
+    def __init__(self, keyframe_interval: int = 16, keep_last: int = 0, thin_after_days: int = 0) -> None:
+        if keyframe_interval < 1:
+            raise ValueError("The keyframe interval must be positive")
+        self.keyframe_interval: int = keyframe_interval
+        self.keep_last: int = keep_last
+        self.thin_after_days: int = thin_after_days
+
+    @classmethod
+    def from_env(cls) -> 'HistoryPolicy':
+        """
+        Create the policy from the HISTORY_KEYFRAME_INTERVAL, HISTORY_KEEP_LAST and HISTORY_THIN_AFTER_DAYS settings
+        """
+        load_dotenv()
+        return cls(
+            keyframe_interval=int(os.getenv('HISTORY_KEYFRAME_INTERVAL', '16')),
+            keep_last=int(os.getenv('HISTORY_KEEP_LAST', '0')),
+            thin_after_days=int(os.getenv('HISTORY_THIN_AFTER_DAYS', '0'))
+        )
+
+    @classmethod
+    def default(cls) -> 'HistoryPolicy':
+        """
+        Return the policy of the application settings, read once
+        """
+        if cls._default is None:
+            cls._default = cls.from_env()
+        return cls._default
+
+    def thinned(self, timestamps: List[datetime], now: Optional[datetime] = None) -> List[int]:
+        """
+        Return the indexes of the edits that are kept by thinning
+        """
+        indexes = list(range(len(timestamps)))
+        if self.thin_after_days <= 0:
+            return indexes
+        cutoff = (now or datetime.now()) - timedelta(days=self.thin_after_days)
+        # Keep an old edit only if the next edit was made on another day
+        return [
+            index for index in indexes
+            if timestamps[index] >= cutoff
+            or index + 1 == len(timestamps)
+            or timestamps[index + 1].date() != timestamps[index].date()
+        ]
+
+    def __str__(self) -> str:
+        return (f"HistoryPolicy(keyframe_interval={self.keyframe_interval}, keep_last={self.keep_last}, "
+                f"thin_after_days={self.thin_after_days})")
+
+
+class NoteHistory:
+    """
+    Delta-encoded history of a note's text
+    """
+    def __init__(self, policy: Optional[HistoryPolicy] = None) -> None:
+        self.policy: HistoryPolicy = policy or HistoryPolicy.default()
+        self.base: str = ""
+        # Entries are [timestamp, delta] or, for keyframes, [timestamp, full text]
+        self.entries: List[Tuple[datetime, Union[Delta, str]]] = []
+        self._last_text: Optional[str] = None
+
+    def append(self, previous_text: str, new_text: str, timestamp: datetime) -> None:
+        """
+        Record an edit of the text, compacting the history as the policy requires
+        """
+        self._record(previous_text, new_text, timestamp)
+        if self.policy.keep_last and len(self.entries) > self.policy.keep_last:
+            self._drop_oldest(len(self.entries) - self.policy.keep_last)
+        if self.policy.thin_after_days and len(self.entries) % self.policy.keyframe_interval == 0:
+            self.compact()
+
+    def version(self, index: int) -> str:
+        """
+        Return the text after the given number of edits (0 is the base text)
+        """
+        if index < 0 or index > len(self.entries):
+            raise IndexError("history version out of range")
+        if index == len(self.entries) and self._last_text is not None:
+            return self._last_text
+
+        start = index - self._chain_length(index)
+        text = self.entries[start - 1][1] if start else self.base
+        for _, change in self.entries[start:index]:
+            text = apply_delta(text, change)
+        if index == len(self.entries):
+            self._last_text = text
+        return text
+
+    def versions(self) -> Iterator[str]:
+        """
+        Yield the base text and the text after every edit
+        """
+        text = self.base
+        yield text
+        for _, change in self.entries:
+            text = change if isinstance(change, str) else apply_delta(text, change)
+            yield text
+
+    def compact(self, now: Optional[datetime] = None) -> None:
+        """
+        Apply the retention policy, re-encoding the kept edits that follow a dropped one
+        """
+        timestamps = [timestamp for timestamp, _ in self.entries]
+        kept = self.policy.thinned(timestamps, now)
+        dropped_before = -1
+        if self.policy.keep_last and len(kept) > self.policy.keep_last:
+            dropped_before = kept[-self.policy.keep_last - 1]
+            kept = kept[-self.policy.keep_last:]
+        if len(kept) == len(self.entries):
+            return
+
+        # A thinned edit is merged into the next kept one, the edits dropped by keep_last move the base text
+        texts = list(self.versions())
+        self.base = texts[dropped_before + 1]
+        self.entries = []
+        self._last_text = None
+        previous_text = self.base
+        for index in kept:
+            self._record(previous_text, texts[index + 1], timestamps[index])
+            previous_text = texts[index + 1]
+
+    def _record(self, previous_text: str, new_text: str, timestamp: datetime) -> None:
+        """Append an edit as a delta or, at the keyframe interval, as the full text."""
+        if not self.entries:
+            self.base = previous_text
+            last_text = previous_text
+        else:
+            last_text = self.version(len(self.entries))
+
+        if self._chain_length(len(self.entries)) + 1 >= self.policy.keyframe_interval or last_text != previous_text:
+            self.entries.append((timestamp, new_text))
+        else:
+            delta = diff_texts(last_text, new_text)
+            # A delta that is longer than the text is not worth it
+            self.entries.append((timestamp, delta if _delta_size(delta) < len(new_text) else new_text))
+        self._last_text = new_text
+
+    def _drop_oldest(self, count: int) -> None:
+        """Drop the oldest edits, the text before the first kept edit becomes the base."""
+        self.base = self.version(count)
+        self.entries = self.entries[count:]
+
+    def _chain_length(self, index: int) -> int:
+        """Return the number of deltas between the version and its nearest keyframe."""
+        length = 0
+        while index > length and not isinstance(self.entries[index - length - 1][1], str):
+            length += 1
+        return length
+
+    def __iter__(self) -> Iterator[NoteHistoryEntry]:
+        """
+        Yield the edits as NoteHistoryEntry objects, rebuilding their texts
+        """
+        versions = self.versions()
+        previous_text = next(versions)
+        for (timestamp, _), text in zip(self.entries, versions):
+            yield NoteHistoryEntry(previous_text=previous_text, new_text=text, timestamp=timestamp)
+            previous_text = text
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def to_dict(self) -> dict:
+        """
+        Return a dictionary representation of the note history
+        """
+        return {
+            "base": self.base,
+            "entries": [
+                {"timestamp": timestamp.isoformat(), "text": change} if isinstance(change, str)
+                else {"timestamp": timestamp.isoformat(), "delta": change}
+                for timestamp, change in self.entries
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Union[dict, list], policy: Optional[HistoryPolicy] = None) -> 'NoteHistory':
+        """
+        Create a note history from its dictionary or from the legacy list of full-text entries
+        """
+        history = cls(policy)
+        if isinstance(data, list):
+            # Legacy format: every entry holds the previous and the new text
+            for entry in data:
+                history.append(entry['previous_text'], entry['new_text'], to_datetime(entry['timestamp']))
+            return history
+
+        history.base = data['base']
+        history.entries = [
+            (to_datetime(entry['timestamp']), entry['text'] if 'text' in entry else entry['delta'])
+            for entry in data['entries']
+        ]
+        return history
+
+    def __str__(self) -> str:
+        return f"NoteHistory(edits={len(self.entries)}, base={self.base!r})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+def _delta_size(delta: Delta) -> int:
+    """Approximate the stored size of a delta."""
+    return sum(len(replacement) + 8 for _, _, replacement in delta)
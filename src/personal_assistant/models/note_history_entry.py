@@ -2,6 +2,7 @@
 A module for the NoteHistoryEntry class
 """
 from datetime import datetime
+from personal_assistant.utils.helpers import to_datetime
 
 class NoteHistoryEntry:
     """
@@ -30,7 +31,7 @@ class NoteHistoryEntry:
         return cls(
             data['previous_text'],
             data['new_text'],
-            datetime.fromisoformat(data['timestamp'])
+            to_datetime(data['timestamp'])
         )
 
     def __str__(self) -> str:
@@ -50,10 +50,15 @@ class PhoneNumber:
         return self.number
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, trusted: bool = False):
         """
-        Create a new PhoneNumber object from a dictionary
+        Create a new PhoneNumber object from a dictionary.
+        Trusted data, read from verified storage, is not cleaned and validated again.
         """
+        if trusted:
+            phone = cls.__new__(cls)
+            phone.number = data
+            return phone
         return cls(number=data)
 
     def __str__(self):
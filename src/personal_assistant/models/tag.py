@@ -1,62 +1,68 @@
 """
 Tag model.
 """
-from typing import Dict, Set
+import base64
+from typing import Dict
 from personal_assistant.enums.entity_type import EntityType
+from personal_assistant.utils.bitmap import Bitmap
 
 class Tag:
     """
-    A class to represent a tag
+    A class to represent a tag.
+    The objects are identified by their dense numbers, see TagManagerService.
     """
     def __init__(self, name: str) -> None:
         self.name: str = name
-        self.associations: Dict[EntityType, Set[str]] = {
-            EntityType.CONTACT: set(),
-            EntityType.NOTE: set(),
+        self.associations: Dict[EntityType, Bitmap] = {
+            EntityType.CONTACT: Bitmap(),
+            EntityType.NOTE: Bitmap(),
         }
 
-    def is_associated_with(self, obj_type: EntityType, obj_id: str) -> bool:
+    def is_associated_with(self, obj_type: EntityType, number: int) -> bool:
         """
         Check if the tag is associated with an object
         """
-        return obj_id in self.associations[obj_type]
-    
-    def get_associations(self) -> Set[str]:
+        return number in self.associations[obj_type]
+
+    def get_associations(self) -> Dict[EntityType, Bitmap]:
         """
-        Get the associations of the tag with an object type
+        Get the numbers of the objects associated with the tag, by object type
         """
         return self.associations
 
-    def associate_with(self, obj_type: EntityType, obj_id: str) -> None:
+    def associate_with(self, obj_type: EntityType, number: int) -> None:
         """
         Associate the tag with an object
         """
-        self.associations[obj_type].add(obj_id)
+        self.associations[obj_type].add(number)
 
-    def dissociate_from(self, obj_type: EntityType, obj_id: str) -> None:
+    def dissociate_from(self, obj_type: EntityType, number: int) -> None:
         """
         Dissociate the tag from an object
         """
-        self.associations[obj_type].discard(obj_id)
+        self.associations[obj_type].discard(number)
 
-    def to_dict(self) -> Dict:
+    def is_empty(self) -> bool:
+        """
+        Check if the tag is associated with no object
         """
-        Return the tag as a dictionary
+        return not any(self.associations.values())
+
+    def to_dict(self, obj_type: EntityType) -> Dict:
+        """
+        Return the tag and its associations with one object type as a dictionary,
+        the numbers as a base64 encoded bitmap
         """
         return {
             "name": self.name,
-            "associations": {obj_type.value: list(ids) for obj_type, ids in self.associations.items()},
+            "bitmap": base64.b64encode(self.associations[obj_type].to_bytes()).decode('ascii'),
         }
-    
-    @classmethod
-    def from_dict(cls, tag_dict: Dict) -> 'Tag':
+
+    def update_from_dict(self, obj_type: EntityType, tag_dict: Dict) -> None:
         """
-        Create a tag from a dictionary
+        Replace the associations with one object type by the ones of a dictionary written by to_dict
         """
-        tag = cls(tag_dict["name"])
-        for obj_type, ids in tag_dict["associations"].items():
-            tag.associations[EntityType(obj_type)] = set(ids)
-        return tag
+        self.associations[obj_type] = Bitmap.from_bytes(base64.b64decode(tag_dict["bitmap"]))
 
     def __str__(self) -> str:
         return f"Tag(name={self.name}, associations={self.associations})"
@@ -5,5 +5,6 @@ from personal_assistant.services.storage_service import StorageService
 from personal_assistant.services.tag_manager import TagManagerService
 from personal_assistant.services.notebook import Notebook
 from personal_assistant.services.address_book import AddressBook
+from personal_assistant.services.storage_context import StorageContext
 
-__all__ = [ 'StorageService', 'TagManagerService', 'Notebook', 'AddressBook']
+__all__ = [ 'StorageService', 'TagManagerService', 'Notebook', 'AddressBook', 'StorageContext']
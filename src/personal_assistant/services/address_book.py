@@ -1,22 +1,111 @@
 """
 A module that contains the AddressBook class, which is responsible for managing contacts and tags.
 """
-import collections
-from typing import Dict, List
+import time
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
 from tabulate import tabulate
 from personal_assistant.models.contact import Contact
 from personal_assistant.services import StorageService
+from personal_assistant.services.indexes import BirthdayIndex, FuzzyIndex, PhoneIndex, TrigramIndex, canonical_number, clean_digits, is_phone_fragment
+from personal_assistant.services.lazy_records import LazyRecords
+from personal_assistant.services.query import QueryPlan, parse_query
+from personal_assistant.services.save_policy import SavePolicy
 from personal_assistant.services import TagManagerService
 from personal_assistant.enums import EntityType
+from personal_assistant.utils.normalization import normalize
 
 class AddressBook:
     """
     A class that represents an address book, which is responsible for managing contacts and tags.
     """
-    def __init__(self, storage_service: StorageService) -> None:
+    SEARCH_FIELDS = ('name', 'phone', 'email', 'address', 'note', 'tag', 'birthdate')
+    # Phone lookups that are answered by the phone index only, not by the search of any field
+    PHONE_FIELDS = ('phone', 'phone_end', 'phone_exact')
+    # The fields of the query language, see query
+    QUERY_FIELDS = SEARCH_FIELDS + ('phone_end', 'phone_exact', 'city', 'id', 'any')
+    FIELD_ALIASES = {'birthday': 'birthdate'}
+
+    def __init__(self, storage_service: StorageService, save_policy: Optional[SavePolicy] = None) -> None:
         self.storage_service: StorageService = storage_service
+        self.save_policy: SavePolicy = save_policy or SavePolicy.from_env()
         self.tag_manager: TagManagerService = TagManagerService()
-        self.contacts: Dict[str, Contact] = {}
+        # The contacts are loaded from the storage on first use
+        self._contacts: Optional[Dict[str, Contact]] = None
+        # Contacts changed and removed since the last save
+        self._dirty: Dict[str, Contact] = {}
+        self._removed: Set[str] = set()
+        self._last_save: float = time.monotonic()
+        # The search indexes are built on the first search and updated with every change
+        self._index: Optional[TrigramIndex] = None
+        self._phone_index: Optional[PhoneIndex] = None
+        self._birthday_index: Optional[BirthdayIndex] = None
+        self._name_index: Optional[FuzzyIndex] = None
+
+    @property
+    def contacts(self) -> Dict[str, Contact]:
+        """
+        The contacts of the address book, loaded from the storage on first use.
+        """
+        if self._contacts is None:
+            self.load()
+        return self._contacts
+
+    @contacts.setter
+    def contacts(self, contacts: Dict[str, Contact]) -> None:
+        self._contacts = contacts
+        self._index = None
+        self._phone_index = None
+        self._birthday_index = None
+        self._name_index = None
+
+    @property
+    def index(self) -> TrigramIndex:
+        """
+        The search index of the normalized fields of the contacts, built from all contacts on first use.
+        """
+        if self._index is None:
+            index = TrigramIndex(ignore_case=False)
+            for contact in self.contacts.values():
+                index.add(contact.id, contact.search_keys)
+            self._index = index
+        return self._index
+
+    @property
+    def phone_index(self) -> PhoneIndex:
+        """
+        The index of the phone numbers of the contacts, built from all contacts on first use.
+        """
+        if self._phone_index is None:
+            phone_index = PhoneIndex()
+            for contact in self.contacts.values():
+                phone_index.add(contact.id, [phone.number for phone in contact.phone_numbers])
+            self._phone_index = phone_index
+        return self._phone_index
+
+    @property
+    def birthday_index(self) -> BirthdayIndex:
+        """
+        The calendar-ordered index of the birthdays of the contacts, built from all contacts on first use.
+        """
+        if self._birthday_index is None:
+            birthday_index = BirthdayIndex()
+            for contact in self.contacts.values():
+                birthday_index.add(contact.id, self._birthday_date(contact))
+            self._birthday_index = birthday_index
+        return self._birthday_index
+
+    @property
+    def name_index(self) -> FuzzyIndex:
+        """
+        The typo-tolerant index of the names of the contacts, built from all contacts on first use.
+        """
+        if self._name_index is None:
+            name_index = FuzzyIndex()
+            for contact in self.contacts.values():
+                name_index.add(contact.id, contact.name)
+            self._name_index = name_index
+        return self._name_index
 
     def get_contact(self, contact_id: str) -> Contact:
         """
@@ -29,7 +118,11 @@ class AddressBook:
         Adds a new contact to the address book.
         """
         if isinstance(contact, Contact):
-            self.contacts[contact.id] = contact
+            self.contacts[contact.id] = self._track(contact)
+            self._removed.discard(contact.id)
+            self._reindex(contact)
+            if contact.is_dirty:
+                self._dirty[contact.id] = contact
         else:
             raise ValueError("Invalid contact type. Please provide an instance of Contact.")
 
@@ -39,55 +132,267 @@ class AddressBook:
         """
         if contact_id in self.contacts:
             contact = self.contacts.pop(contact_id)
+            contact.set_change_listener(None)
+            self._dirty.pop(contact_id, None)
+            self._removed.add(contact_id)
+            if self._index is not None:
+                self._index.remove(contact_id)
+            if self._phone_index is not None:
+                self._phone_index.remove(contact_id)
+            if self._birthday_index is not None:
+                self._birthday_index.remove(contact_id)
+            if self._name_index is not None:
+                self._name_index.remove(contact_id)
             for tag in contact.tags:
                 self.tag_manager.remove_tag(tag, EntityType.CONTACT, contact_id)
 
     def find(self, keyword: str, field: str = 'any') -> List[Contact]:
         """
         Finds contacts that match the given keyword.
+        The keyword and the fields are compared normalized, see utils.normalization.
+        The candidates are the contacts with every trigram of the keyword in the field,
+        looked up in the search index, and they are checked against the keyword.
+        Phone numbers are looked up by their digits in the phone index, regardless of formatting;
+        in any field only if the keyword is made of digits and phone formatting.
+        """
+        keyword = normalize(keyword)
+        field = self.FIELD_ALIASES.get(field, field)
+        candidates = self._candidates(field, keyword)
+        if candidates is None:
+            # The keyword is too short or too common to look up, every contact is a candidate
+            candidates = self.contacts.keys()
+
+        found_contacts = [
+            contact for contact in (self.contacts[contact_id] for contact_id in candidates)
+            if self._matches_contact(contact, keyword, field)
+        ]
+        return sorted(found_contacts, key=lambda contact: (contact.name, contact.id))
+
+    def matches(self, contact: Contact, keyword: str, field: str = 'any') -> bool:
+        """
+        Checks if a contact matches the keyword in the field as find does, without the search indexes.
+        """
+        return self._matches_contact(contact, normalize(keyword), self.FIELD_ALIASES.get(field, field))
+
+    def query(self, text: str) -> List[Contact]:
+        """
+        Finds contacts that match a query of `field:value` terms joined with AND, OR and NOT,
+        see services.query. Every term matches as find does; bare values are searched in any field.
+        """
+        plan = QueryPlan(
+            parse_query(text, self.QUERY_FIELDS, 'any', self.FIELD_ALIASES),
+            self._candidates,
+            lambda contact_id, field, keyword: self._matches_contact(self.contacts[contact_id], keyword, field),
+            self.contacts.keys
+        )
+        found_contacts = [self.contacts[contact_id] for contact_id in plan.execute()]
+        return sorted(found_contacts, key=lambda contact: (contact.name, contact.id))
+
+    def find_fuzzy(self, name: str, max_distance: int) -> List[Contact]:
+        """
+        Finds contacts with a name word within `max_distance` edits of every word of the given name,
+        in Cyrillic or Latin letters. The closest names come first.
+        """
+        distances = self.name_index.search(name, max_distance)
+        return sorted(
+            (self.contacts[contact_id] for contact_id in distances),
+            key=lambda contact: (distances[contact.id], contact.name, contact.id)
+        )
+
+    def _candidates(self, field: str, keyword: str) -> Optional[Set[str]]:
+        """
+        Returns the ids of the contacts that may match the normalized keyword in the field or in any field,
+        or None if every contact has to be checked.
+        """
+        fields = self.SEARCH_FIELDS if field in ('any', None) else (field,)
+        candidates = set()
+        for search_field in fields:
+            if search_field == 'phone' and field != 'phone' and not is_phone_fragment(keyword):
+                continue
+            ids = self._field_candidates(search_field, keyword)
+            if ids is None:
+                return None
+            candidates |= ids
+        return candidates
+
+    def _field_candidates(self, field: str, keyword: str) -> Optional[Set[str]]:
         """
-        found_contacts = []
-        for contact in self.contacts.values():
-            if self._matches_contact(contact, keyword, field):
-                found_contacts.append(contact)
-        return found_contacts
+        Returns the ids of the contacts that may match the keyword in the field,
+        or None if every contact has to be checked.
+        """
+        if field == 'id':
+            return {keyword} if keyword in self.contacts else set()
+        if field == 'phone':
+            return self.phone_index.find_containing(keyword)
+        if field == 'phone_end':
+            return self.phone_index.find_ending(keyword)
+        if field == 'phone_exact':
+            return self.phone_index.find_exact(keyword)
+        return self.index.search(field, keyword)
 
     def _matches_contact(self, contact: Contact, keyword: str, field: str) -> bool:
         """
-        Checks if a contact matches the given keyword.
+        Checks if a contact matches the given normalized keyword.
         """
         is_any = field == 'any' or field is None
-        keyword = keyword.lower()
+        keys = contact.search_keys
 
-        if ('name' == field or is_any) and keyword in contact.name.lower():
-            return True
-        if ('phone' == field or is_any) and any(keyword in str(phone).lower() for phone in contact.phone_numbers):
-            return True
-        if ('email' == field or is_any) and any(keyword in str(email).lower() for email in contact.emails):
-            return True
-        if ('address' == field or is_any) and any(keyword in str(address).lower() for address in contact.addresses):
-            return True
-        if ('note' == field or is_any) and contact.note and keyword in str(contact.note).lower():
+        if 'id' == field:
+            return contact.id == keyword
+        if ('name' == field or is_any) and any(keyword in name for name in keys['name']):
             return True
-        if ('tag' == field or is_any) and any(keyword in tag.lower() for tag in contact.tags):
-            return True
-        if ('birthdate' == field or is_any) and contact.birthday and keyword in str(contact.birthday).lower():
+        if field in self.PHONE_FIELDS or is_any:
+            digits = clean_digits(keyword)
+            numbers = [canonical_number(phone.number) for phone in contact.phone_numbers]
+            contains = 'phone' == field or (is_any and is_phone_fragment(keyword))
+            if contains and digits and any(digits in number for number in numbers):
+                return True
+            if 'phone_end' == field and digits and any(number.endswith(digits) for number in numbers):
+                return True
+            if 'phone_exact' == field and canonical_number(keyword) in numbers:
+                return True
+        for key_field in ('email', 'address', 'note', 'tag', 'birthdate'):
+            if (key_field == field or is_any) and any(keyword in text for text in keys[key_field]):
+                return True
+        if 'city' == field and any(keyword in city for city in keys['city']):
             return True
         return False
 
-    def save(self) -> None:
+    @property
+    def pending_changes(self) -> int:
+        """
+        Number of contacts changed or removed since the last save.
+        """
+        return len(self._dirty) + len(self._removed)
+
+    def save(self, force: bool = False) -> int:
+        """
+        Serialize the contacts data and save it to the storage service when the save policy allows it.
+        Nothing is written if no contact changed. Storage strategies that support incremental
+        saves receive only the changed contacts. Returns the number of written records.
+        If the save fails in the background, the contacts stay pending for the next save.
+        """
+        if not self.pending_changes:
+            return 0
+        if not force and not self.save_policy.should_save(self.pending_changes, self._last_save):
+            return 0
+
+        dirty, removed = dict(self._dirty), set(self._removed)
+
+        def restore() -> None:
+            self._restore_changes(dirty, removed)
+
+        self.tag_manager.begin_save(self.storage_service, EntityType.CONTACT, "contacts_tags_data")
+        if self.storage_service.supports_changes:
+            changes = {contact_id: contact.to_dict() for contact_id, contact in self._dirty.items()}
+            changes.update((contact_id, None) for contact_id in self._removed)
+            self.storage_service.save_changes(changes, "contacts_data", on_failure=restore)
+            written = len(changes)
+        else:
+            data = {contact_id: contact.to_dict() for contact_id, contact in self.contacts.items()}
+            self.storage_service.save_data(data, "contacts_data", on_failure=restore)
+            written = len(data)
+        self.tag_manager.save(self.storage_service, EntityType.CONTACT, "contacts_tags_data")
+
+        for contact in self._dirty.values():
+            contact.mark_clean()
+        self._dirty.clear()
+        self._removed.clear()
+        self._last_save = time.monotonic()
+        return written
+
+    def _restore_changes(self, dirty: Dict[str, Contact], removed: Set[str]) -> None:
+        """
+        Put back the changes of a save that failed in the background, so the next save writes them again.
+        Changes made since that save take precedence.
+        """
+        for contact_id, contact in dirty.items():
+            if contact_id not in self._dirty and contact_id not in self._removed:
+                contact.is_dirty = True
+                self._dirty[contact_id] = contact
+                # Put back in case it was evicted since, not to be read again as stored
+                self.contacts[contact_id] = contact
+        self._removed.update(contact_id for contact_id in removed if contact_id not in self._dirty)
+
+    def flush(self) -> int:
         """
-        Serialize the contacts data and save it to the storage service.
+        Write all pending changes regardless of the save policy.
         """
-        data = {contact_id: contact.to_dict() for contact_id, contact in self.contacts.items()}
-        self.storage_service.save_data(data, "contacts_data")
+        return self.save(force=True)
+
+    def reshard(self, shards: int) -> None:
+        """
+        Write the pending changes and repartition the stored contacts into the given number of shards.
+        """
+        self.flush()
+        self.storage_service.reshard("contacts_data", shards)
 
     def load(self) -> None:
         """
         Deserialize the contacts data and load it from the storage service.
+        Records of a storage that verified the data they are read from are hydrated without validation.
+        With a record-level storage the contacts are read one by one, when first accessed,
+        unless the storage loads its chunks in parallel: then all contacts are loaded at once.
+        The tag index is loaded with the contacts; data saved without it is read once to rebuild it.
         """
-        data = self.storage_service.load_data("contacts_data")
-        self.contacts = {contact_id: Contact.from_dict(contact_data) for contact_id, contact_data in data.items()}
+        indexed = self.tag_manager.load(self.storage_service, EntityType.CONTACT, "contacts_tags_data")
+
+        def hydrate(data: dict) -> Contact:
+            # Asked for every record, once the data it comes from is read and its checksum checked
+            trusted = self.storage_service.trusted_load
+            return self._track(Contact.from_dict(data, trusted, register_tags=not indexed))
+
+        if self.storage_service.supports_records and not self.storage_service.parallel_load:
+            self.contacts = LazyRecords(self.storage_service, "contacts_data", hydrate)
+        else:
+            records = self.storage_service.iter_data("contacts_data")
+            self.contacts = {contact_id: hydrate(contact_data) for contact_id, contact_data in records}
+        if not indexed:
+            self._rebuild_tag_index()
+
+    def _rebuild_tag_index(self) -> None:
+        """
+        Register the tags of all contacts and save the tag index, if there are contacts.
+        """
+        if isinstance(self.contacts, LazyRecords):
+            self.contacts.hydrate_all()
+        if self.contacts:
+            self.tag_manager.save(self.storage_service, EntityType.CONTACT, "contacts_tags_data")
+
+    def _track(self, contact: Contact) -> Contact:
+        """
+        Subscribe to the contact's changes, so it is saved with the next save.
+        """
+        contact.set_change_listener(self._contact_changed)
+        return contact
+
+    def _contact_changed(self, contact: Contact) -> None:
+        self._dirty[contact.id] = contact
+        self._reindex(contact)
+
+    def _reindex(self, contact: Contact) -> None:
+        """
+        Update the built search indexes with the contact's fields.
+        """
+        if self._index is not None:
+            self._index.add(contact.id, contact.search_keys)
+        if self._phone_index is not None:
+            self._phone_index.add(contact.id, [phone.number for phone in contact.phone_numbers])
+        if self._birthday_index is not None:
+            self._birthday_index.add(contact.id, self._birthday_date(contact))
+        if self._name_index is not None:
+            self._name_index.add(contact.id, contact.name)
+
+    @staticmethod
+    def _birthday_date(contact: Contact) -> Optional[date]:
+        return contact.birthday.date if contact.birthday else None
+
+    def upcoming_birthdays(self, days: int = 7) -> List[Tuple[Contact, date]]:
+        """
+        Returns the contacts with a birthday in the next `days` days and their next birthdays,
+        ordered by the next birthday.
+        """
+        return [(self.contacts[contact_id], birthday) for contact_id, birthday in self.birthday_index.upcoming(days)]
 
     def print_contacts_table(self, contacts: List[Contact] = None, headers: Dict[str, str] = None):
         """
@@ -133,27 +438,21 @@ class AddressBook:
             "congratulations_date": "Дата привітання"
         }
 
-        contacts = [contact for contact in self.contacts.values() if contact.is_upcoming_bd(days)]
-
-        #keep only headers that are relevant
-        aniversaries = {}
-        for contact in contacts:
-            aniversaries[contact.id] = {
+        # The birthday index returns the contacts already ordered by the next birthday
+        aniversaries = [
+            {
                 "id": contact.id,
                 "name": contact.name,
                 "birthday": contact.formatted_birthday(),
-                "age": contact.birthday.get_age() + 1,
-                "congratulations_date": contact.congratulations_date().strftime("%d.%m.%Y")
+                "age": next_birthday.year - contact.birthday.date.year,
+                "congratulations_date": contact.congratulations_date(next_birthday).strftime("%d.%m.%Y")
             }
-
-        # sort by congratulations and keep the dictionary
-        aniversaries = collections.OrderedDict(
-            sorted(aniversaries.items(), key=lambda item: item[1]["congratulations_date"])
-        )
+            for contact, next_birthday in self.upcoming_birthdays(days)
+        ]
 
         # reformat data
         reformatted_data = []
-        for contact in aniversaries.values():
+        for contact in aniversaries:
             reformatted_data.append({
                 headers[key]: value for key, value in contact.items() if key in headers
             })
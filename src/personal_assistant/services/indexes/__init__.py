@@ -0,0 +1,15 @@
+"""
+A package that contains the in-memory search indexes of the address book and the notebook.
+"""
+from personal_assistant.services.indexes.birthday_index import BirthdayIndex
+from personal_assistant.services.indexes.fuzzy_index import FuzzyIndex, edit_distance, name_words
+from personal_assistant.services.indexes.phone_index import (
+    PhoneIndex, canonical_number, clean_digits, is_phone_fragment
+)
+from personal_assistant.services.indexes.ranked_index import RankedIndex
+from personal_assistant.services.indexes.trigram_index import TrigramIndex, trigrams
+
+__all__ = [
+    'BirthdayIndex', 'FuzzyIndex', 'PhoneIndex', 'RankedIndex', 'TrigramIndex',
+    'canonical_number', 'clean_digits', 'edit_distance', 'is_phone_fragment', 'name_words', 'trigrams'
+]
@@ -0,0 +1,101 @@
+"""
+This module contains the BirthdayIndex class, an in-memory index of the birthdays of the
+contacts in calendar order.
+
+The entries are (month, day, id) tuples in a sorted list, so the birthdays between two dates
+of a year are a binary search followed by a slice, already in the order they come. A period
+that crosses the new year is split into one range per year. A birthday on February 29 is
+celebrated on March 1 in non-leap years, as Birthday.get_next_birthday does, and its entries
+sort right before the ones of March 1.
+"""
+import calendar
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from personal_assistant.models.birthday import Birthday
+
+class BirthdayIndex:
+    """
+    Index of the birthdays of the records: sorted (month, day, record id) entries.
+    """
+    def __init__(self) -> None:
+        # Sorted on first use, see _sorted_entries
+        self._entries: List[Tuple[int, int, str]] = []
+        self._sorted: bool = False
+        # The (month, day) of every record, to remove its entry when the birthday changes
+        self._days: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, record_id: str, birthday: Optional[date]) -> None:
+        """
+        Index the birthday of a record, replacing its previous birthday.
+        A record without a birthday is removed from the index.
+        """
+        day = (birthday.month, birthday.day) if birthday else None
+        if self._days.get(record_id) == day:
+            return
+        self.remove(record_id)
+        if day is None:
+            return
+        self._days[record_id] = day
+        entry = (*day, record_id)
+        if self._sorted:
+            insort(self._entries, entry)
+        else:
+            self._entries.append(entry)
+
+    def remove(self, record_id: str) -> None:
+        """
+        Remove a record from the index
+        """
+        day = self._days.pop(record_id, None)
+        if day is None:
+            return
+        entries = self._sorted_entries()
+        del entries[bisect_left(entries, (*day, record_id))]
+
+    def upcoming(self, days: int, today: Optional[date] = None) -> List[Tuple[str, date]]:
+        """
+        Return the ids and the next birthdays of the records whose next birthday is
+        in the next `days` days, ordered by the next birthday
+        """
+        if today is None:
+            today = date.today()
+        end = today + timedelta(days=days)
+        seen: Set[str] = set()
+        result = []
+        for year in range(today.year, end.year + 1):
+            start = today if year == today.year else date(year, 1, 1)
+            stop = end if year == end.year else date(year, 12, 31)
+            for month, day, record_id in self._range(start, stop):
+                # A period longer than a year holds a birthday more than once
+                if record_id not in seen:
+                    seen.add(record_id)
+                    result.append((record_id, Birthday.date_in_year(month, day, year)))
+        return result
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._days
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def _range(self, start: date, stop: date) -> Iterator[Tuple[int, int, str]]:
+        """
+        Yield the entries celebrated between two dates of the same year, in calendar order
+        """
+        entries = self._sorted_entries()
+        low = (start.month, start.day)
+        if low == (3, 1) and not calendar.isleap(start.year):
+            # February 29 is celebrated on March 1
+            low = (2, 29)
+        # (month, day + 1) sorts after every entry of the stop day
+        high = (stop.month, stop.day + 1)
+        for position in range(bisect_left(entries, low), bisect_left(entries, high)):
+            yield entries[position]
+
+    def _sorted_entries(self) -> List[Tuple[int, int, str]]:
+        if not self._sorted:
+            self._entries.sort()
+            self._sorted = True
+        return self._entries
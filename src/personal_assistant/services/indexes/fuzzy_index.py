@@ -0,0 +1,153 @@
+"""
+This module contains the FuzzyIndex class, an in-memory BK-tree of the words of the names
+of records (contacts) for typo-tolerant search.
+
+The words are normalized and transliterated from Cyrillic to Latin, so a name typed in
+either alphabet compares with the same letters. Every node of the tree keeps a word and
+its children by their edit distance to it; by the triangle inequality, the words within
+distance N of a query are only under the children whose distance differs from the
+query's distance to the node by at most N, so most of the tree is never visited.
+A word that no record uses anymore stays in the tree to route the search, without ids.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from personal_assistant.utils.normalization import words
+
+def name_words(name: str) -> List[str]:
+    """
+    Split a name into normalized words transliterated to Latin, without apostrophes
+    """
+    return [word.replace("'", '') for word in words(name, to_latin=True)]
+
+def edit_distance(first: str, second: str) -> int:
+    """
+    Return the Levenshtein distance between two words
+    """
+    # The common prefix and suffix don't change the distance
+    start = 0
+    while start < len(first) and start < len(second) and first[start] == second[start]:
+        start += 1
+    first_end, second_end = len(first), len(second)
+    while first_end > start and second_end > start and first[first_end - 1] == second[second_end - 1]:
+        first_end -= 1
+        second_end -= 1
+    first, second = first[start:first_end], second[start:second_end]
+    if len(first) < len(second):
+        first, second = second, first
+    if not second:
+        return len(first)
+
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        left = row
+        for column, second_char in enumerate(second, 1):
+            # Substitution, then deletion and insertion
+            cost = previous[column - 1] + (first_char != second_char)
+            if previous[column] + 1 < cost:
+                cost = previous[column] + 1
+            if left + 1 < cost:
+                cost = left + 1
+            current.append(cost)
+            left = cost
+        previous = current
+    return previous[-1]
+
+class _Node:
+    __slots__ = ('word', 'ids', 'children')
+
+    def __init__(self, word: str) -> None:
+        self.word: str = word
+        self.ids: Set[str] = set()
+        self.children: Dict[int, '_Node'] = {}
+
+class FuzzyIndex:
+    """
+    BK-tree of the name words of the records: word -> ids of the records.
+    A record is re-indexed as a whole whenever its name changes.
+    """
+    def __init__(self) -> None:
+        self._root: Optional[_Node] = None
+        self._nodes: Dict[str, _Node] = {}
+        # The words of every record, to remove its ids when the name changes
+        self._words: Dict[str, Set[str]] = {}
+
+    def add(self, record_id: str, name: str) -> None:
+        """
+        Index the words of the name of a record, replacing its previous name
+        """
+        words = set(name_words(name))
+        previous = self._words.get(record_id, set())
+        for word in previous - words:
+            self._nodes[word].ids.discard(record_id)
+        for word in words - previous:
+            self._insert(word).ids.add(record_id)
+        self._words[record_id] = words
+
+    def remove(self, record_id: str) -> None:
+        """
+        Remove a record from the index
+        """
+        for word in self._words.pop(record_id, set()):
+            self._nodes[word].ids.discard(record_id)
+
+    def search(self, name: str, max_distance: int) -> Dict[str, int]:
+        """
+        Return the ids of the records with a word within the edit distance of every word
+        of the name, and the sum of the smallest distances of the words
+        """
+        result: Optional[Dict[str, int]] = None
+        for word in set(name_words(name)):
+            distances: Dict[str, int] = {}
+            for ids, distance in self._matches(word, max_distance):
+                for record_id in ids:
+                    if distance < distances.get(record_id, max_distance + 1):
+                        distances[record_id] = distance
+            if result is None:
+                result = distances
+            else:
+                result = {
+                    record_id: total + distances[record_id]
+                    for record_id, total in result.items() if record_id in distances
+                }
+            if not result:
+                break
+        return result or {}
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._words
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def _insert(self, word: str) -> _Node:
+        node = self._nodes.get(word)
+        if node is not None:
+            return node
+        new_node = _Node(word)
+        self._nodes[word] = new_node
+        if self._root is None:
+            self._root = new_node
+            return new_node
+        node = self._root
+        while True:
+            distance = edit_distance(word, node.word)
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = new_node
+                return new_node
+            node = child
+
+    def _matches(self, word: str, max_distance: int) -> Iterable[Tuple[Set[str], int]]:
+        """
+        Yield the ids and the distance of the words within the edit distance of the word
+        """
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            distance = edit_distance(word, node.word)
+            if distance <= max_distance and node.ids:
+                yield node.ids, distance
+            for child_distance, child in node.children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
@@ -0,0 +1,135 @@
+"""
+This module contains the PhoneIndex class, an in-memory index of the digits of the phone
+numbers of the contacts.
+
+The numbers are indexed in their canonical form, with the country code that the formatted
+number shows. Every suffix of every number is kept in a sorted list, a suffix array over
+the numbers: the numbers that contain a fragment are the ones with a suffix that starts
+with it, and the numbers that end with a fragment are the ones with a suffix equal to it.
+Both are binary searches, whatever the formatting of the query.
+"""
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Set, Tuple
+
+NON_DIGITS = re.compile(r'\D')
+PHONE_FRAGMENT = re.compile(r'[\d\s()+-]*\d[\d\s()+-]*')
+# Separates the suffix from the record id in the suffix array entries
+SEPARATOR = ' '
+# Ukrainian numbers are stored with or without the country code, see PhoneNumber.format_number
+COUNTRY_CODE = '38'
+NATIONAL_LENGTH = 10
+
+def clean_digits(text: str) -> str:
+    """
+    Return the digits of the text, without formatting
+    """
+    return NON_DIGITS.sub('', text)
+
+def is_phone_fragment(text: str) -> bool:
+    """
+    Check if the text is made of digits and phone number formatting only
+    """
+    return PHONE_FRAGMENT.fullmatch(text) is not None
+
+def canonical_number(text: str) -> str:
+    """
+    Return the digits of a phone number with the country code of a national number added
+    """
+    digits = clean_digits(text)
+    if len(digits) == NATIONAL_LENGTH:
+        return COUNTRY_CODE + digits
+    return digits
+
+class PhoneIndex:
+    """
+    Index of the phone numbers of the records: canonical number -> ids of the records,
+    and a suffix array of 'suffix id' entries. The separator sorts before the digits,
+    so the entries of a suffix come right before the entries of its longer suffixes.
+    A record is re-indexed as a whole whenever its numbers change.
+    """
+    def __init__(self) -> None:
+        self._exact: Dict[str, Set[str]] = {}
+        # Sorted on first use, see _sorted_suffixes
+        self._suffixes: List[str] = []
+        self._sorted: bool = False
+        # The canonical numbers of every record, to remove its entries when the record changes
+        self._numbers: Dict[str, Tuple[str, ...]] = {}
+
+    def add(self, record_id: str, numbers: Iterable[str]) -> None:
+        """
+        Index the phone numbers of a record, replacing its previous numbers
+        """
+        canonical = tuple(canonical_number(number) for number in numbers)
+        if self._numbers.get(record_id) == canonical:
+            return
+        self.remove(record_id)
+        self._numbers[record_id] = canonical
+        for number in set(canonical):
+            self._exact.setdefault(number, set()).add(record_id)
+            for entry in self._entries(record_id, number):
+                if self._sorted:
+                    insort(self._suffixes, entry)
+                else:
+                    self._suffixes.append(entry)
+
+    def remove(self, record_id: str) -> None:
+        """
+        Remove a record from the index
+        """
+        numbers = self._numbers.pop(record_id, None)
+        if not numbers:
+            return
+        suffixes = self._sorted_suffixes()
+        for number in set(numbers):
+            ids = self._exact[number]
+            ids.discard(record_id)
+            if not ids:
+                del self._exact[number]
+            for entry in self._entries(record_id, number):
+                del suffixes[bisect_left(suffixes, entry)]
+
+    def find_exact(self, number: str) -> Set[str]:
+        """
+        Return the ids of the records with the number, with or without the country code
+        """
+        return set(self._exact.get(canonical_number(number), ()))
+
+    def find_ending(self, digits: str) -> Set[str]:
+        """
+        Return the ids of the records with a number that ends with the digits of the text
+        """
+        digits = clean_digits(digits)
+        return self._lookup(digits + SEPARATOR) if digits else set()
+
+    def find_containing(self, digits: str) -> Set[str]:
+        """
+        Return the ids of the records with a number that contains the digits of the text
+        """
+        digits = clean_digits(digits)
+        return self._lookup(digits) if digits else set()
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._numbers
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def _lookup(self, prefix: str) -> Set[str]:
+        suffixes = self._sorted_suffixes()
+        ids: Set[str] = set()
+        position = bisect_left(suffixes, prefix)
+        while position < len(suffixes) and suffixes[position].startswith(prefix):
+            ids.add(suffixes[position].rpartition(SEPARATOR)[2])
+            position += 1
+        return ids
+
+    def _sorted_suffixes(self) -> List[str]:
+        if not self._sorted:
+            self._suffixes.sort()
+            self._sorted = True
+        return self._suffixes
+
+    @staticmethod
+    def _entries(record_id: str, number: str) -> List[str]:
+        return [number[start:] + SEPARATOR + record_id for start in range(len(number))]
@@ -0,0 +1,120 @@
+"""
+This module contains the RankedIndex class, an in-memory full-text index of records
+(notes) that ranks them by their BM25 score for a query.
+
+Every word keeps a posting dictionary of record numbers and term frequencies, and every
+record keeps its length in words, so the score of a record is summed from the postings of
+the query words only. The best records are taken from the scores with a heap. Archived
+records are marked in the index and skipped while the postings are read. The words are
+given by the callers, in the form they are compared in (normalized and stemmed).
+"""
+import heapq
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Term frequency saturation and document length normalization of BM25
+K1 = 1.2
+B = 0.75
+
+class RankedIndex:
+    """
+    Index of the words of the records: word -> record number -> term frequency.
+    Records are numbered internally, so the postings are keyed by small integers.
+    A record is re-indexed as a whole whenever it changes.
+    """
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._numbers: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        # The word counts of every record, to remove its postings when the record changes
+        self._terms: Dict[int, Counter] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length: int = 0
+        self._archived: Set[int] = set()
+
+    def add(self, record_id: str, words: Iterable[str], archived: bool = False) -> None:
+        """
+        Index the words of the text of a record, replacing its previous words
+        """
+        terms = Counter(words)
+        number = self._numbers.get(record_id)
+        if number is None:
+            number = self._free.pop() if self._free else len(self._ids)
+            if number == len(self._ids):
+                self._ids.append(record_id)
+            else:
+                self._ids[number] = record_id
+            self._numbers[record_id] = number
+            previous = Counter()
+        else:
+            previous = self._terms[number]
+
+        if archived:
+            self._archived.add(number)
+        else:
+            self._archived.discard(number)
+        if previous == terms and number in self._terms:
+            return
+
+        for word in previous.keys() - terms.keys():
+            self._discard(word, number)
+        for word, count in terms.items():
+            self._postings.setdefault(word, {})[number] = count
+        self._total_length += sum(terms.values()) - self._lengths.get(number, 0)
+        self._lengths[number] = sum(terms.values())
+        self._terms[number] = terms
+
+    def remove(self, record_id: str) -> None:
+        """
+        Remove a record from the index
+        """
+        number = self._numbers.pop(record_id, None)
+        if number is None:
+            return
+        for word in self._terms.pop(number):
+            self._discard(word, number)
+        self._total_length -= self._lengths.pop(number)
+        self._archived.discard(number)
+        self._ids[number] = None
+        self._free.append(number)
+
+    def search(self, words: Iterable[str], limit: int = 10, include_archived: bool = False) -> List[Tuple[str, float]]:
+        """
+        Return the ids and the BM25 scores of the best records for the words of a query,
+        best first, without the archived records unless they are included
+        """
+        count = len(self._numbers)
+        if not count or limit <= 0:
+            return []
+        average_length = self._total_length / count or 1
+        # The length normalization K1 * (1 - B + B * length / average_length) split into its constant and its slope
+        norm_base, norm_slope = K1 * (1 - B), K1 * B / average_length
+        lengths = self._lengths
+        skipped = () if include_archived else self._archived
+        scores: Dict[int, float] = {}
+        for word in set(words):
+            postings = self._postings.get(word)
+            if not postings:
+                continue
+            weight = (K1 + 1) * math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for number, frequency in postings.items():
+                if number in skipped:
+                    continue
+                score = weight * frequency / (frequency + norm_base + norm_slope * lengths[number])
+                scores[number] = scores.get(number, 0.0) + score
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self._ids[number], score) for number, score in best]
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._numbers
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def _discard(self, word: str, number: int) -> None:
+        postings = self._postings[word]
+        del postings[number]
+        if not postings:
+            del self._postings[word]
@@ -0,0 +1,125 @@
+"""
+This module contains the TrigramIndex class, an in-memory index of the three-character
+substrings (trigrams) of the fields of records (contacts, notes).
+
+A text contains the query only if it contains every trigram of the query, so the
+intersection of the posting sets of the query's trigrams is a small superset of the
+records that contain the query as a substring. The callers check these candidates
+with their own substring test, so the results are the same as those of a full scan.
+Queries shorter than a trigram can't be looked up, and queries that match a large share of
+the records are cheaper to answer by checking every record, so the callers scan instead.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+TRIGRAM_SIZE = 3
+# Above this share of the records, a posting set is not worth intersecting
+SCAN_SHARE = 0.25
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Return the trigrams of the text
+    """
+    return {text[position:position + TRIGRAM_SIZE] for position in range(len(text) - TRIGRAM_SIZE + 1)}
+
+class TrigramIndex:
+    """
+    Index of the trigrams of the record fields: field -> trigram -> numbers of the records.
+    Records are numbered internally, so the posting sets hold small integers.
+    The texts are lower-cased unless the index is case-sensitive.
+    A record is re-indexed as a whole whenever it changes.
+    """
+    def __init__(self, ignore_case: bool = True) -> None:
+        self.ignore_case: bool = ignore_case
+        self._postings: Dict[str, Dict[str, Set[int]]] = {}
+        self._numbers: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        # The indexed texts of every record, to remove their trigrams when the record changes
+        self._texts: Dict[int, Dict[str, Tuple[str, ...]]] = {}
+
+    def add(self, record_id: str, fields: Dict[str, Iterable[str]]) -> None:
+        """
+        Index the texts of the fields of a record, replacing its previous texts
+        """
+        texts = {field: tuple(self._normalize(text) for text in field_texts) for field, field_texts in fields.items()}
+        number = self._numbers.get(record_id)
+        if number is None:
+            number = self._free.pop() if self._free else len(self._ids)
+            if number == len(self._ids):
+                self._ids.append(record_id)
+            else:
+                self._ids[number] = record_id
+            self._numbers[record_id] = number
+            previous = {}
+        else:
+            previous = self._texts[number]
+            if previous == texts:
+                return
+
+        for field in previous.keys() | texts.keys():
+            old = self._field_trigrams(previous.get(field, ()))
+            new = self._field_trigrams(texts.get(field, ()))
+            postings = self._postings.setdefault(field, {})
+            for trigram in old - new:
+                self._discard(postings, trigram, number)
+            for trigram in new - old:
+                postings.setdefault(trigram, set()).add(number)
+        self._texts[number] = texts
+
+    def remove(self, record_id: str) -> None:
+        """
+        Remove a record from the index
+        """
+        number = self._numbers.pop(record_id, None)
+        if number is None:
+            return
+        for field, field_texts in self._texts.pop(number).items():
+            postings = self._postings[field]
+            for trigram in self._field_trigrams(field_texts):
+                self._discard(postings, trigram, number)
+        self._ids[number] = None
+        self._free.append(number)
+
+    def search(self, field: str, text: str) -> Optional[Set[str]]:
+        """
+        Return the ids of the records whose field may contain the text, or None if the text
+        is shorter than a trigram or each of its trigrams is in more than SCAN_SHARE of the records
+        """
+        query_trigrams = trigrams(self._normalize(text))
+        if not query_trigrams:
+            return None
+        postings = self._postings.get(field, {})
+        # Intersect starting from the smallest posting set
+        posting_sets = sorted((postings.get(trigram, set()) for trigram in query_trigrams), key=len)
+        if len(posting_sets[0]) > SCAN_SHARE * len(self._numbers):
+            # Every trigram is common, intersecting the posting sets costs more than a scan
+            return None
+        numbers = posting_sets[0].copy()
+        for posting_set in posting_sets[1:]:
+            if not numbers:
+                break
+            numbers &= posting_set
+        return {self._ids[number] for number in numbers}
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._numbers
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def _normalize(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    @staticmethod
+    def _field_trigrams(texts: Iterable[str]) -> Set[str]:
+        result: Set[str] = set()
+        for text in texts:
+            result |= trigrams(text)
+        return result
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[int]], trigram: str, number: int) -> None:
+        posting_set = postings[trigram]
+        posting_set.discard(number)
+        if not posting_set:
+            del postings[trigram]
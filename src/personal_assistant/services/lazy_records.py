@@ -0,0 +1,116 @@
+"""
+A module that contains the LazyRecords class, a dictionary-like view over the records
+of a storage strategy that reads and hydrates single records on demand.
+"""
+import os
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Iterator, Optional, Set
+from dotenv import load_dotenv
+from personal_assistant.services.storage_service import StorageService
+
+class LazyRecords(MutableMapping):
+    """
+    Dictionary of model objects that are loaded from the storage one by one, on first access.
+    Removed records stay hidden until the owner saves the removal to the storage.
+
+    At most `max_loaded` objects loaded on demand are kept (RECORD_CACHE_SIZE, 0 for no limit):
+    the least recently used saved objects are dropped and read again when accessed.
+    Changed objects are kept until they are saved.
+    """
+    def __init__(
+            self,
+            storage_service: StorageService,
+            path: str,
+            hydrate: Callable[[dict], Any],
+            max_loaded: Optional[int] = None
+        ) -> None:
+        if max_loaded is None:
+            load_dotenv()
+            max_loaded = int(os.getenv('RECORD_CACHE_SIZE', '1000'))
+        self.storage_service: StorageService = storage_service
+        self.path: str = path
+        self.hydrate: Callable[[dict], Any] = hydrate
+        self.max_loaded: int = max_loaded
+        self._loaded: OrderedDict[str, Any] = OrderedDict()
+        self._removed: Set[str] = set()
+        self._keys: Optional[Set[str]] = None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._loaded:
+            self._loaded.move_to_end(key)
+            return self._loaded[key]
+        if key in self._removed:
+            raise KeyError(key)
+
+        data = self.storage_service.get_record(key, self.path)
+        if data is None:
+            raise KeyError(key)
+        obj = self.hydrate(data)
+        self._loaded[key] = obj
+        self._evict()
+        return obj
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._loaded[key] = value
+        self._removed.discard(key)
+        if self._keys is not None:
+            self._keys.add(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._loaded.pop(key, None)
+        self._removed.add(key)
+        if self._keys is not None:
+            self._keys.discard(key)
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._all_keys()))
+
+    def __len__(self) -> int:
+        return len(self._all_keys())
+
+    def hydrate_all(self) -> None:
+        """Load every record that has not been loaded yet with a single read of the dataset."""
+        if self._keys is not None and len(self._loaded) == len(self._keys):
+            return
+        for key, data in self.storage_service.load_data(self.path).items():
+            if key not in self._loaded and key not in self._removed:
+                self._loaded[key] = self.hydrate(data)
+        self._keys = set(self._loaded)
+
+    def values(self):
+        self.hydrate_all()
+        return self._loaded.values()
+
+    def items(self):
+        self.hydrate_all()
+        return self._loaded.items()
+
+    def _evict(self) -> None:
+        """Drop the least recently used saved objects above the limit."""
+        excess = len(self._loaded) - self.max_loaded
+        if self.max_loaded <= 0 or excess <= 0:
+            return
+        evicted = []
+        for key, obj in self._loaded.items():
+            if len(evicted) == excess:
+                break
+            if not getattr(obj, 'is_dirty', False):
+                evicted.append(key)
+        for key in evicted:
+            del self._loaded[key]
+
+    def _all_keys(self) -> Set[str]:
+        if self._keys is None:
+            stored = set(self.storage_service.record_keys(self.path))
+            self._keys = (stored | set(self._loaded)) - self._removed
+        return self._keys
@@ -1,24 +1,86 @@
-from datetime import datetime
-from typing import Dict, List, Optional
+import time
+from operator import attrgetter
+from typing import Dict, List, Optional, Set, Tuple
 
 from personal_assistant.enums import EntityType
-from personal_assistant.models import Note, NoteHistoryEntry
+from personal_assistant.models import Note
 from personal_assistant.services import StorageService, TagManagerService
+from personal_assistant.services.indexes import RankedIndex, TrigramIndex
+from personal_assistant.services.lazy_records import LazyRecords
+from personal_assistant.services.query import QueryPlan, parse_query
+from personal_assistant.services.save_policy import SavePolicy
+from personal_assistant.utils.normalization import normalize, stemmed_words
 
 class Notebook:
     """
     Class for managing notes
     """
-    def __init__(self, storage_service: StorageService) -> None:
+    # The fields of the query language, see query
+    QUERY_FIELDS = ('content', 'tag', 'id')
+    FIELD_ALIASES = {'text': 'content'}
+
+    def __init__(self, storage_service: StorageService, save_policy: Optional[SavePolicy] = None) -> None:
         self.storage_service: StorageService = storage_service
-        self.notes: Dict[str, Note] = {}
+        self.save_policy: SavePolicy = save_policy or SavePolicy.from_env()
+        # The notes are loaded from the storage on first use
+        self._notes: Optional[Dict[str, Note]] = None
+        # Notes changed and removed since the last save
+        self._dirty: Dict[str, Note] = {}
+        self._removed: Set[str] = set()
+        self._last_save: float = time.monotonic()
         self.tag_manager: TagManagerService = TagManagerService()
+        # The text indexes are built on the first search by content and updated with every change
+        self._index: Optional[TrigramIndex] = None
+        self._ranked_index: Optional[RankedIndex] = None
+
+    @property
+    def notes(self) -> Dict[str, Note]:
+        """
+        The notes of the notebook, loaded from the storage on first use
+        """
+        if self._notes is None:
+            self.load()
+        return self._notes
+
+    @notes.setter
+    def notes(self, notes: Dict[str, Note]) -> None:
+        self._notes = notes
+        self._index = None
+        self._ranked_index = None
+
+    @property
+    def index(self) -> TrigramIndex:
+        """
+        The text index of the normalized notes, built from all notes on first use
+        """
+        if self._index is None:
+            index = TrigramIndex(ignore_case=False)
+            for note in self.notes.values():
+                index.add(note.note_id, {'text': [note.normalized_text]})
+            self._index = index
+        return self._index
+
+    @property
+    def ranked_index(self) -> RankedIndex:
+        """
+        The full-text index of the notes for ranked search, built from all notes on first use
+        """
+        if self._ranked_index is None:
+            ranked_index = RankedIndex()
+            for note in self.notes.values():
+                ranked_index.add(note.note_id, note.search_words, note.is_archived)
+            self._ranked_index = ranked_index
+        return self._ranked_index
 
     def add_note(self, note: Note) -> None:
         """
         Add a note to the notebook
         """
-        self.notes[note.note_id] = note
+        self.notes[note.note_id] = self._track(note)
+        self._removed.discard(note.note_id)
+        self._reindex(note)
+        if note.is_dirty:
+            self._dirty[note.note_id] = note
 
     def remove_note (self, note_id: str) -> None:
         """
@@ -26,6 +88,13 @@ class Notebook:
         """
         if note_id in self.notes:
             note = self.notes.pop(note_id)
+            note.set_change_listener(None)
+            self._dirty.pop(note_id, None)
+            self._removed.add(note_id)
+            if self._index is not None:
+                self._index.remove(note_id)
+            if self._ranked_index is not None:
+                self._ranked_index.remove(note_id)
             for tag in note.get_tags():
                 self.tag_manager.remove_tag(tag, EntityType.NOTE, note_id)
 
@@ -36,6 +105,42 @@ class Notebook:
         if note_id in self.notes:
             self.notes[note_id].update_text(new_text)
 
+    def add_tag_to_note(self, note_id: str, tag: str) -> Optional[Note]:
+        """
+        Add a tag to a note
+        """
+        note = self.notes.get(note_id)
+        if note:
+            note.add_tag(tag)
+        return note
+
+    def remove_tag_from_note(self, note_id: str, tag: str) -> Optional[Note]:
+        """
+        Remove a tag from a note
+        """
+        note = self.notes.get(note_id)
+        if note:
+            note.remove_tag(tag)
+        return note
+
+    def archive_note(self, note_id: str) -> Optional[Note]:
+        """
+        Archive a note
+        """
+        note = self.notes.get(note_id)
+        if note:
+            note.archive()
+        return note
+
+    def restore_note(self, note_id: str) -> Optional[Note]:
+        """
+        Restore an archived note
+        """
+        note = self.notes.get(note_id)
+        if note:
+            note.restore()
+        return note
+
     def find_note_by_id(self, note_id: str) -> Optional[Note]:
         """
         Find a note by its ID
@@ -44,16 +149,83 @@ class Notebook:
 
     def find_note_by_content(self, content: str) -> List[Note]:
         """
-        Find notes by content
+        Find notes by content, ordered by creation time.
+        The content and the texts are compared normalized, see utils.normalization.
+        The candidates are the notes with every trigram of the content, looked up in the text index,
+        and they are checked against the content.
+        """
+        content = normalize(content)
+        note_ids = self.index.search('text', content)
+        if note_ids is None:
+            # The content is too short or too common to look up, every note is a candidate
+            notes = self.notes.values()
+        else:
+            notes = (self.notes[note_id] for note_id in note_ids)
+        return sorted((note for note in notes if content in note.normalized_text), key=attrgetter('created_at'))
+
+    def rank_notes_by_content(self, content: str, limit: int = 10, include_archived: bool = False) -> List[Tuple[Note, float]]:
+        """
+        Find the notes that best match the words of the content, ordered by their BM25 score,
+        with the scores. The words are compared normalized and stemmed, so the inflected forms
+        of a word match each other. Archived notes are left out unless they are included
+        """
+        return [
+            (self.notes[note_id], score)
+            for note_id, score in self.ranked_index.search(stemmed_words(content), limit, include_archived)
+        ]
+
+    def query(self, text: str) -> List[Note]:
+        """
+        Find notes that match a query of `field:value` terms joined with AND, OR and NOT,
+        see services.query, ordered by creation time. Bare values are searched in the content
+        """
+        plan = QueryPlan(
+            parse_query(text, self.QUERY_FIELDS, 'content', self.FIELD_ALIASES),
+            self._candidates,
+            self._matches_note,
+            self.notes.keys
+        )
+        return sorted((self.notes[note_id] for note_id in plan.execute()), key=attrgetter('created_at'))
+
+    def _candidates(self, field: str, value: str) -> Optional[Set[str]]:
+        """
+        Return the ids of the notes that may match the normalized value in the field,
+        or None if every note has to be checked
+        """
+        if field == 'id':
+            return {value} if value in self.notes else set()
+        if field == 'tag':
+            # The tag index is loaded with the notes
+            notes = self.notes
+            return {note_id for note_id in self.tag_manager.search_by_tags([value], EntityType.NOTE) if note_id in notes}
+        return self.index.search('text', value)
+
+    def _matches_note(self, note_id: str, field: str, value: str) -> bool:
+        """
+        Check if a note matches the normalized value in the field
         """
-        return [note for note in self.notes.values() if content in note.text]
+        note = self.notes[note_id]
+        if field == 'id':
+            return note_id == value
+        if field == 'tag':
+            return any(normalize(tag) == value for tag in note.tags)
+        return value in note.normalized_text
 
     def find_notes_by_tag(self, tag: str) -> List[Note]:
         """
         Find notes by tag
         """
-        note_ids = self.tag_manager.search_by_tag(tag).get(EntityType.NOTE, [])
-        return [self.notes[note_id] for note_id in note_ids if note_id in self.notes]
+        return self.find_notes_by_tags([tag])
+
+    def find_notes_by_tags(self, tags: List[str], match_all: bool = True) -> List[Note]:
+        """
+        Find notes with all the tags, or with any of them, ordered by creation time.
+        The notes are looked up in the tag index, so only the found notes are loaded
+        """
+        # The tag index is loaded with the notes
+        notes = self.notes
+        found = (notes.get(note_id) for note_id in self.tag_manager.search_by_tags(tags, EntityType.NOTE, match_all))
+        return sorted((note for note in found if note is not None), key=attrgetter('created_at'))
 
     def get_active_notes(self) -> List[Note]:
         """
@@ -67,35 +239,126 @@ class Notebook:
         """
         return [note for note in self.notes.values() if note.is_archived]
 
-    def save(self) -> None:
+    @property
+    def pending_changes(self) -> int:
         """
-        Save the notes data to the storage service
+        Number of notes changed or removed since the last save
         """
+        return len(self._dirty) + len(self._removed)
+
+    def save(self, force: bool = False) -> int:
+        """
+        Save the notes data to the storage service when the save policy allows it.
+        Nothing is written if no note changed. Storage strategies that support incremental
+        saves receive only the changed notes. Returns the number of written records.
+        If the save fails in the background, the notes stay pending for the next save
+        """
+        if not self.pending_changes:
+            return 0
+        if not force and not self.save_policy.should_save(self.pending_changes, self._last_save):
+            return 0
+
+        dirty, removed = dict(self._dirty), set(self._removed)
 
-        data = {note_id: note.to_dict() for note_id, note in self.notes.items()}
-        self.storage_service.save_data(data, "notes_data")
+        def restore() -> None:
+            self._restore_changes(dirty, removed)
+
+        self.tag_manager.begin_save(self.storage_service, EntityType.NOTE, "notes_tags_data")
+        if self.storage_service.supports_changes:
+            changes = {note_id: note.to_dict() for note_id, note in self._dirty.items()}
+            changes.update((note_id, None) for note_id in self._removed)
+            self.storage_service.save_changes(changes, "notes_data", on_failure=restore)
+            written = len(changes)
+        else:
+            data = {note_id: note.to_dict() for note_id, note in self.notes.items()}
+            self.storage_service.save_data(data, "notes_data", on_failure=restore)
+            written = len(data)
+        self.tag_manager.save(self.storage_service, EntityType.NOTE, "notes_tags_data")
+
+        for note in self._dirty.values():
+            note.mark_clean()
+        self._dirty.clear()
+        self._removed.clear()
+        self._last_save = time.monotonic()
+        return written
+
+    def _restore_changes(self, dirty: Dict[str, Note], removed: Set[str]) -> None:
+        """
+        Put back the changes of a save that failed in the background, so the next save writes them again.
+        Changes made since that save take precedence
+        """
+        for note_id, note in dirty.items():
+            if note_id not in self._dirty and note_id not in self._removed:
+                note.is_dirty = True
+                self._dirty[note_id] = note
+                # Put back in case it was evicted since, not to be read again as stored
+                self.notes[note_id] = note
+        self._removed.update(note_id for note_id in removed if note_id not in self._dirty)
+
+    def flush(self) -> int:
+        """
+        Write all pending changes regardless of the save policy
+        """
+        return self.save(force=True)
+
+    def reshard(self, shards: int) -> None:
+        """
+        Write the pending changes and repartition the stored notes into the given number of shards
+        """
+        self.flush()
+        self.storage_service.reshard("notes_data", shards)
 
     def load(self) -> None:
         """
-        Load the notes data from the storage service
-        """
-        data: Dict[str, Note] = self.storage_service.load_data("notes_data")
-        for note_id, note_data in data.items():
-            note = Note(
-                text=note_data['text'],
-                tag_manager=self.tag_manager,
-                tags=note_data['tags'],
-                note_id=note_data['note_id']
-            )
-            note.note_history = [NoteHistoryEntry.from_dict(entry) for entry in note_data['note_history']]
-            note.created_at = datetime.fromisoformat(note_data['created_at'])
-            note.updated_at = datetime.fromisoformat(note_data['updated_at'])
-            note.is_archived = note_data['is_archived']
-            self.notes[note_id] = note
+        Load the notes data from the storage service.
+        With a record-level storage the notes are read one by one, when first accessed,
+        unless the storage loads its chunks in parallel: then all notes are loaded at once.
+        The tag index is loaded with the notes; data saved without it is read once to rebuild it.
+        """
+        indexed = self.tag_manager.load(self.storage_service, EntityType.NOTE, "notes_tags_data")
+
+        def hydrate(data: dict) -> Note:
+            return self._track(Note.from_dict(data, self.tag_manager, register_tags=not indexed))
+
+        if self.storage_service.supports_records and not self.storage_service.parallel_load:
+            self.notes = LazyRecords(self.storage_service, "notes_data", hydrate)
+        else:
+            self.notes = {note_id: hydrate(note_data) for note_id, note_data in self.storage_service.iter_data("notes_data")}
+        if not indexed:
+            self._rebuild_tag_index()
+
+    def _rebuild_tag_index(self) -> None:
+        """
+        Register the tags of all notes and save the tag index, if there are notes
+        """
+        if isinstance(self.notes, LazyRecords):
+            self.notes.hydrate_all()
+        if self.notes:
+            self.tag_manager.save(self.storage_service, EntityType.NOTE, "notes_tags_data")
+
+    def _track(self, note: Note) -> Note:
+        """
+        Subscribe to the note's changes, so it is saved with the next save
+        """
+        note.set_change_listener(self._note_changed)
+        return note
+
+    def _note_changed(self, note: Note) -> None:
+        self._dirty[note.note_id] = note
+        self._reindex(note)
+
+    def _reindex(self, note: Note) -> None:
+        """
+        Update the built text indexes with the note's text and archive state
+        """
+        if self._index is not None:
+            self._index.add(note.note_id, {'text': [note.normalized_text]})
+        if self._ranked_index is not None:
+            self._ranked_index.add(note.note_id, note.search_words, note.is_archived)
 
     def __enter__(self) -> 'Notebook':
         self.load()
         return self
 
     def __exit__(self, *args) -> None:
-        self.save()
+        self.flush()
@@ -0,0 +1,251 @@
+"""
+This module contains the query language of the search commands and the QueryPlan class
+that evaluates a query over the posting sets of the search indexes.
+
+A query is made of `field:value` terms, or bare values searched in the default field,
+combined with AND, OR, NOT and parentheses; adjacent terms are joined with AND and
+values with spaces are quoted: `name:іван AND tag:work AND NOT city:київ`,
+`tag:urgent OR content:"звіт"`. The values are normalized, as search compares them.
+
+Every term is looked up in the index of its field, which returns the ids of the records
+that may match it, and the candidates are checked against the term. The terms of an AND
+are evaluated from the most selective one, and every next term only checks the records
+left by the previous ones, so the intersection stops as soon as it is empty. A term
+without an index, or whose posting set is larger than the records left, checks the
+records left one by one; it scans all records only if nothing restricts it.
+"""
+import math
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from personal_assistant.utils.normalization import normalize
+
+TOKEN_PATTERN = re.compile(
+    r'\s*(?:(?P<open>\()|(?P<close>\))'
+    r'|(?:(?P<field>[A-Za-z_]+):)?(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<word>[^\s()"]+))?)'
+)
+OPERATORS = ('AND', 'OR', 'NOT')
+
+Node = Union['Term', 'And', 'Or', 'Not']
+
+class Term:
+    """
+    A `field:value` predicate of a query
+    """
+    __slots__ = ('field', 'value')
+
+    def __init__(self, field: str, value: str) -> None:
+        self.field: str = field
+        self.value: str = value
+
+    def __repr__(self) -> str:
+        return f"Term({self.field}:{self.value!r})"
+
+class And:
+    """
+    The records that match every child
+    """
+    __slots__ = ('children',)
+
+    def __init__(self, children: List['Node']) -> None:
+        self.children: List['Node'] = children
+
+    def __repr__(self) -> str:
+        return f"And({self.children!r})"
+
+class Or:
+    """
+    The records that match any child
+    """
+    __slots__ = ('children',)
+
+    def __init__(self, children: List['Node']) -> None:
+        self.children: List['Node'] = children
+
+    def __repr__(self) -> str:
+        return f"Or({self.children!r})"
+
+class Not:
+    """
+    The records that don't match the child
+    """
+    __slots__ = ('child',)
+
+    def __init__(self, child: 'Node') -> None:
+        self.child: 'Node' = child
+
+    def __repr__(self) -> str:
+        return f"Not({self.child!r})"
+
+def tokenize_query(text: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Split a query into (kind, field, value) tokens: 'open', 'close', an operator or a 'term'
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        position = match.end()
+        if match.group('open'):
+            tokens.append(('open', None, None))
+        elif match.group('close'):
+            tokens.append(('close', None, None))
+        elif match.group('quoted') is not None:
+            tokens.append(('term', match.group('field'), re.sub(r'\\(.)', r'\1', match.group('quoted'))))
+        elif match.group('word') is not None:
+            word, field = match.group('word'), match.group('field')
+            tokens.append((word, None, None) if field is None and word in OPERATORS else ('term', field, word))
+        elif match.group('field'):
+            raise ValueError(f"Не вказано значення поля {match.group('field')} у запиті")
+        else:
+            raise ValueError(f"Незакриті лапки у запиті: {text[match.start():].strip()}")
+    return tokens
+
+def parse_query(text: str, fields: Iterable[str], default_field: str, aliases: Optional[Dict[str, str]] = None) -> Node:
+    """
+    Parse a query into a tree of terms and operators.
+    Field names are checked against the fields of the search, after their aliases are resolved.
+    """
+    fields = set(fields)
+    aliases = aliases or {}
+    tokens = tokenize_query(text)
+    position = 0
+
+    def peek() -> Optional[str]:
+        return tokens[position][0] if position < len(tokens) else None
+
+    def parse_or() -> Node:
+        nonlocal position
+        children = [parse_and()]
+        while peek() == 'OR':
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and() -> Node:
+        nonlocal position
+        children = [parse_not()]
+        while peek() not in (None, 'OR', 'close'):
+            if peek() == 'AND':
+                position += 1
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not() -> Node:
+        nonlocal position
+        if peek() == 'NOT':
+            position += 1
+            return Not(parse_not())
+        return parse_primary()
+
+    def parse_primary() -> Node:
+        nonlocal position
+        if position >= len(tokens):
+            raise ValueError("Запит закінчується оператором")
+        kind, field, value = tokens[position]
+        position += 1
+        if kind == 'open':
+            node = parse_or()
+            if peek() != 'close':
+                raise ValueError("Незакрита дужка у запиті")
+            position += 1
+            return node
+        if kind != 'term':
+            raise ValueError(f"Очікувалася умова замість {kind if kind != 'close' else ')'}")
+        field = field.lower() if field else default_field
+        field = aliases.get(field, field)
+        if field not in fields:
+            raise ValueError(f"Невідоме поле запиту: {field}. Доступні поля: {', '.join(sorted(fields))}")
+        return Term(field, normalize(value))
+
+    if not tokens:
+        raise ValueError("Порожній запит")
+    node = parse_or()
+    if position < len(tokens):
+        raise ValueError("Зайва закриваюча дужка у запиті")
+    return node
+
+class QueryPlan:
+    """
+    Evaluation of a parsed query over the search indexes of a collection of records.
+    `candidates(field, value)` returns the ids of the records that may match a term, from the
+    index of the field, or None if the field has no index for the value; `matches(record_id, field, value)`
+    checks a record against a term; `record_ids()` returns the ids of all records.
+    """
+    def __init__(
+            self,
+            query: Node,
+            candidates: Callable[[str, str], Optional[Set[str]]],
+            matches: Callable[[str, str, str], bool],
+            record_ids: Callable[[], Iterable[str]]
+        ) -> None:
+        self.query: Node = query
+        self._candidates = candidates
+        self._matches = matches
+        self._record_ids = record_ids
+        # The index lookups of the terms, shared by the estimates and the evaluation
+        self._lookups: Dict[Tuple[str, str], Optional[Set[str]]] = {}
+
+    def execute(self) -> Set[str]:
+        """
+        Return the ids of the records that match the query
+        """
+        return self._evaluate(self.query, None)
+
+    def _lookup(self, term: Term) -> Optional[Set[str]]:
+        key = (term.field, term.value)
+        if key not in self._lookups:
+            self._lookups[key] = self._candidates(term.field, term.value)
+        return self._lookups[key]
+
+    def _estimate(self, node: Node) -> float:
+        """
+        Return the number of records the node may match, infinite if it can't be looked up
+        """
+        if isinstance(node, Term):
+            candidates = self._lookup(node)
+            return math.inf if candidates is None else len(candidates)
+        if isinstance(node, And):
+            return min(self._estimate(child) for child in node.children)
+        if isinstance(node, Or):
+            return sum(self._estimate(child) for child in node.children)
+        return math.inf
+
+    def _evaluate(self, node: Node, within: Optional[Set[str]]) -> Set[str]:
+        """
+        Return the ids of the records that match the node, among `within` unless it's None
+        """
+        if isinstance(node, Term):
+            return self._evaluate_term(node, within)
+        if isinstance(node, And):
+            # Negations only filter the records left, so they come after the positive children
+            children = sorted(node.children, key=lambda child: (isinstance(child, Not), self._estimate(child)))
+            result = within
+            for child in children:
+                if isinstance(child, Not):
+                    base = result if result is not None else set(self._record_ids())
+                    result = base - self._evaluate(child.child, base)
+                else:
+                    result = self._evaluate(child, result)
+                if not result:
+                    return set()
+            return result
+        if isinstance(node, Or):
+            result: Set[str] = set()
+            for child in node.children:
+                result |= self._evaluate(child, within)
+                if within is not None and len(result) == len(within):
+                    break
+            return result
+        base = within if within is not None else set(self._record_ids())
+        return base - self._evaluate(node.child, base)
+
+    def _evaluate_term(self, term: Term, within: Optional[Set[str]]) -> Set[str]:
+        candidates = self._lookup(term)
+        if candidates is None:
+            records = within if within is not None else self._record_ids()
+        else:
+            # The intersection iterates the smaller of the two sets
+            records = candidates if within is None else candidates & within
+        return {record_id for record_id in records if self._matches(record_id, term.field, term.value)}
@@ -0,0 +1,55 @@
+"""
+This module contains the SavePolicy class which decides when pending changes
+of the address book and the notebook are written to the storage.
+"""
+import os
+import time
+from dotenv import load_dotenv
+
+class SavePolicy:
+    """
+    Policy for coalescing saves:
+    - immediate: every save request writes the pending changes;
+    - debounce: writes at most once per `interval` seconds, later requests are coalesced;
+    - changes: writes once `max_changes` changed records are pending.
+    Pending changes are always written on flush, e.g. when the program exits.
+    """
+    IMMEDIATE = 'immediate'
+    DEBOUNCE = 'debounce'
+    CHANGES = 'changes'
+    MODES = (IMMEDIATE, DEBOUNCE, CHANGES)
+
+    def __init__(self, mode: str = IMMEDIATE, interval: float = 2.0, max_changes: int = 50) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown save policy: {mode}. Use one of: {', '.join(self.MODES)}")
+        self.mode: str = mode
+        self.interval: float = interval
+        self.max_changes: int = max_changes
+
+    @classmethod
+    def from_env(cls) -> 'SavePolicy':
+        """
+        Create the policy from the SAVE_POLICY, SAVE_DEBOUNCE_SECONDS and SAVE_EVERY_CHANGES settings
+        """
+        load_dotenv()
+        return cls(
+            mode=os.getenv('SAVE_POLICY', cls.IMMEDIATE),
+            interval=float(os.getenv('SAVE_DEBOUNCE_SECONDS', '2.0')),
+            max_changes=int(os.getenv('SAVE_EVERY_CHANGES', '50'))
+        )
+
+    def should_save(self, pending_changes: int, last_save: float) -> bool:
+        """
+        Check if the pending changes should be written now.
+        `last_save` is the time.monotonic() value of the previous write.
+        """
+        if pending_changes == 0:
+            return False
+        if self.mode == self.DEBOUNCE:
+            return time.monotonic() - last_save >= self.interval
+        if self.mode == self.CHANGES:
+            return pending_changes >= self.max_changes
+        return True
+
+    def __str__(self) -> str:
+        return f"SavePolicy(mode={self.mode}, interval={self.interval}, max_changes={self.max_changes})"
@@ -1,11 +1,40 @@
 """
 Module for the base storage class.
 """
+import os
+import zlib
 from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+def bucket_for(key: str, buckets: int) -> int:
+    """Return the stable bucket number (0 <= n < buckets) of a record key."""
+    return zlib.crc32(key.encode('utf-8')) % buckets
+
+def atomic_write(path: str, payload: bytes) -> None:
+    """Write the payload to a temporary file and rename it over the target path."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(payload)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
 
 class Storage(ABC):
     """Abstract base class for storage strategies."""
 
+    # Strategies that can persist single record changes (see save_changes)
+    # set this flag, so callers don't have to rewrite the whole dataset.
+    incremental: bool = False
+
+    # Strategies that store the data in independently readable chunks (see load_chunk)
+    # set this flag, so the chunks can be decrypted and parsed in parallel.
+    chunked: bool = False
+
+    # Strategies that detect any change of the stored data (an authenticated cipher
+    # or a checksum) set this flag, so the records can be hydrated without re-validation.
+    # A strategy that can also read data it can't check reports it from what it has read.
+    verified: bool = False
+
     @abstractmethod
     def save(self, data: dict, path: str) -> None:
         """Save data to the specified path."""
@@ -15,3 +44,81 @@ class Storage(ABC):
     def load(self, path: str) -> dict:
         """Load data from the specified path."""
         pass
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield the top-level (key, value) pairs stored at the specified path.
+        Strategies that can parse records one at a time override this to avoid
+        building the whole dictionary in memory.
+        """
+        yield from self.load(path).items()
+
+    def serialize(self, data: dict) -> bytes:
+        """Convert data into the bytes this strategy writes to disk."""
+        raise NotImplementedError(f"{type(self).__name__} does not support serialization to bytes")
+
+    def deserialize(self, payload: bytes) -> dict:
+        """Convert bytes produced by serialize back into data."""
+        raise NotImplementedError(f"{type(self).__name__} does not support deserialization from bytes")
+
+    def chunks(self, path: str) -> List[int]:
+        """Return the ids of the chunks the data at the specified path is stored in."""
+        raise NotImplementedError(f"{type(self).__name__} does not store the data in chunks")
+
+    def load_chunk(self, chunk: int, path: str) -> dict:
+        """Load the records of a single chunk."""
+        raise NotImplementedError(f"{type(self).__name__} does not store the data in chunks")
+
+    def exists(self, path: str) -> bool:
+        """Check whether there is stored data at the specified path."""
+        return os.path.exists(path)
+
+    def save_changes(self, changes: Dict[str, Optional[dict]], path: str) -> None:
+        """
+        Persist changed records only. A key mapped to None means the record was removed.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support incremental saves")
+
+class RecordStorage(Storage):
+    """
+    Abstract base class for storage strategies that can read and write single records
+    without loading or rewriting the whole dataset.
+    """
+    incremental = True
+
+    @abstractmethod
+    def get(self, key: str, path: str) -> Optional[dict]:
+        """Return the record with the given key, or None if there is no such record."""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, value: dict, path: str) -> None:
+        """Insert or replace the record with the given key."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str, path: str) -> None:
+        """Delete the record with the given key."""
+        pass
+
+    @abstractmethod
+    def keys(self, path: str) -> List[str]:
+        """Return the keys of all stored records."""
+        pass
+
+    @abstractmethod
+    def find(self, field: str, value, path: str) -> Dict[str, dict]:
+        """Return the records whose top-level field equals the given value."""
+        pass
+
+    @abstractmethod
+    def range(self, start: str, end: str, path: str) -> Dict[str, dict]:
+        """Return the records with start <= key < end, ordered by key."""
+        pass
+
+    def save_changes(self, changes: Dict[str, Optional[dict]], path: str) -> None:
+        for key, value in changes.items():
+            if value is None:
+                self.delete(key, path)
+            else:
+                self.put(key, value, path)
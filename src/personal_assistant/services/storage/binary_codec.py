@@ -0,0 +1,253 @@
+"""
+Compact binary encoding of the contact and note records.
+
+Every value is written as a one byte tag followed by its payload. Fields whose
+meaning is known are stored in their natural binary form instead of text:
+- birthdays ("birthday") as the ordinal of the date;
+- timestamps ("created_at", "updated_at", "timestamp") as microseconds since the epoch;
+- phone numbers ("phone_numbers") as packed digits;
+- tags ("tags") and field names as indices into a shared string table.
+
+Decoding returns `date` and `datetime` objects for the date fields, so the models
+don't have to parse them again.
+"""
+import struct
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+NONE = 0x00
+TRUE = 0x01
+FALSE = 0x02
+INT = 0x03
+FLOAT = 0x04
+STRING = 0x05
+STRING_REF = 0x06
+LIST = 0x07
+MAP = 0x08
+DATE = 0x09
+TIMESTAMP = 0x0A
+PHONE = 0x0B
+
+DATE_FIELDS = frozenset({"birthday"})
+TIMESTAMP_FIELDS = frozenset({"created_at", "updated_at", "timestamp"})
+PHONE_FIELDS = frozenset({"phone_numbers"})
+INTERNED_FIELDS = frozenset({"tags"})
+
+# Single byte tags, prebuilt for the encoder
+TAG_BYTES = [bytes((tag,)) for tag in range(PHONE + 1)]
+SMALL_VARINTS = [bytes((value,)) for value in range(0x80)]
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+INT64 = struct.Struct("<q")
+FLOAT64 = struct.Struct("<d")
+ORDINAL = struct.Struct("<I")
+
+def encode_varint(value: int) -> bytes:
+    """Encode a non-negative int in 7-bit groups, least significant first."""
+    if value < 0x80:
+        return SMALL_VARINTS[value]
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def decode_varint(buffer: bytes, position: int) -> Tuple[int, int]:
+    """Return the decoded int and the position after it."""
+    byte = buffer[position]
+    if byte < 0x80:
+        return byte, position + 1
+    result, shift = 0, 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+def parse_birthday(value: str) -> date:
+    """Parse a birthday stored by Birthday.to_dict() in the "dd.mm.yyyy" format."""
+    if len(value) != 10 or value[2] != '.' or value[5] != '.':
+        raise ValueError(f"Not a dd.mm.yyyy date: {value!r}")
+    return date(int(value[6:10]), int(value[3:5]), int(value[0:2]))
+
+class BinaryEncoder:
+    """
+    Encodes values into the binary format, collecting the interned strings in a table
+    that has to be written before the encoded values.
+    """
+    def __init__(self, strings: Optional[List[str]] = None) -> None:
+        # Starting from the string table of existing data keeps its encoded values valid
+        self.strings: List[str] = list(strings or [])
+        self._string_indices: Dict[str, int] = {string: index for index, string in enumerate(self.strings)}
+
+    def string_table(self) -> bytes:
+        """Return the encoded string table: the number of strings followed by the strings."""
+        parts = [encode_varint(len(self.strings))]
+        for string in self.strings:
+            encoded = string.encode('utf-8')
+            parts.append(encode_varint(len(encoded)))
+            parts.append(encoded)
+        return b''.join(parts)
+
+    def encode(self, value: Any, field: str = None) -> bytes:
+        """Encode a value; `field` is the name of the field holding it, if any."""
+        parts: List[bytes] = []
+        self._encode(value, field, parts)
+        return b''.join(parts)
+
+    def _intern(self, string: str) -> int:
+        index = self._string_indices.get(string)
+        if index is None:
+            index = self._string_indices[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def _encode(self, value: Any, field: str, parts: List[bytes]) -> None:
+        if value is None:
+            parts.append(TAG_BYTES[NONE])
+        elif value is True:
+            parts.append(TAG_BYTES[TRUE])
+        elif value is False:
+            parts.append(TAG_BYTES[FALSE])
+        elif isinstance(value, str):
+            self._encode_string(value, field, parts)
+        elif isinstance(value, dict):
+            parts.append(TAG_BYTES[MAP])
+            parts.append(encode_varint(len(value)))
+            for key, item in value.items():
+                parts.append(encode_varint(self._intern(key)))
+                self._encode(item, key, parts)
+        elif isinstance(value, (list, tuple)):
+            parts.append(TAG_BYTES[LIST])
+            parts.append(encode_varint(len(value)))
+            for item in value:
+                self._encode(item, field, parts)
+        elif isinstance(value, int):
+            parts.append(TAG_BYTES[INT])
+            parts.append(INT64.pack(value))
+        elif isinstance(value, float):
+            parts.append(TAG_BYTES[FLOAT])
+            parts.append(FLOAT64.pack(value))
+        elif isinstance(value, datetime) and value.tzinfo is None:
+            parts.append(TAG_BYTES[TIMESTAMP])
+            parts.append(INT64.pack((value - EPOCH) // MICROSECOND))
+        elif isinstance(value, date) and not isinstance(value, datetime):
+            parts.append(TAG_BYTES[DATE])
+            parts.append(ORDINAL.pack(value.toordinal()))
+        else:
+            raise TypeError(f"Can't encode value of type {type(value).__name__}")
+
+    def _encode_string(self, value: str, field: str, parts: List[bytes]) -> None:
+        if field in INTERNED_FIELDS:
+            parts.append(TAG_BYTES[STRING_REF])
+            parts.append(encode_varint(self._intern(value)))
+            return
+        if field in PHONE_FIELDS and value.isascii() and value.isdigit() and len(value) < 0x80:
+            number = int(value)
+            packed = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+            parts.append(bytes((PHONE, len(value), len(packed))))
+            parts.append(packed)
+            return
+        try:
+            if field in DATE_FIELDS:
+                self._encode(parse_birthday(value), None, parts)
+                return
+            if field in TIMESTAMP_FIELDS:
+                self._encode(datetime.fromisoformat(value), None, parts)
+                return
+        except (ValueError, TypeError):
+            # Not in the expected format, keep the text as is
+            pass
+        encoded = value.encode('utf-8')
+        parts.append(TAG_BYTES[STRING])
+        parts.append(encode_varint(len(encoded)))
+        parts.append(encoded)
+
+class BinaryDecoder:
+    """
+    Decodes values written by BinaryEncoder using its string table.
+    """
+    def __init__(self, strings: List[str]) -> None:
+        self.strings = strings
+
+    @staticmethod
+    def read_string_table(buffer: bytes, position: int) -> Tuple[List[str], int]:
+        """Return the strings of the table at the position and the position after it."""
+        count, position = decode_varint(buffer, position)
+        strings = []
+        for _ in range(count):
+            length, position = decode_varint(buffer, position)
+            strings.append(str(buffer[position:position + length], 'utf-8'))
+            position += length
+        return strings, position
+
+    def decode(self, buffer: bytes, position: int = 0) -> Tuple[Any, int]:
+        """Return the value at the position and the position after it."""
+        # The most frequent tags come first and the one byte varints are decoded inline,
+        # this is the hot loop of loading a snapshot
+        tag = buffer[position]
+        position += 1
+        if tag == STRING:
+            length = buffer[position]
+            if length < 0x80:
+                position += 1
+            else:
+                length, position = decode_varint(buffer, position)
+            end = position + length
+            return str(buffer[position:end], 'utf-8'), end
+        if tag == MAP:
+            count = buffer[position]
+            if count < 0x80:
+                position += 1
+            else:
+                count, position = decode_varint(buffer, position)
+            strings = self.strings
+            decode = self.decode
+            result = {}
+            for _ in range(count):
+                index = buffer[position]
+                if index < 0x80:
+                    position += 1
+                else:
+                    index, position = decode_varint(buffer, position)
+                result[strings[index]], position = decode(buffer, position)
+            return result, position
+        if tag == STRING_REF:
+            index = buffer[position]
+            if index < 0x80:
+                return self.strings[index], position + 1
+            index, position = decode_varint(buffer, position)
+            return self.strings[index], position
+        if tag == NONE:
+            return None, position
+        if tag == LIST:
+            count, position = decode_varint(buffer, position)
+            decode = self.decode
+            items = []
+            for _ in range(count):
+                item, position = decode(buffer, position)
+                items.append(item)
+            return items, position
+        if tag == TRUE:
+            return True, position
+        if tag == FALSE:
+            return False, position
+        if tag == PHONE:
+            digits, length = buffer[position], buffer[position + 1]
+            position += 2
+            number = int.from_bytes(buffer[position:position + length], 'big')
+            return str(number).zfill(digits), position + length
+        if tag == DATE:
+            return date.fromordinal(ORDINAL.unpack_from(buffer, position)[0]), position + ORDINAL.size
+        if tag == TIMESTAMP:
+            return EPOCH + INT64.unpack_from(buffer, position)[0] * MICROSECOND, position + INT64.size
+        if tag == INT:
+            return INT64.unpack_from(buffer, position)[0], position + INT64.size
+        if tag == FLOAT:
+            return FLOAT64.unpack_from(buffer, position)[0], position + FLOAT64.size
+        raise ValueError(f"Unknown value tag {tag:#04x} at position {position - 1}")
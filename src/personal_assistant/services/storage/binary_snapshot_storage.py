@@ -0,0 +1,79 @@
+"""
+A storage strategy that keeps the data in a compact, versioned binary snapshot.
+
+Layout of a snapshot file:
+- magic bytes b"PASB" and a one byte format version;
+- the string table: field names and tags interned by BinaryEncoder;
+- the number of records;
+- every record as its length-prefixed id followed by its length-prefixed encoded value.
+
+The record values are encoded by binary_codec: dates, timestamps and phone numbers
+are stored as numbers, so loading doesn't parse any text except the strings themselves.
+"""
+from typing import Any, Iterator, Tuple
+from .base_storage import Storage, atomic_write
+from .binary_codec import BinaryDecoder, BinaryEncoder, decode_varint, encode_varint
+
+MAGIC = b"PASB"
+VERSION = 1
+
+class BinarySnapshotStorage(Storage):
+    """Storage strategy for the binary snapshot format."""
+
+    def save(self, data: dict, path: str) -> None:
+        try:
+            atomic_write(path, self.serialize(data))
+        except IOError as e:
+            raise IOError(f"Failed to save data to {path}: {e}")
+
+    def load(self, path: str) -> dict:
+        return dict(self.iter_load(path))
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except IOError as e:
+            raise IOError(f"Failed to load data from {path}: {e}")
+        yield from self.iter_records(payload)
+
+    def serialize(self, data: dict) -> bytes:
+        encoder = BinaryEncoder()
+        records = [encode_varint(len(data))]
+        for key, value in data.items():
+            encoded_key = key.encode('utf-8')
+            encoded_value = encoder.encode(value)
+            records.append(encode_varint(len(encoded_key)))
+            records.append(encoded_key)
+            records.append(encode_varint(len(encoded_value)))
+            records.append(encoded_value)
+        # The string table is complete only after all records are encoded
+        return b''.join([MAGIC, bytes((VERSION,)), encoder.string_table()] + records)
+
+    def deserialize(self, payload: bytes) -> dict:
+        return dict(self.iter_records(payload))
+
+    def iter_records(self, payload: bytes) -> Iterator[Tuple[str, Any]]:
+        """Decode the records of a snapshot one at a time."""
+        decoder, position = self.read_header(payload)
+        count, position = decode_varint(payload, position)
+        for _ in range(count):
+            length, position = decode_varint(payload, position)
+            key = str(payload[position:position + length], 'utf-8')
+            length, position = decode_varint(payload, position + length)
+            value, end = decoder.decode(payload, position)
+            if end != position + length:
+                raise ValueError(f"Corrupted binary snapshot record {key!r}")
+            position = end
+            yield key, value
+
+    @staticmethod
+    def read_header(payload: bytes) -> Tuple[BinaryDecoder, int]:
+        """Check the magic bytes and the version, and return the decoder and the position after the string table."""
+        if payload[:len(MAGIC)] != MAGIC:
+            raise ValueError("Data is not a binary snapshot")
+        version = payload[len(MAGIC)]
+        if version != VERSION:
+            raise ValueError(f"Unsupported binary snapshot version: {version}")
+        strings, position = BinaryDecoder.read_string_table(payload, len(MAGIC) + 1)
+        return BinaryDecoder(strings), position
@@ -0,0 +1,175 @@
+"""
+A content-addressed store for the long texts of the records.
+
+The texts of the BLOB_FIELDS fields ("text" of notes and their history keyframes,
+"base" of the history) are moved out of the records into blobs keyed by the hash
+of the text, and the records keep a `{"$blob": "<hash>"}` reference instead.
+A text repeated in many records (a contact's note, a templated note) is stored once.
+
+The blobs are a dataset of the same storage strategy, so they are encrypted and
+compressed like the rest of the data. Every blob holds its text, or, when that is
+smaller, the zlib-compressed text. Blobs that no record references anymore are
+removed by collect_garbage.
+"""
+import base64
+import hashlib
+import zlib
+from typing import Any, Dict, Iterable, Optional, Set
+from .base_storage import RecordStorage, Storage
+
+BLOB_FIELDS = frozenset({"text", "base"})
+REFERENCE_KEY = "$blob"
+
+class BlobStore:
+    """
+    Content-addressed text blobs stored with the given strategy at the given path.
+    """
+    def __init__(self, strategy: Storage, path: str, min_size: int = 64) -> None:
+        self.strategy = strategy
+        self.path = path
+        self.min_size = min_size
+        self._texts: Dict[str, str] = {}
+        self._pending: Dict[str, dict] = {}
+        self._stored: Optional[Set[str]] = None
+        self._loaded = False
+
+    @staticmethod
+    def digest(text: str) -> str:
+        """Return the key of the blob holding the text."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+    def externalize(self, value: Any) -> Any:
+        """
+        Return a copy of the record with the long texts replaced by blob references.
+        The new blobs are returned by the next take_pending call.
+        """
+        if isinstance(value, dict):
+            return {
+                key: self._put(item) if key in BLOB_FIELDS and isinstance(item, str) and len(item) >= self.min_size
+                else self.externalize(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self.externalize(item) for item in value]
+        return value
+
+    def resolve(self, value: Any) -> Any:
+        """
+        Return the record with the blob references replaced by their texts
+        """
+        if isinstance(value, dict):
+            if REFERENCE_KEY in value and len(value) == 1:
+                return self.get(value[REFERENCE_KEY])
+            return {key: self.resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(item) for item in value]
+        return value
+
+    def get(self, digest: str) -> str:
+        """Return the text of the blob."""
+        if digest in self._pending:
+            return self._decode(self._pending[digest])
+        if isinstance(self.strategy, RecordStorage):
+            blob = self.strategy.get(digest, self.path)
+            if blob is None:
+                raise KeyError(f"Missing blob {digest}")
+            return self._decode(blob)
+
+        # Strategies that can't read single records keep all texts in memory
+        self._load()
+        if digest not in self._texts:
+            raise KeyError(f"Missing blob {digest}")
+        return self._texts[digest]
+
+    def take_pending(self) -> Dict[str, dict]:
+        """Return the blobs created since the last call, to be written before the records that reference them."""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def write(self, blobs: Dict[str, dict]) -> None:
+        """Write the blobs returned by take_pending."""
+        if not blobs:
+            return
+        if self.strategy.incremental:
+            self.strategy.save_changes(blobs, self.path)
+        else:
+            stored = self.strategy.load(self.path) if self.strategy.exists(self.path) else {}
+            stored.update(blobs)
+            self.strategy.save(stored, self.path)
+        self._stored_digests().update(blobs)
+        if self._loaded:
+            self._texts.update((digest, self._decode(blob)) for digest, blob in blobs.items())
+
+    def collect_garbage(self, referenced: Iterable[str]) -> int:
+        """
+        Remove the stored blobs that are not in the referenced set.
+        Returns the number of removed blobs.
+        """
+        self.write(self.take_pending())
+        unused = self._stored_digests() - set(referenced)
+        if not unused:
+            return 0
+        if self.strategy.incremental:
+            self.strategy.save_changes({digest: None for digest in unused}, self.path)
+        else:
+            blobs = self.strategy.load(self.path)
+            self.strategy.save({digest: blob for digest, blob in blobs.items() if digest not in unused}, self.path)
+        self._stored -= unused
+        for digest in unused:
+            self._texts.pop(digest, None)
+        return len(unused)
+
+    @staticmethod
+    def references(value: Any) -> Iterable[str]:
+        """Yield the blob keys referenced by a stored record."""
+        if isinstance(value, dict):
+            if REFERENCE_KEY in value and len(value) == 1:
+                yield value[REFERENCE_KEY]
+                return
+            for item in value.values():
+                yield from BlobStore.references(item)
+        elif isinstance(value, list):
+            for item in value:
+                yield from BlobStore.references(item)
+
+    def _put(self, text: str) -> dict:
+        """Store the text, once, and return its reference."""
+        digest = self.digest(text)
+        if digest not in self._pending and digest not in self._stored_digests():
+            self._pending[digest] = self._encode(text)
+        return {REFERENCE_KEY: digest}
+
+    def _stored_digests(self) -> Set[str]:
+        """The keys of the blobs on disk, read on first use."""
+        if self._stored is None:
+            if not self.strategy.exists(self.path):
+                self._stored = set()
+            elif isinstance(self.strategy, RecordStorage):
+                self._stored = set(self.strategy.keys(self.path))
+            else:
+                self._load()
+        return self._stored
+
+    def _load(self) -> None:
+        """Read all blobs of a strategy that can't read them one by one."""
+        if self._loaded:
+            return
+        self._loaded = True
+        blobs = self.strategy.load(self.path) if self.strategy.exists(self.path) else {}
+        for digest, blob in blobs.items():
+            self._texts.setdefault(digest, self._decode(blob))
+        self._stored = set(blobs)
+
+    @staticmethod
+    def _encode(text: str) -> dict:
+        raw = text.encode('utf-8')
+        compressed = base64.b64encode(zlib.compress(raw, 9)).decode('ascii')
+        if len(compressed) < len(raw):
+            return {"z": compressed}
+        return {"text": text}
+
+    @staticmethod
+    def _decode(blob: dict) -> str:
+        if "z" in blob:
+            return zlib.decompress(base64.b64decode(blob["z"])).decode('utf-8')
+        return blob["text"]
@@ -0,0 +1,71 @@
+"""
+A storage strategy that protects the payload of another strategy with a checksum.
+
+The payload starts with the b"PAC" marker and the BLAKE2b digest of the inner payload,
+which is checked on every read, so a changed or corrupted file is rejected before its
+records are hydrated without validation. Payloads without the marker (written before
+the checksum was added, or with the header stripped) are passed to the inner strategy
+as is, and get the checksum with the next save; once such a payload is read, the
+storage no longer reports its data as verified, so the records are validated.
+"""
+import hashlib
+from .base_storage import Storage, atomic_write
+
+MAGIC = b"PAC"
+DIGEST_SIZE = 16
+
+class ChecksummedStorage(Storage):
+    """
+    Storage strategy that adds an integrity checksum to the serialized data of the inner strategy.
+    """
+    def __init__(self, strategy: Storage) -> None:
+        self.strategy = strategy
+        # Set once a payload without the checksum is read
+        self.unchecked_read: bool = False
+
+    @property
+    def verified(self) -> bool:
+        """Whether every payload read so far had its checksum checked."""
+        return not self.unchecked_read
+
+    def save(self, data: dict, path: str) -> None:
+        try:
+            atomic_write(path, self.serialize(data))
+        except IOError as e:
+            raise IOError(f"Failed to save data to {path}: {e}")
+
+    def load(self, path: str) -> dict:
+        try:
+            with open(path, 'rb') as file:
+                payload = file.read()
+        except IOError as e:
+            raise IOError(f"Failed to load data from {path}: {e}")
+        try:
+            return self.deserialize(payload)
+        except ValueError as e:
+            raise ValueError(f"Data in {path} is corrupted: {e}")
+
+    def serialize(self, data: dict) -> bytes:
+        payload = self.strategy.serialize(data)
+        return MAGIC + self.digest(payload) + payload
+
+    def deserialize(self, payload: bytes) -> dict:
+        if payload[:len(MAGIC)] != MAGIC:
+            self.unchecked_read = True
+        return self.strategy.deserialize(self.verify(payload))
+
+    @staticmethod
+    def digest(payload: bytes) -> bytes:
+        """Return the checksum of the payload."""
+        return hashlib.blake2b(payload, digest_size=DIGEST_SIZE).digest()
+
+    @classmethod
+    def verify(cls, payload: bytes) -> bytes:
+        """Check the payload against its checksum and return it without the header; payloads without the header are returned as is."""
+        if payload[:len(MAGIC)] != MAGIC:
+            return payload
+        start = len(MAGIC) + DIGEST_SIZE
+        body = memoryview(payload)[start:]
+        if cls.digest(body) != payload[len(MAGIC):start]:
+            raise ValueError("checksum mismatch")
+        return bytes(body)
@@ -0,0 +1,85 @@
+"""
+A storage strategy that compresses the payload of another strategy.
+
+The compressed payload starts with the b"PAZ" marker and the id of the codec,
+so data written with any codec can be read back whatever codec is configured,
+and data without the marker (written before compression was enabled) is passed
+to the inner strategy as is.
+
+Encryption doesn't leave anything to compress, so the wrapper goes under it:
+    SecureJsonStorage(CompressedStorage(JsonStorage()))
+"""
+import bz2
+import lzma
+import os
+import zlib
+from typing import Callable, Dict, NamedTuple, Optional
+from dotenv import load_dotenv
+from .base_storage import Storage, atomic_write
+
+MAGIC = b"PAZ"
+
+class Codec(NamedTuple):
+    """A compression codec, its id in the payload header and its default level."""
+    id: int
+    compress: Callable[[bytes, int], bytes]
+    decompress: Callable[[bytes], bytes]
+    default_level: int
+
+CODECS: Dict[str, Codec] = {
+    'zlib': Codec(1, lambda payload, level: zlib.compress(payload, level), zlib.decompress, 6),
+    'bz2': Codec(2, lambda payload, level: bz2.compress(payload, level), bz2.decompress, 9),
+    'lzma': Codec(3, lambda payload, level: lzma.compress(payload, preset=level), lzma.decompress, 6),
+}
+CODECS_BY_ID: Dict[int, Codec] = {codec.id: codec for codec in CODECS.values()}
+
+class CompressedStorage(Storage):
+    """
+    Storage strategy that compresses the serialized data of the inner strategy.
+    """
+    def __init__(self, strategy: Storage, codec: Optional[str] = None, level: Optional[int] = None) -> None:
+        load_dotenv()
+        self.strategy = strategy
+        self.codec_name = codec or os.getenv('STORAGE_COMPRESSION', 'zlib')
+        if self.codec_name not in CODECS:
+            raise ValueError(f"Unknown compression codec: {self.codec_name}. Use one of: {', '.join(CODECS)}")
+        self.codec = CODECS[self.codec_name]
+        if level is None:
+            level = int(os.getenv('STORAGE_COMPRESSION_LEVEL', self.codec.default_level))
+        self.level = level
+
+    @property
+    def verified(self) -> bool:
+        """Whether the inner strategy detects changes of the stored data."""
+        return self.strategy.verified
+
+    def save(self, data: dict, path: str) -> None:
+        try:
+            atomic_write(path, self.serialize(data))
+        except IOError as e:
+            raise IOError(f"Failed to save data to {path}: {e}")
+
+    def load(self, path: str) -> dict:
+        try:
+            with open(path, 'rb') as file:
+                payload = file.read()
+        except IOError as e:
+            raise IOError(f"Failed to load data from {path}: {e}")
+        return self.deserialize(payload)
+
+    def serialize(self, data: dict) -> bytes:
+        payload = self.strategy.serialize(data)
+        return MAGIC + bytes((self.codec.id,)) + self.codec.compress(payload, self.level)
+
+    def deserialize(self, payload: bytes) -> dict:
+        return self.strategy.deserialize(self.decompress(payload))
+
+    @staticmethod
+    def decompress(payload: bytes) -> bytes:
+        """Decompress the payload with the codec named in its header; payloads without the header are returned as is."""
+        if payload[:len(MAGIC)] != MAGIC:
+            return payload
+        codec = CODECS_BY_ID.get(payload[len(MAGIC)])
+        if codec is None:
+            raise ValueError(f"Unknown compression codec id: {payload[len(MAGIC)]}")
+        return codec.decompress(payload[len(MAGIC) + 1:])
@@ -0,0 +1,58 @@
+"""
+Factory for the storage strategy configured in the .env file.
+"""
+import os
+from dotenv import load_dotenv
+from .base_storage import Storage
+from .binary_snapshot_storage import BinarySnapshotStorage
+from .checksummed_storage import ChecksummedStorage
+from .compressed_storage import CompressedStorage
+from .journal_storage import JournalStorage
+from .json_storage import JsonStorage
+from .mapped_record_storage import MappedRecordStorage
+from .pickle_storage import PickleStorage
+from .secure_json_storage import SecureJsonStorage
+from .segmented_secure_storage import SegmentedSecureStorage
+from .sharded_storage import ShardedStorage
+from .sqlite_storage import SqliteStorage
+
+def create_storage(engine: str = None, compression: str = None) -> Storage:
+    """
+    Create the storage strategy by its name, or by the STORAGE_ENGINE setting if no name is given.
+    Snapshot formats are compressed with the codec set by STORAGE_COMPRESSION ("none" by default).
+    Unencrypted snapshot formats are checksummed, so their records can be loaded without re-validation.
+    """
+    load_dotenv()
+    engine = engine or os.getenv('STORAGE_ENGINE', 'secure_json')
+    compression = compression or os.getenv('STORAGE_COMPRESSION', 'none')
+
+    def compressed(strategy: Storage) -> Storage:
+        return strategy if compression == 'none' else CompressedStorage(strategy, compression)
+
+    def secure_json() -> SecureJsonStorage:
+        if compression == 'none':
+            return SecureJsonStorage()
+        # Compress before encrypting, encrypted data doesn't compress
+        return SecureJsonStorage(compressed(JsonStorage()))
+
+    if engine == 'secure_json':
+        return JournalStorage(secure_json())
+    if engine == 'sharded':
+        return ShardedStorage(secure_json())
+    if engine == 'segmented_secure':
+        return SegmentedSecureStorage()
+    if engine == 'json':
+        return JournalStorage(ChecksummedStorage(compressed(JsonStorage())))
+    if engine == 'pickle':
+        pickle_storage = PickleStorage()
+        if pickle_storage.out_of_band and compression == 'none':
+            # The side file of the out-of-band mode is only written by PickleStorage.save()
+            return JournalStorage(pickle_storage)
+        return JournalStorage(ChecksummedStorage(compressed(pickle_storage)))
+    if engine == 'binary':
+        return JournalStorage(ChecksummedStorage(compressed(BinarySnapshotStorage())))
+    if engine == 'mapped':
+        return MappedRecordStorage()
+    if engine == 'sqlite':
+        return SqliteStorage()
+    raise ValueError(f"Unknown storage engine: {engine}")
@@ -0,0 +1,186 @@
+"""
+Journaled storage strategy.
+
+Wraps another storage strategy that keeps a full snapshot of the data and
+appends every change made since that snapshot to a journal file next to it.
+Each journal entry is serialized (and, for secure strategies, encrypted)
+separately, so a single mutation costs one small append instead of a full rewrite.
+
+Every snapshot is written with a new generation number as its first record, and the
+journal starts with the generation of the snapshot it was appended to. A journal of
+another generation, left behind by a crash between a snapshot write and the removal
+of the journal it supersedes, is not replayed.
+"""
+import itertools
+import os
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+from dotenv import load_dotenv
+from .base_storage import Storage
+
+class JournalStorage(Storage):
+    """
+    Storage strategy that keeps a snapshot plus an append-only change journal.
+    """
+    incremental = True
+
+    JOURNAL_SUFFIX = ".journal"
+    # Every journal entry is prefixed with its length as a big-endian unsigned int
+    ENTRY_HEADER = struct.Struct(">I")
+    # The snapshot record with the generation of the snapshot, not returned with the data
+    GENERATION_KEY = "__generation__"
+
+    def __init__(self, strategy: Storage, compact_threshold: Optional[int] = None) -> None:
+        load_dotenv()
+        self.strategy = strategy
+        self.compact_threshold = compact_threshold or int(os.getenv('JOURNAL_COMPACT_THRESHOLD', '1000'))
+        self._journal_entries: Dict[str, int] = {}
+        # The generation of the snapshot of every loaded or saved path
+        self._generations: Dict[str, int] = {}
+
+    @property
+    def verified(self) -> bool:
+        """Whether the inner strategy detects changes of the stored data."""
+        return self.strategy.verified
+
+    def save(self, data: dict, path: str) -> None:
+        """Write a full snapshot of a new generation and drop the journal it supersedes."""
+        generation = max(self._generations.get(path, 0), self._journal_generation(path)) + 1
+        self.strategy.save({self.GENERATION_KEY: generation, **data}, path)
+        self._generations[path] = generation
+        journal_path = self._journal_path(path)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        self._journal_entries[path] = 0
+
+    def load(self, path: str) -> dict:
+        """Load the snapshot and replay the journal on top of it."""
+        data = self.strategy.load(path) if self.strategy.exists(path) else {}
+        generation = data.pop(self.GENERATION_KEY, 0)
+        self._generations[path] = generation
+        entries = 0
+        for key, value in self._read_journal(path, generation):
+            if value is None:
+                data.pop(key, None)
+            else:
+                data[key] = value
+            entries += 1
+        self._journal_entries[path] = entries
+        return data
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream the snapshot records, replacing those changed in the journal.
+        Only the journaled records are kept in memory.
+        """
+        generation = 0
+        records: Iterator[Tuple[str, Any]] = iter(())
+        if self.strategy.exists(path):
+            records = self.strategy.iter_load(path)
+            first = next(records, None)
+            if first is not None and first[0] == self.GENERATION_KEY:
+                generation = first[1]
+            elif first is not None:
+                records = itertools.chain([first], records)
+        self._generations[path] = generation
+
+        changes: Dict[str, Optional[dict]] = {}
+        entries = 0
+        for key, value in self._read_journal(path, generation):
+            changes[key] = value
+            entries += 1
+        self._journal_entries[path] = entries
+
+        for key, value in records:
+            if key in changes:
+                value = changes.pop(key)
+                if value is None:
+                    continue
+            yield key, value
+
+        for key, value in changes.items():
+            if value is not None:
+                yield key, value
+
+    def exists(self, path: str) -> bool:
+        return self.strategy.exists(path) or os.path.exists(self._journal_path(path))
+
+    def save_changes(self, changes: Dict[str, Optional[dict]], path: str) -> None:
+        """
+        Append the changed records to the journal and sync it to disk, compacting it when it grows too long.
+        A new journal starts with the generation of the snapshot.
+        """
+        if not changes:
+            return
+        if path not in self._generations:
+            # The generation of the snapshot is read with it, and a stale journal is dropped
+            self.load(path)
+
+        try:
+            with open(self._journal_path(path), 'ab') as file:
+                if file.tell() == 0:
+                    self._write_entry(file, {"generation": self._generations[path]})
+                for key, value in changes.items():
+                    self._write_entry(file, {"key": key, "value": value})
+                file.flush()
+                os.fsync(file.fileno())
+        except IOError as e:
+            raise IOError(f"Failed to append changes to {path}: {e}")
+
+        self._journal_entries[path] = self._journal_entries.get(path, 0) + len(changes)
+        if self._journal_entries[path] >= self.compact_threshold:
+            self.compact(path)
+
+    def compact(self, path: str) -> None:
+        """Fold the journal back into the snapshot."""
+        self.save(self.load(path), path)
+
+    def _write_entry(self, file: BinaryIO, entry: dict) -> None:
+        payload = self.strategy.serialize(entry)
+        file.write(self.ENTRY_HEADER.pack(len(payload)))
+        file.write(payload)
+
+    def _read_journal(self, path: str, generation: int) -> Iterator[Tuple[str, Optional[dict]]]:
+        """
+        Yield (key, value) pairs from the journal of the snapshot generation in the order they were written.
+        A journal of another generation is superseded by the snapshot and removed.
+        """
+        entries = self._read_entries(path)
+        header = next(entries, None)
+        if header is None:
+            return
+        if header["generation"] != generation:
+            entries.close()
+            os.remove(self._journal_path(path))
+            return
+        for entry in entries:
+            yield entry["key"], entry["value"]
+
+    def _journal_generation(self, path: str) -> int:
+        """Return the generation of the snapshot the journal was appended to, 0 without a journal."""
+        header = next(self._read_entries(path), None)
+        return header["generation"] if header is not None else 0
+
+    def _read_entries(self, path: str) -> Iterator[dict]:
+        """
+        Yield the entries of the journal in the order they were written.
+        An incomplete entry at the end (interrupted append) is ignored.
+        """
+        journal_path = self._journal_path(path)
+        if not os.path.exists(journal_path):
+            return
+
+        header_size = self.ENTRY_HEADER.size
+        with open(journal_path, 'rb') as file:
+            while True:
+                header = file.read(header_size)
+                if len(header) < header_size:
+                    return
+                (length,) = self.ENTRY_HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    return
+                yield self.strategy.deserialize(payload)
+
+    def _journal_path(self, path: str) -> str:
+        return path + self.JOURNAL_SUFFIX
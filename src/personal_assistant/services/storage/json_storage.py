@@ -2,15 +2,16 @@
 This module contains the JsonStorage class, which is a subclass of the Storage class.
 """
 import json
-from .base_storage import Storage
+from typing import Any, Iterator, Tuple
+from .base_storage import Storage, atomic_write
+from .json_stream import iter_json_object
 
 class JsonStorage(Storage):
     """Storage strategy for JSON format."""
 
     def save(self, data: dict, path: str) -> None:
         try:
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(data, f)
+            atomic_write(path, self.serialize(data))
         except IOError as e:
             raise IOError(f"Failed to save data to {path}: {e}")
 
@@ -22,3 +23,18 @@ class JsonStorage(Storage):
             raise ValueError(f"Data in {path} is not valid JSON: {e}")
         except IOError as e:
             raise IOError(f"Failed to load data from {path}: {e}")
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                yield from iter_json_object(f)
+        except ValueError as e:
+            raise ValueError(f"Data in {path} is not valid JSON: {e}")
+        except IOError as e:
+            raise IOError(f"Failed to load data from {path}: {e}")
+
+    def serialize(self, data: dict) -> bytes:
+        return json.dumps(data).encode('utf-8')
+
+    def deserialize(self, payload: bytes) -> dict:
+        return json.loads(payload.decode('utf-8'))
@@ -0,0 +1,95 @@
+"""
+Incremental reader for JSON documents whose top level is an object.
+
+Yields the top-level (key, value) pairs one at a time while reading the
+input in chunks, so the dictionary for the whole document is never built.
+"""
+import json
+import re
+from typing import Any, Iterator, TextIO, Tuple
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+class _ChunkedBuffer:
+    """
+    Text buffer over a stream that reads more data only when the parser needs it.
+    """
+    def __init__(self, stream: TextIO, chunk_size: int) -> None:
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.position = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Append the next chunk to the buffer, dropping the text already consumed."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def skip_whitespace(self) -> None:
+        while True:
+            self.position = WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text) or not self.read_more():
+                return
+
+    def next_char(self) -> str:
+        self.skip_whitespace()
+        if self.position >= len(self.text):
+            raise ValueError("Unexpected end of JSON data")
+        char = self.text[self.position]
+        self.position += 1
+        return char
+
+    def expect(self, expected: str) -> None:
+        char = self.next_char()
+        if char != expected:
+            raise ValueError(f"Expected {expected!r} at position {self.position - 1}, got {char!r}")
+
+    def decode(self, decoder: json.JSONDecoder) -> Any:
+        """Decode the next JSON value, reading more chunks until the value is complete."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError as e:
+                if not self.read_more():
+                    raise ValueError(str(e)) from e
+                continue
+            # A number or literal at the end of the buffer may be cut in half ("12" of "12.5")
+            if (end == len(self.text) or self.text[end] in NUMBER_CHARS) and self.read_more():
+                continue
+            self.position = end
+            return value
+
+def iter_json_object(stream: TextIO, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield the (key, value) pairs of the top-level JSON object read from the stream.
+    """
+    decoder = json.JSONDecoder()
+    buffer = _ChunkedBuffer(stream, chunk_size)
+
+    buffer.expect('{')
+    buffer.skip_whitespace()
+    if buffer.text[buffer.position:buffer.position + 1] == '}':
+        return
+
+    while True:
+        key = buffer.decode(decoder)
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a string key, got {key!r}")
+        buffer.expect(':')
+        yield key, buffer.decode(decoder)
+
+        separator = buffer.next_char()
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError(f"Expected ',' or '}}' at position {buffer.position - 1}, got {separator!r}")
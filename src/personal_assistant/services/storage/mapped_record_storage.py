@@ -0,0 +1,218 @@
+"""
+A storage strategy that memory-maps a record file with a sorted id index.
+
+Layout of a record file:
+- the header: magic bytes b"PASR", format version, number of records and
+  the offsets of the index and of the string table;
+- the record values encoded by binary_codec;
+- the record ids;
+- the index: one fixed size entry (id offset, id length, value offset, value length)
+  per record, sorted by id;
+- the string table of the encoded values.
+
+Opening the file reads only the header and the string table. A single record is found
+by a binary search over the index and only its value is decoded, so point lookups
+take O(log n) and don't depend on the size of the dataset.
+"""
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .base_storage import RecordStorage, atomic_write
+from .binary_codec import BinaryDecoder, BinaryEncoder
+
+MAGIC = b"PASR"
+VERSION = 1
+
+class _MappedFile:
+    """
+    An open record file: its memory map, decoder and index position.
+    """
+    HEADER = struct.Struct("<4sBIQQ")
+    ENTRY = struct.Struct("<QHQI")
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.signature: Tuple[int, int] = (stat.st_ino, stat.st_mtime_ns)
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.count, self.index_offset, strings_offset = self.HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a record file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported record file version: {version}")
+        strings, _ = BinaryDecoder.read_string_table(self.map, strings_offset)
+        self.decoder = BinaryDecoder(strings)
+
+    def entry(self, position: int) -> Tuple[bytes, int, int]:
+        """Return the id, value offset and value length of the index entry at the position."""
+        key_offset, key_length, value_offset, value_length = self.ENTRY.unpack_from(
+            self.map, self.index_offset + position * self.ENTRY.size
+        )
+        return self.map[key_offset:key_offset + key_length], value_offset, value_length
+
+    def search(self, key: bytes) -> int:
+        """Return the position of the first index entry whose id is not less than the key."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def value(self, value_offset: int) -> Any:
+        return self.decoder.decode(self.map, value_offset)[0]
+
+    def close(self) -> None:
+        self.map.close()
+
+class MappedRecordStorage(RecordStorage):
+    """
+    Storage class that reads single records from a memory-mapped file.
+    Writes rewrite the file, copying the encoded values of unchanged records as is,
+    so the format suits read-mostly data.
+    """
+    FILE_SUFFIX = ".records"
+
+    def __init__(self) -> None:
+        self._files: Dict[str, _MappedFile] = {}
+
+    def save(self, data: dict, path: str) -> None:
+        encoder = BinaryEncoder()
+        self._write(path, {key: encoder.encode(value) for key, value in data.items()}, encoder)
+
+    def load(self, path: str) -> dict:
+        return dict(self.iter_load(path))
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        mapped = self._open(path)
+        for position in range(mapped.count):
+            key, value_offset, _ = mapped.entry(position)
+            yield key.decode('utf-8'), mapped.value(value_offset)
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(self._file_path(path))
+
+    def save_changes(self, changes: Dict[str, Optional[dict]], path: str) -> None:
+        """Rewrite the file with the changed records, without decoding the unchanged ones."""
+        if not changes:
+            return
+
+        records: Dict[str, bytes] = {}
+        strings: List[str] = []
+        if self.exists(path):
+            mapped = self._open(path)
+            strings = mapped.decoder.strings
+            for position in range(mapped.count):
+                key, value_offset, value_length = mapped.entry(position)
+                records[key.decode('utf-8')] = mapped.map[value_offset:value_offset + value_length]
+
+        encoder = BinaryEncoder(strings)
+        for key, value in changes.items():
+            if value is None:
+                records.pop(key, None)
+            else:
+                records[key] = encoder.encode(value)
+        self._write(path, records, encoder)
+
+    def get(self, key: str, path: str) -> Optional[dict]:
+        """Find the record by a binary search over the index and decode only its value."""
+        if not self.exists(path):
+            return None
+        mapped = self._open(path)
+        encoded_key = key.encode('utf-8')
+        position = mapped.search(encoded_key)
+        if position == mapped.count:
+            return None
+        found_key, value_offset, _ = mapped.entry(position)
+        return mapped.value(value_offset) if found_key == encoded_key else None
+
+    def put(self, key: str, value: dict, path: str) -> None:
+        self.save_changes({key: value}, path)
+
+    def delete(self, key: str, path: str) -> None:
+        self.save_changes({key: None}, path)
+
+    def keys(self, path: str) -> List[str]:
+        if not self.exists(path):
+            return []
+        mapped = self._open(path)
+        return [mapped.entry(position)[0].decode('utf-8') for position in range(mapped.count)]
+
+    def find(self, field: str, value, path: str) -> Dict[str, dict]:
+        """Decode the records one by one, the file has no index by field."""
+        if not self.exists(path):
+            return {}
+        return {key: record for key, record in self.iter_load(path) if record.get(field) == value}
+
+    def range(self, start: str, end: str, path: str) -> Dict[str, dict]:
+        """Return the records with ids in [start, end) using the sorted index."""
+        if not self.exists(path):
+            return {}
+        mapped = self._open(path)
+        end_key = end.encode('utf-8')
+        records = {}
+        for position in range(mapped.search(start.encode('utf-8')), mapped.count):
+            key, value_offset, _ = mapped.entry(position)
+            if key >= end_key:
+                break
+            records[key.decode('utf-8')] = mapped.value(value_offset)
+        return records
+
+    def close(self) -> None:
+        """Unmap all open record files."""
+        for mapped in self._files.values():
+            mapped.close()
+        self._files.clear()
+
+    def _open(self, path: str) -> _MappedFile:
+        """Return the mapped record file, mapping it again if it was replaced since."""
+        file_path = self._file_path(path)
+        mapped = self._files.get(path)
+        if mapped is not None:
+            stat = os.stat(file_path)
+            if mapped.signature == (stat.st_ino, stat.st_mtime_ns):
+                return mapped
+            mapped.close()
+        mapped = self._files[path] = _MappedFile(file_path)
+        return mapped
+
+    def _write(self, path: str, records: Dict[str, bytes], encoder: BinaryEncoder) -> None:
+        """Write the encoded records sorted by id, followed by the ids, the index and the string table."""
+        header_size = _MappedFile.HEADER.size
+        keys = sorted(key.encode('utf-8') for key in records)
+
+        values, value_offsets = [], []
+        offset = header_size
+        for key in keys:
+            value = records[key.decode('utf-8')]
+            values.append(value)
+            value_offsets.append(offset)
+            offset += len(value)
+
+        key_offsets = []
+        for key in keys:
+            key_offsets.append(offset)
+            offset += len(key)
+
+        index = [
+            _MappedFile.ENTRY.pack(key_offset, len(key), value_offset, len(value))
+            for key, key_offset, value, value_offset in zip(keys, key_offsets, values, value_offsets)
+        ]
+        index_offset = offset
+        strings_offset = index_offset + len(index) * _MappedFile.ENTRY.size
+        header = _MappedFile.HEADER.pack(MAGIC, VERSION, len(keys), index_offset, strings_offset)
+
+        mapped = self._files.pop(path, None)
+        if mapped is not None:
+            mapped.close()
+        try:
+            atomic_write(self._file_path(path), b''.join([header] + values + keys + index + [encoder.string_table()]))
+        except IOError as e:
+            raise IOError(f"Failed to save data to {path}: {e}")
+
+    def _file_path(self, path: str) -> str:
+        return path + self.FILE_SUFFIX
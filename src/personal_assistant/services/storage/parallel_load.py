@@ -0,0 +1,30 @@
+"""
+Parallel loading of the strategies that store their data in independent chunks.
+
+Every chunk (a shard or an encrypted segment) is read, decrypted and parsed by a worker,
+and the records are yielded in the chunk order. Process workers use all CPU cores;
+thread workers avoid copying the records between processes but only run in parallel
+while the decryption releases the GIL.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from typing import Any, Iterator, Tuple
+from .base_storage import Storage
+
+EXECUTORS = {
+    'process': ProcessPoolExecutor,
+    'thread': ThreadPoolExecutor,
+}
+
+def create_executor(executor: str, workers: int) -> Executor:
+    """Create a pool of the given kind ("process" or "thread") with the given number of workers."""
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor: {executor}. Use one of: {', '.join(EXECUTORS)}")
+    return EXECUTORS[executor](max_workers=workers)
+
+def iter_load_parallel(strategy: Storage, path: str, workers: int, executor: str = 'process') -> Iterator[Tuple[str, Any]]:
+    """Load the chunks of the data at the path in parallel and yield their records."""
+    chunks = strategy.chunks(path)
+    with create_executor(executor, min(workers, len(chunks)) or 1) as pool:
+        for records in pool.map(strategy.load_chunk, chunks, repeat(path)):
+            yield from records.items()
@@ -1,16 +1,160 @@
 """
 Pickle storage strategy.
+
+The data is pickled with protocol 5. In the out-of-band mode (PICKLE_OUT_OF_BAND)
+the long strings of the records are not written into the pickle stream: they are
+packed into one UTF-8 text column, which is written, together with the offsets of
+the strings and any other PickleBuffer of the data, to a `<path>.<token>.buffers`
+side file. On load the side file is memory-mapped and handed to the unpickler as
+its out-of-band buffers, and every string is decoded straight from the mapping.
+
+The pickle stream starts with the token of its side file, so a side file is only
+ever read with the stream it was written with; the side files of older snapshots
+are removed once the new stream is in place.
 """
+import glob
+import io
+import mmap
+import os
 import pickle
-from .base_storage import Storage
+import struct
+from array import array
+from typing import List, Optional
+from dotenv import load_dotenv
+from .base_storage import Storage, atomic_write
+
+PROTOCOL = 5
+MAGIC = b"PAPB"
+# Number of out-of-band buffers, then the length of every buffer
+BUFFERS_HEADER = struct.Struct("<4sI")
+BUFFER_LENGTH = struct.Struct("<Q")
+# Buffers start at multiples of 8 bytes, so the offsets can be read in place
+ALIGNMENT = 8
+
+def _aligned(position: int) -> int:
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+class _TextColumnPickler(pickle.Pickler):
+    """
+    Pickler that moves the long strings into a text column, referenced by their index.
+    Equal strings are stored once.
+    """
+
+    def __init__(self, file, min_size: int, buffer_callback) -> None:
+        super().__init__(file, protocol=PROTOCOL, buffer_callback=buffer_callback)
+        self.min_size = min_size
+        self.column = bytearray()
+        self.offsets = array('Q', [0])
+        self.indexes = {}
+
+    def persistent_id(self, obj) -> Optional[int]:
+        if type(obj) is not str or len(obj) < self.min_size:
+            return None
+        index = self.indexes.get(obj)
+        if index is None:
+            index = self.indexes[obj] = len(self.offsets) - 1
+            self.column += obj.encode('utf-8')
+            self.offsets.append(len(self.column))
+        return index
+
+class _TextColumnUnpickler(pickle.Unpickler):
+    """
+    Unpickler that decodes the referenced strings from the memory-mapped text column,
+    every string once.
+    """
+
+    def __init__(self, file, buffers, column: memoryview, offsets: memoryview) -> None:
+        super().__init__(file, buffers=buffers)
+        self.column = column
+        self.offsets = offsets
+        self.texts = {}
+
+    def persistent_load(self, pid: int) -> str:
+        text = self.texts.get(pid)
+        if text is None:
+            text = self.texts[pid] = str(self.column[self.offsets[pid]:self.offsets[pid + 1]], 'utf-8')
+        return text
 
 class PickleStorage(Storage):
     """Storage strategy for Pickle format."""
 
+    BUFFERS_SUFFIX = ".buffers"
+
+    def __init__(self, out_of_band: Optional[bool] = None, min_size: Optional[int] = None) -> None:
+        load_dotenv()
+        if out_of_band is None:
+            out_of_band = os.getenv('PICKLE_OUT_OF_BAND', 'false').lower() in ('1', 'true', 'yes')
+        self.out_of_band: bool = out_of_band
+        self.min_size: int = min_size or int(os.getenv('PICKLE_OUT_OF_BAND_MIN_SIZE', '64'))
+
     def save(self, data: dict, path: str) -> None:
-        with open(path, 'wb') as f:
-            pickle.dump(data, f)
+        if not self.out_of_band:
+            atomic_write(path, self.serialize(data))
+            self._remove_side_files(path)
+            return
+
+        buffers: List[pickle.PickleBuffer] = []
+        body = io.BytesIO()
+        pickler = _TextColumnPickler(body, self.min_size, buffers.append)
+        pickler.dump(data)
+
+        # The text column and its offsets come first, they are read before the data
+        buffers[:0] = [pickle.PickleBuffer(pickler.column), pickle.PickleBuffer(pickler.offsets)]
+        token = os.urandom(4).hex()
+        self._write_side_file(f"{path}.{token}{self.BUFFERS_SUFFIX}", buffers)
+        atomic_write(path, MAGIC + token.encode('ascii') + body.getbuffer())
+        self._remove_side_files(path, keep=token)
 
     def load(self, path: str) -> dict:
         with open(path, 'rb') as f:
-            return pickle.load(f)
+            header = f.read(len(MAGIC) + 8)
+            if not header.startswith(MAGIC):
+                f.seek(0)
+                return pickle.load(f)
+
+            token = header[len(MAGIC):].decode('ascii')
+            buffers = self._map_side_file(f"{path}.{token}{self.BUFFERS_SUFFIX}")
+            column, offsets = buffers[0], buffers[1].cast('Q')
+            return _TextColumnUnpickler(f, iter(buffers[2:]), column, offsets).load()
+
+    def serialize(self, data: dict) -> bytes:
+        return pickle.dumps(data, protocol=PROTOCOL)
+
+    def deserialize(self, payload: bytes) -> dict:
+        return pickle.loads(payload)
+
+    @staticmethod
+    def _write_side_file(side_path: str, buffers: List[pickle.PickleBuffer]) -> None:
+        views = [buffer.raw() for buffer in buffers]
+        header = BUFFERS_HEADER.pack(MAGIC, len(views)) + b"".join(BUFFER_LENGTH.pack(view.nbytes) for view in views)
+        with open(side_path, 'wb') as file:
+            file.write(header)
+            for view in views:
+                file.write(bytes(_aligned(file.tell()) - file.tell()))
+                file.write(view)
+            file.flush()
+            os.fsync(file.fileno())
+
+    @staticmethod
+    def _map_side_file(side_path: str) -> List[memoryview]:
+        """Memory-map the side file and return a view of every buffer in it."""
+        with open(side_path, 'rb') as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        magic, count = BUFFERS_HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{side_path} is not a pickle buffers file")
+        position = BUFFERS_HEADER.size + count * BUFFER_LENGTH.size
+        buffers = []
+        for index in range(count):
+            (length,) = BUFFER_LENGTH.unpack_from(view, BUFFERS_HEADER.size + index * BUFFER_LENGTH.size)
+            position = _aligned(position)
+            buffers.append(view[position:position + length])
+            position += length
+        return buffers
+
+    def _remove_side_files(self, path: str, keep: Optional[str] = None) -> None:
+        """Remove the side files that don't belong to the current snapshot."""
+        for side_path in glob.glob(f"{glob.escape(path)}.*{self.BUFFERS_SUFFIX}"):
+            if keep is None or side_path != f"{path}.{keep}{self.BUFFERS_SUFFIX}":
+                os.remove(side_path)
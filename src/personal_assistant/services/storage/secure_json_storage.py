@@ -1,32 +1,37 @@
 """
 A storage service that encrypts and decrypts data stored in JSON format.
 """
+import io
 import json
 import os
+from typing import Any, Iterator, Optional, Tuple
 from dotenv import load_dotenv
 from cryptography.fernet import Fernet
-from personal_assistant.services.storage.base_storage import Storage
+from personal_assistant.services.storage.base_storage import Storage, atomic_write
+from personal_assistant.services.storage.json_stream import iter_json_object
 
 class SecureJsonStorage(Storage):
     """
     Storage class that encrypts and decrypts data stored in JSON format.
+    An inner strategy, e.g. CompressedStorage, can replace the JSON encoding of the data.
     """
+    # Fernet tokens are authenticated, a changed file fails to decrypt
+    verified = True
 
-    def __init__(self):
+    def __init__(self, strategy: Optional[Storage] = None):
         load_dotenv()
         self.key = os.getenv('SECRET_KEY')
         self.cipher = Fernet(self.key)
+        self.strategy = strategy
 
     def save(self, data: dict, path: str) -> None:
         """Encrypt and save data to the specified path."""
         try:
             # Convert the data to JSON and then encrypt it
-            json_data = json.dumps(data)
-            encrypted_data = self.cipher.encrypt(json_data.encode('utf-8'))
-        
-            # Write the encrypted data to a file
-            with open(path, 'wb') as file:
-                file.write(encrypted_data)
+            encrypted_data = self.serialize(data)
+
+            # Write the encrypted data to a temporary file and rename it over the old one
+            atomic_write(path, encrypted_data)
         except IOError as e:
             raise IOError(f"Failed to save data to {path}: {e}")
 
@@ -38,8 +43,40 @@ class SecureJsonStorage(Storage):
                 encrypted_data = file.read()
 
             # Decrypt the data and convert it from JSON
-            decrypted_data = self.cipher.decrypt(encrypted_data)
-            json_data = decrypted_data.decode('utf-8')
-            return json.loads(json_data)
+            return self.deserialize(encrypted_data)
+        except IOError as e:
+            raise IOError(f"Failed to load data from {path}: {e}")
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Decrypt the data and yield its records one at a time
+        instead of parsing the whole JSON document at once.
+        """
+        try:
+            with open(path, 'rb') as file:
+                encrypted_data = file.read()
         except IOError as e:
             raise IOError(f"Failed to load data from {path}: {e}")
+
+        decrypted_data = self.cipher.decrypt(encrypted_data)
+        del encrypted_data
+        if self.strategy is not None:
+            yield from self.strategy.deserialize(decrypted_data).items()
+            return
+        # BytesIO shares the buffer of the decrypted bytes, and the wrapper decodes
+        # them chunk by chunk as the parser reads, so the text is never copied whole
+        yield from iter_json_object(io.TextIOWrapper(io.BytesIO(decrypted_data), encoding='utf-8'))
+
+    def serialize(self, data: dict) -> bytes:
+        """Convert the data to JSON and encrypt it."""
+        if self.strategy is not None:
+            return self.cipher.encrypt(self.strategy.serialize(data))
+        json_data = json.dumps(data)
+        return self.cipher.encrypt(json_data.encode('utf-8'))
+
+    def deserialize(self, payload: bytes) -> dict:
+        """Decrypt the payload and convert it from JSON."""
+        decrypted_data = self.cipher.decrypt(payload)
+        if self.strategy is not None:
+            return self.strategy.deserialize(decrypted_data)
+        return json.loads(decrypted_data.decode('utf-8'))
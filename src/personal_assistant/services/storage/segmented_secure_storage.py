@@ -0,0 +1,251 @@
+"""
+A storage strategy that splits the data into independently encrypted segments.
+
+Records are distributed over segments by the hash of their id. Each segment is
+a separate file encrypted with AES-256-GCM, and a small encrypted manifest keeps
+the segment count and a digest of every segment's content. A save re-encrypts
+and rewrites only the segments whose content changed, and reading a single
+record decrypts only the segment that holds it.
+
+The AES-GCM key is derived from SECRET_KEY with HKDF, so the key of the Fernet
+storages is never used as a key of another cipher.
+"""
+import base64
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from personal_assistant.services.storage.base_storage import RecordStorage, atomic_write, bucket_for
+
+# The HKDF label of the AES-GCM key, which sets it apart from any other key derived from SECRET_KEY
+KEY_INFO = b"personal-assistant/segmented-storage/aes-256-gcm"
+
+def derive_key(secret_key: str) -> bytes:
+    """Derive the AES-256-GCM key of the segments from the Fernet SECRET_KEY."""
+    return HKDF(
+        algorithm=hashes.SHA256(), length=32, salt=None, info=KEY_INFO
+    ).derive(base64.urlsafe_b64decode(secret_key))
+
+class SegmentedSecureStorage(RecordStorage):
+    """
+    Storage class that keeps records in encrypted segments of a directory.
+    """
+    chunked = True
+    # AES-GCM segments are authenticated, a changed segment fails to decrypt
+    verified = True
+
+    DIRECTORY_SUFFIX = ".segments"
+    MANIFEST_NAME = "manifest"
+    NONCE_SIZE = 12
+    VERSION = 1
+
+    def __init__(self, segments: Optional[int] = None) -> None:
+        load_dotenv()
+        self.key = os.getenv('SECRET_KEY')
+        self.cipher = AESGCM(derive_key(self.key))
+        self.segments = segments or int(os.getenv('STORAGE_SEGMENTS', '64'))
+        self._manifests: Dict[str, dict] = {}
+        self._segment_cache: Dict[Tuple[str, int], dict] = {}
+
+    def save(self, data: dict, path: str) -> None:
+        """Encrypt and write the segments whose content differs from the stored one."""
+        manifest = self._manifest(path)
+        buckets: List[dict] = [{} for _ in range(manifest["segments"])]
+        for key, value in data.items():
+            buckets[bucket_for(key, manifest["segments"])][key] = value
+
+        emptied = [self._write_segment(path, manifest, index, records) for index, records in enumerate(buckets)]
+        self._write_manifest(path, manifest)
+        self._remove_files(emptied)
+
+    def load(self, path: str) -> dict:
+        return dict(self.iter_load(path))
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        """Decrypt the segments one at a time and yield their records."""
+        manifest = self._manifest(path)
+        for index in range(manifest["segments"]):
+            yield from self._read_segment(path, manifest, index, cache=False).items()
+
+    def chunks(self, path: str) -> List[int]:
+        return list(range(self._manifest(path)["segments"]))
+
+    def load_chunk(self, chunk: int, path: str) -> dict:
+        return self._read_segment(path, self._manifest(path), chunk, cache=False)
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(self._file_path(path, self.MANIFEST_NAME))
+
+    def save_changes(self, changes: Dict[str, Optional[dict]], path: str) -> None:
+        """Rewrite only the segments that hold the changed records."""
+        if not changes:
+            return
+
+        manifest = self._manifest(path)
+        touched: Dict[int, dict] = {}
+        for key, value in changes.items():
+            index = bucket_for(key, manifest["segments"])
+            if index not in touched:
+                touched[index] = dict(self._read_segment(path, manifest, index, cache=False))
+            if value is None:
+                touched[index].pop(key, None)
+            else:
+                touched[index][key] = value
+
+        emptied = [self._write_segment(path, manifest, index, records) for index, records in touched.items()]
+        self._write_manifest(path, manifest)
+        self._remove_files(emptied)
+
+    def get(self, key: str, path: str) -> Optional[dict]:
+        """Decrypt only the segment that holds the key."""
+        manifest = self._manifest(path)
+        return self._read_segment(path, manifest, bucket_for(key, manifest["segments"])).get(key)
+
+    def put(self, key: str, value: dict, path: str) -> None:
+        self.save_changes({key: value}, path)
+
+    def delete(self, key: str, path: str) -> None:
+        self.save_changes({key: None}, path)
+
+    def keys(self, path: str) -> List[str]:
+        return [key for key, _ in self.iter_load(path)]
+
+    def find(self, field: str, value, path: str) -> Dict[str, dict]:
+        """Scan all segments, the record fields are encrypted and can't be indexed."""
+        return {key: record for key, record in self.iter_load(path) if record.get(field) == value}
+
+    def range(self, start: str, end: str, path: str) -> Dict[str, dict]:
+        return dict(sorted((key, record) for key, record in self.iter_load(path) if start <= key < end))
+
+    def reshard(self, path: str, segments: int) -> None:
+        """
+        Repartition the dataset into the given number of segments. The segments of the new
+        generation are written before the manifest switches to them.
+        """
+        if segments < 1:
+            raise ValueError("The number of segments must be positive")
+        old_manifest = self._manifest(path)
+        data = self.load(path)
+
+        manifest = {
+            "version": self.VERSION,
+            "segments": segments,
+            "digests": {},
+            "generation": old_manifest.get("generation", 0) + 1
+        }
+        buckets: List[dict] = [{} for _ in range(segments)]
+        for key, value in data.items():
+            buckets[bucket_for(key, segments)][key] = value
+        for index, records in enumerate(buckets):
+            self._write_segment(path, manifest, index, records)
+        self._write_manifest(path, manifest)
+        self._manifests[path] = manifest
+
+        for index in range(old_manifest["segments"]):
+            self._segment_cache.pop((path, index), None)
+            old_path = self._file_path(path, self._segment_name(old_manifest, index))
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+    def __getstate__(self) -> dict:
+        # The cipher can't be pickled, worker processes of a parallel load create their own
+        state = self.__dict__.copy()
+        del state['cipher']
+        state['_segment_cache'] = {}
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.cipher = AESGCM(derive_key(self.key))
+
+    def _manifest(self, path: str) -> dict:
+        """Return the manifest of the dataset, reading it on first use."""
+        if path not in self._manifests:
+            manifest_path = self._file_path(path, self.MANIFEST_NAME)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'rb') as file:
+                    manifest = json.loads(self._decrypt(file.read(), path, self.MANIFEST_NAME))
+            else:
+                manifest = {"version": self.VERSION, "segments": self.segments, "digests": {}}
+            self._manifests[path] = manifest
+        return self._manifests[path]
+
+    def _write_manifest(self, path: str, manifest: dict) -> None:
+        os.makedirs(self._directory(path), exist_ok=True)
+        payload = json.dumps(manifest).encode('utf-8')
+        atomic_write(self._file_path(path, self.MANIFEST_NAME), self._encrypt(payload, path, self.MANIFEST_NAME))
+
+    def _read_segment(self, path: str, manifest: dict, index: int, cache: bool = True) -> dict:
+        """
+        Return the decrypted records of a segment. Segments read for point lookups
+        are cached until they are rewritten.
+        """
+        cache_key = (path, index)
+        if cache_key in self._segment_cache:
+            return self._segment_cache[cache_key]
+
+        records = {}
+        if str(index) in manifest["digests"]:
+            name = self._segment_name(manifest, index)
+            with open(self._file_path(path, name), 'rb') as file:
+                records = json.loads(self._decrypt(file.read(), path, name))
+        if cache:
+            self._segment_cache[cache_key] = records
+        return records
+
+    def _write_segment(self, path: str, manifest: dict, index: int, records: dict) -> Optional[str]:
+        """
+        Encrypt and write a segment unless its content is unchanged.
+        An emptied segment is dropped from the manifest, and the path of its file is returned:
+        the file is removed once the manifest that no longer lists it is written.
+        """
+        name = self._segment_name(manifest, index)
+        digests = manifest["digests"]
+        self._segment_cache.pop((path, index), None)
+
+        if not records:
+            if digests.pop(str(index), None) is not None:
+                return self._file_path(path, name)
+            return None
+
+        payload = json.dumps(records).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()
+        if digests.get(str(index)) == digest:
+            return None
+
+        os.makedirs(self._directory(path), exist_ok=True)
+        atomic_write(self._file_path(path, name), self._encrypt(payload, path, name))
+        digests[str(index)] = digest
+        return None
+
+    @staticmethod
+    def _remove_files(paths: List[Optional[str]]) -> None:
+        for file_path in paths:
+            if file_path is not None and os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _encrypt(self, payload: bytes, path: str, name: str) -> bytes:
+        """Encrypt the payload, binding it to its dataset and file name."""
+        nonce = os.urandom(self.NONCE_SIZE)
+        return nonce + self.cipher.encrypt(nonce, payload, self._associated_data(path, name))
+
+    def _decrypt(self, encrypted: bytes, path: str, name: str) -> bytes:
+        nonce, ciphertext = encrypted[:self.NONCE_SIZE], encrypted[self.NONCE_SIZE:]
+        return self.cipher.decrypt(nonce, ciphertext, self._associated_data(path, name))
+
+    def _associated_data(self, path: str, name: str) -> bytes:
+        return f"{os.path.basename(path)}/{name}".encode('utf-8')
+
+    def _segment_name(self, manifest: dict, index: int) -> str:
+        generation = manifest.get("generation", 0)
+        return f"segment-{generation}-{index:04d}" if generation else f"segment-{index:04d}"
+
+    def _directory(self, path: str) -> str:
+        return path + self.DIRECTORY_SUFFIX
+
+    def _file_path(self, path: str, name: str) -> str:
+        return os.path.join(self._directory(path), name)
@@ -0,0 +1,193 @@
+"""
+A storage strategy that partitions the records into shard files by the hash of their id.
+
+The shards of a dataset live in the `<path>.shards/` directory next to a JSON manifest
+with the number of shards and the generation of the shard files. Every shard is written
+with the inner strategy (e.g. SecureJsonStorage), so it is encrypted and, optionally,
+compressed on its own. Reading a record loads only its shard, and saving changes
+rewrites only the shards that hold the changed records.
+
+Resharding writes the shards of a new generation first and switches the manifest
+to them afterwards, so the dataset stays readable if it is interrupted.
+"""
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from .base_storage import RecordStorage, Storage, atomic_write, bucket_for
+
+class ShardedStorage(RecordStorage):
+    """
+    Storage class that keeps the records in hash-partitioned shard files.
+    """
+    chunked = True
+
+    DIRECTORY_SUFFIX = ".shards"
+    MANIFEST_NAME = "manifest.json"
+    VERSION = 1
+
+    def __init__(self, strategy: Storage, shards: Optional[int] = None) -> None:
+        load_dotenv()
+        self.strategy = strategy
+        self.shards = shards or int(os.getenv('STORAGE_SHARDS', '16'))
+        self._manifests: Dict[str, dict] = {}
+        self._shard_cache: Dict[Tuple[str, int], dict] = {}
+
+    @property
+    def verified(self) -> bool:
+        """Whether the inner strategy detects changes of the stored data."""
+        return self.strategy.verified
+
+    def save(self, data: dict, path: str) -> None:
+        """Write every shard of the dataset."""
+        manifest = self._manifest(path)
+        shards: List[dict] = [{} for _ in range(manifest["shards"])]
+        for key, value in data.items():
+            shards[bucket_for(key, manifest["shards"])][key] = value
+
+        for index, records in enumerate(shards):
+            self._write_shard(path, manifest, index, records)
+        self._write_manifest(path, manifest)
+
+    def load(self, path: str) -> dict:
+        return dict(self.iter_load(path))
+
+    def iter_load(self, path: str) -> Iterator[Tuple[str, Any]]:
+        """Load the shards one at a time and yield their records."""
+        manifest = self._manifest(path)
+        for index in range(manifest["shards"]):
+            yield from self._read_shard(path, manifest, index, cache=False).items()
+
+    def chunks(self, path: str) -> List[int]:
+        return list(range(self._manifest(path)["shards"]))
+
+    def load_chunk(self, chunk: int, path: str) -> dict:
+        return self._read_shard(path, self._manifest(path), chunk, cache=False)
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(self._file_path(path, self.MANIFEST_NAME))
+
+    def save_changes(self, changes: Dict[str, Optional[dict]], path: str) -> None:
+        """Rewrite only the shards that hold the changed records."""
+        if not changes:
+            return
+
+        manifest = self._manifest(path)
+        touched: Dict[int, dict] = {}
+        for key, value in changes.items():
+            index = bucket_for(key, manifest["shards"])
+            if index not in touched:
+                touched[index] = dict(self._read_shard(path, manifest, index, cache=False))
+            if value is None:
+                touched[index].pop(key, None)
+            else:
+                touched[index][key] = value
+
+        for index, records in touched.items():
+            self._write_shard(path, manifest, index, records)
+        if not self.exists(path):
+            self._write_manifest(path, manifest)
+
+    def get(self, key: str, path: str) -> Optional[dict]:
+        """Load only the shard that holds the key."""
+        manifest = self._manifest(path)
+        return self._read_shard(path, manifest, bucket_for(key, manifest["shards"])).get(key)
+
+    def put(self, key: str, value: dict, path: str) -> None:
+        self.save_changes({key: value}, path)
+
+    def delete(self, key: str, path: str) -> None:
+        self.save_changes({key: None}, path)
+
+    def keys(self, path: str) -> List[str]:
+        return [key for key, _ in self.iter_load(path)]
+
+    def find(self, field: str, value, path: str) -> Dict[str, dict]:
+        """Scan all shards, the records are not indexed by field."""
+        return {key: record for key, record in self.iter_load(path) if record.get(field) == value}
+
+    def range(self, start: str, end: str, path: str) -> Dict[str, dict]:
+        return dict(sorted((key, record) for key, record in self.iter_load(path) if start <= key < end))
+
+    def reshard(self, path: str, shards: int) -> None:
+        """Repartition the dataset into the given number of shards."""
+        if shards < 1:
+            raise ValueError("The number of shards must be positive")
+        old_manifest = self._manifest(path)
+        data = self.load(path)
+
+        manifest = {"version": self.VERSION, "shards": shards, "generation": old_manifest["generation"] + 1}
+        buckets: List[dict] = [{} for _ in range(shards)]
+        for key, value in data.items():
+            buckets[bucket_for(key, shards)][key] = value
+        for index, records in enumerate(buckets):
+            self._write_shard(path, manifest, index, records)
+        self._write_manifest(path, manifest)
+        self._manifests[path] = manifest
+
+        # The new manifest is in place, the old shards are not referenced anymore
+        for index in range(old_manifest["shards"]):
+            self._shard_cache.pop((path, index), None)
+            old_path = self._shard_path(path, old_manifest, index)
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+    def __getstate__(self) -> dict:
+        # Worker processes of a parallel load get the strategy without the cached records
+        state = self.__dict__.copy()
+        state['_shard_cache'] = {}
+        return state
+
+    def _manifest(self, path: str) -> dict:
+        """Return the manifest of the dataset, reading it on first use."""
+        if path not in self._manifests:
+            manifest_path = self._file_path(path, self.MANIFEST_NAME)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'r', encoding='utf-8') as file:
+                    manifest = json.load(file)
+            else:
+                manifest = {"version": self.VERSION, "shards": self.shards, "generation": 0}
+            self._manifests[path] = manifest
+        return self._manifests[path]
+
+    def _write_manifest(self, path: str, manifest: dict) -> None:
+        os.makedirs(self._directory(path), exist_ok=True)
+        atomic_write(self._file_path(path, self.MANIFEST_NAME), json.dumps(manifest).encode('utf-8'))
+
+    def _read_shard(self, path: str, manifest: dict, index: int, cache: bool = True) -> dict:
+        """
+        Return the records of a shard. Shards read for point lookups
+        are cached until they are rewritten.
+        """
+        cache_key = (path, index)
+        if cache_key in self._shard_cache:
+            return self._shard_cache[cache_key]
+
+        shard_path = self._shard_path(path, manifest, index)
+        records = {}
+        if os.path.exists(shard_path):
+            with open(shard_path, 'rb') as file:
+                records = self.strategy.deserialize(file.read())
+        if cache:
+            self._shard_cache[cache_key] = records
+        return records
+
+    def _write_shard(self, path: str, manifest: dict, index: int, records: dict) -> None:
+        """Write a shard, removing its file if it has no records."""
+        shard_path = self._shard_path(path, manifest, index)
+        self._shard_cache.pop((path, index), None)
+        if not records:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+            return
+        os.makedirs(self._directory(path), exist_ok=True)
+        atomic_write(shard_path, self.strategy.serialize(records))
+
+    def _shard_path(self, path: str, manifest: dict, index: int) -> str:
+        return self._file_path(path, f"shard-{manifest['generation']}-{index:04d}")
+
+    def _directory(self, path: str) -> str:
+        return path + self.DIRECTORY_SUFFIX
+
+    def _file_path(self, path: str, name: str) -> str:
+        return os.path.join(self._directory(path), name)
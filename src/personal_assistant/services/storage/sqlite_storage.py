@@ -0,0 +1,125 @@
+"""
+SQLite storage strategy.
+
+All datasets of a data directory live in one database file, one table per dataset.
+Records are stored as JSON documents keyed by their id, so single records can be
+read, upserted and deleted without touching the rest of the data.
+"""
+import json
+import os
+import re
+import sqlite3
+from typing import Dict, List, Optional, Set, Tuple
+from .base_storage import RecordStorage
+
+class SqliteStorage(RecordStorage):
+    """Storage strategy backed by an SQLite database."""
+
+    DATABASE_NAME = "storage.sqlite3"
+    IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+    def __init__(self) -> None:
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._tables: Set[Tuple[str, str]] = set()
+
+    def save(self, data: dict, path: str) -> None:
+        connection, table = self._open(path)
+        with connection:
+            connection.execute(f'DELETE FROM "{table}"')
+            connection.executemany(
+                f'INSERT INTO "{table}" (id, data) VALUES (?, ?)',
+                ((key, json.dumps(value)) for key, value in data.items())
+            )
+
+    def load(self, path: str) -> dict:
+        connection, table = self._open(path)
+        rows = connection.execute(f'SELECT id, data FROM "{table}"')
+        return {key: json.loads(value) for key, value in rows}
+
+    def exists(self, path: str) -> bool:
+        if not os.path.exists(self._database_path(path)):
+            return False
+        connection, table = self._open(path)
+        row = connection.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone()
+        return row is not None
+
+    def save_changes(self, changes: Dict[str, Optional[dict]], path: str) -> None:
+        """Apply all changes in a single transaction."""
+        connection, table = self._open(path)
+        with connection:
+            for key, value in changes.items():
+                if value is None:
+                    connection.execute(f'DELETE FROM "{table}" WHERE id = ?', (key,))
+                else:
+                    connection.execute(
+                        f'INSERT OR REPLACE INTO "{table}" (id, data) VALUES (?, ?)',
+                        (key, json.dumps(value))
+                    )
+
+    def get(self, key: str, path: str) -> Optional[dict]:
+        connection, table = self._open(path)
+        row = connection.execute(f'SELECT data FROM "{table}" WHERE id = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: dict, path: str) -> None:
+        self.save_changes({key: value}, path)
+
+    def delete(self, key: str, path: str) -> None:
+        self.save_changes({key: None}, path)
+
+    def keys(self, path: str) -> List[str]:
+        connection, table = self._open(path)
+        return [key for (key,) in connection.execute(f'SELECT id FROM "{table}" ORDER BY id')]
+
+    def find(self, field: str, value, path: str) -> Dict[str, dict]:
+        """
+        Return the records whose top-level field equals the value.
+        An index on the field is created the first time it is queried.
+        """
+        self._validate_identifier(field)
+        connection, table = self._open(path)
+        expression = f"json_extract(data, '$.{field}')"
+        with connection:
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table}_{field}_idx" ON "{table}" ({expression})'
+            )
+        rows = connection.execute(f'SELECT id, data FROM "{table}" WHERE {expression} = ?', (value,))
+        return {key: json.loads(data) for key, data in rows}
+
+    def range(self, start: str, end: str, path: str) -> Dict[str, dict]:
+        connection, table = self._open(path)
+        rows = connection.execute(
+            f'SELECT id, data FROM "{table}" WHERE id >= ? AND id < ? ORDER BY id', (start, end)
+        )
+        return {key: json.loads(data) for key, data in rows}
+
+    def close(self) -> None:
+        """Close all open database connections."""
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+        self._tables.clear()
+
+    def _open(self, path: str) -> Tuple[sqlite3.Connection, str]:
+        """Return the connection to the database holding the dataset and its table name."""
+        database_path = self._database_path(path)
+        table = os.path.basename(path)
+        self._validate_identifier(table)
+
+        connection = self._connections.get(database_path)
+        if connection is None:
+            # The connection may be used by the background writer thread of StorageService
+            connection = sqlite3.connect(database_path, check_same_thread=False)
+            self._connections[database_path] = connection
+        if (database_path, table) not in self._tables:
+            with connection:
+                connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+            self._tables.add((database_path, table))
+        return connection, table
+
+    def _database_path(self, path: str) -> str:
+        return os.path.join(os.path.dirname(path), self.DATABASE_NAME)
+
+    def _validate_identifier(self, name: str) -> None:
+        if not self.IDENTIFIER_PATTERN.match(name):
+            raise ValueError(f"Invalid SQLite identifier: {name}")
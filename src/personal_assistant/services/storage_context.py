@@ -0,0 +1,81 @@
+"""
+This module contains the StorageContext class which owns the storage
+of the application: one configured storage engine shared by the address book
+and the notebook, and the single point where their changes are flushed.
+"""
+from typing import Tuple
+from personal_assistant.services.address_book import AddressBook
+from personal_assistant.services.notebook import Notebook
+from personal_assistant.services.storage.factory import create_storage
+from personal_assistant.services.storage_service import StorageService
+
+class StorageContext:
+    """
+    Application-wide storage context (singleton).
+
+    The storage engine is created on first use and shared, together with its cipher,
+    open files and background writer, by the address book and the notebook.
+    Their data is loaded when it is first accessed.
+    """
+    _instance: 'StorageContext' = None
+
+    def __new__(cls) -> 'StorageContext': # check for Singleton
+        if cls._instance is None:
+            cls._instance = super(StorageContext, cls).__new__(cls)
+            cls._instance._storage_service = None
+            cls._instance._address_book = None
+            cls._instance._notebook = None
+        return cls._instance
+
+    @property
+    def storage_service(self) -> StorageService:
+        """The storage service of the configured engine."""
+        if self._storage_service is None:
+            self._storage_service = StorageService(create_storage())
+        return self._storage_service
+
+    @property
+    def address_book(self) -> AddressBook:
+        """The address book, its contacts are loaded on first access."""
+        if self._address_book is None:
+            self._address_book = AddressBook(self.storage_service)
+        return self._address_book
+
+    @property
+    def notebook(self) -> Notebook:
+        """The notebook, its notes are loaded on first access."""
+        if self._notebook is None:
+            self._notebook = Notebook(self.storage_service)
+        return self._notebook
+
+    def flush(self) -> Tuple[int, int]:
+        """
+        Write the pending changes of the address book and the notebook.
+        Returns the number of written contacts and notes.
+        """
+        contacts_saved = self._address_book.flush() if self._address_book else 0
+        notes_saved = self._notebook.flush() if self._notebook else 0
+        return contacts_saved, notes_saved
+
+    def collect_garbage(self) -> int:
+        """
+        Write the pending changes and remove the stored texts that no contact or note references.
+        Returns the number of removed blobs.
+        """
+        self.flush()
+        return self.storage_service.collect_garbage(["contacts_data", "notes_data"])
+
+    def close(self) -> Tuple[int, int]:
+        """
+        Write the pending changes, wait until they are stored and release the storage resources.
+        Returns the number of written contacts and notes.
+        """
+        if self._storage_service is None:
+            return 0, 0
+        try:
+            return self.flush()
+        finally:
+            self._storage_service.close()
+            close_strategy = getattr(self._storage_service.strategy, 'close', None)
+            if close_strategy:
+                close_strategy()
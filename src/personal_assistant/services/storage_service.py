@@ -1,36 +1,276 @@
 """
-This module contains the StorageService class which is responsible 
+This module contains the StorageService class which is responsible
 for managing data storage using different storage strategies.
 """
+import atexit
 import os
-from personal_assistant.services.storage.base_storage import Storage
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from personal_assistant.services.storage.base_storage import RecordStorage, Storage
+from personal_assistant.services.storage.blob_store import BlobStore
+from personal_assistant.services.storage.parallel_load import iter_load_parallel
 
 class StorageService:
-    """Service class to manage data storage using different storage strategies."""
+    """
+    Service class to manage data storage using different storage strategies.
 
-    def __init__(self, strategy: Storage, base_directory: str = ".data") -> None:
+    In asynchronous mode saves are queued and performed by a background writer thread,
+    so callers return as soon as the data is handed over. Reads wait for the queued
+    writes first, and flush() / close() act as barriers. The error of a failed save is
+    raised by the next call that writes or reads, after the on_failure callback of the save.
+
+    With more than one load worker, strategies that store the data in chunks
+    load them in parallel.
+
+    With the blob store enabled, the long texts of the records are stored once
+    in a content-addressed dataset and the records keep references to them.
+    """
+    BLOBS_PATH = "blobs_data"
+
+    def __init__(
+            self,
+            strategy: Storage,
+            base_directory: str = ".data",
+            asynchronous: Optional[bool] = None,
+            load_workers: Optional[int] = None,
+            load_executor: Optional[str] = None,
+            blobs: Optional[bool] = None
+        ) -> None:
         self.strategy = strategy
         self.base_directory = base_directory
         # Ensure the base directory exists
         os.makedirs(self.base_directory, exist_ok=True)
 
+        load_dotenv()
+        if asynchronous is None:
+            asynchronous = os.getenv('STORAGE_ASYNC', 'false').lower() in ('1', 'true', 'yes')
+        self.load_workers: int = load_workers or int(os.getenv('LOAD_WORKERS', '1'))
+        self.load_executor: str = load_executor or os.getenv('LOAD_EXECUTOR', 'process')
+        if blobs is None:
+            blobs = os.getenv('STORAGE_BLOBS', 'false').lower() in ('1', 'true', 'yes')
+        self.blobs: bool = blobs
+        self.trusted: bool = os.getenv('TRUSTED_LOAD', 'true').lower() in ('1', 'true', 'yes')
+        self.blob_store: Optional[BlobStore] = self._create_blob_store()
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._write_error: Optional[Exception] = None
+        # The callbacks of the failed background saves, called on the caller's thread
+        self._write_failures: List[Callable[[], None]] = []
+        if asynchronous:
+            self._start_writer()
+
+    @property
+    def asynchronous(self) -> bool:
+        """Whether saves are performed by the background writer thread."""
+        return self._writer is not None
+
     def set_strategy(self, strategy: Storage) -> None:
         """Set the storage strategy to be used."""
+        self.flush()
         self.strategy = strategy
+        self.blob_store = self._create_blob_store()
 
-    def save_data(self, data: dict, path: str) -> None:
-        """Save data using the configured storage strategy."""
+    def save_data(self, data: dict, path: str, on_failure: Optional[Callable[[], None]] = None) -> None:
+        """
+        Save data using the configured storage strategy.
+        on_failure is called if the save fails in the background, before its error is raised.
+        """
         full_path = self._get_full_path(path)
-        self.strategy.save(data, full_path)
+        self._write(self.strategy.save, self._externalize(data), full_path, on_failure=on_failure)
+
+    @property
+    def parallel_load(self) -> bool:
+        """Whether the data is loaded by several workers."""
+        return self.load_workers > 1 and self.strategy.chunked
 
     def load_data(self, path: str) -> dict:
         """Load data using the configured storage strategy."""
+        if self.parallel_load:
+            return dict(self.iter_data(path))
+
+        self.flush()
         full_path = self._get_full_path(path)
 
-        if not os.path.exists(full_path):
+        if not self.strategy.exists(full_path):
             return {}
 
-        return self.strategy.load(full_path)
+        data = self.strategy.load(full_path)
+        if self.blob_store is None:
+            return data
+        return {key: self.blob_store.resolve(value) for key, value in data.items()}
+
+    def iter_data(self, path: str) -> Iterator[Tuple[str, Any]]:
+        """Load the records one at a time using the configured storage strategy."""
+        self.flush()
+        full_path = self._get_full_path(path)
+
+        if not self.strategy.exists(full_path):
+            return iter(())
+
+        if self.parallel_load:
+            records = iter_load_parallel(self.strategy, full_path, self.load_workers, self.load_executor)
+        else:
+            records = self.strategy.iter_load(full_path)
+        if self.blob_store is None:
+            return records
+        return ((key, self.blob_store.resolve(value)) for key, value in records)
+
+    @property
+    def trusted_load(self) -> bool:
+        """
+        Whether the loaded records can be hydrated without validation:
+        the strategy detects any change of the stored data, and TRUSTED_LOAD is not disabled.
+        """
+        return self.trusted and self.strategy.verified
+
+    @property
+    def supports_changes(self) -> bool:
+        """Whether the configured strategy can persist single record changes."""
+        return self.strategy.incremental
+
+    def save_changes(self, changes: dict, path: str, on_failure: Optional[Callable[[], None]] = None) -> None:
+        """
+        Save only the changed records using the configured storage strategy.
+        on_failure is called if the save fails in the background, before its error is raised.
+        """
+        full_path = self._get_full_path(path)
+        self._write(self.strategy.save_changes, self._externalize(changes), full_path, on_failure=on_failure)
+
+    @property
+    def supports_records(self) -> bool:
+        """Whether the configured strategy can read and write single records."""
+        return isinstance(self.strategy, RecordStorage)
+
+    def get_record(self, key: str, path: str) -> Optional[dict]:
+        """Load a single record using the configured storage strategy."""
+        self.flush()
+        record = self.strategy.get(key, self._get_full_path(path))
+        if self.blob_store is None or record is None:
+            return record
+        return self.blob_store.resolve(record)
+
+    def record_keys(self, path: str) -> List[str]:
+        """Return the keys of all records stored under the path."""
+        self.flush()
+        return self.strategy.keys(self._get_full_path(path))
+
+    def find_records(self, field: str, value, path: str) -> Dict[str, dict]:
+        """Load the records whose field equals the value using the strategy's index."""
+        self.flush()
+        records = self.strategy.find(field, value, self._get_full_path(path))
+        if self.blob_store is None:
+            return records
+        return {key: self.blob_store.resolve(record) for key, record in records.items()}
+
+    @property
+    def supports_resharding(self) -> bool:
+        """Whether the configured strategy can repartition its data into a different number of files."""
+        return hasattr(self.strategy, 'reshard')
+
+    def reshard(self, path: str, shards: int) -> None:
+        """Repartition the data stored under the path into the given number of shards."""
+        if not self.supports_resharding:
+            raise ValueError(f"{type(self.strategy).__name__} doesn't support resharding")
+        self.flush()
+        self.strategy.reshard(self._get_full_path(path), shards)
+
+    def collect_garbage(self, paths: List[str]) -> int:
+        """
+        Remove the blobs that are not referenced by the records stored under the paths.
+        The paths must cover every dataset of the storage. Returns the number of removed blobs.
+        """
+        if self.blob_store is None:
+            return 0
+        self.flush()
+        referenced = set()
+        for path in paths:
+            full_path = self._get_full_path(path)
+            if self.strategy.exists(full_path):
+                for _, record in self.strategy.iter_load(full_path):
+                    referenced.update(BlobStore.references(record))
+        return self.blob_store.collect_garbage(referenced)
+
+    def flush(self) -> None:
+        """Wait until all queued saves are written. Raises the error of a failed background save."""
+        if self._queue is not None:
+            self._queue.join()
+        self._raise_write_error()
+
+    def close(self) -> None:
+        """Write all queued saves and stop the background writer thread."""
+        if self._writer is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+
+    def _start_writer(self) -> None:
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="storage-writer", daemon=True)
+        self._writer.start()
+        # The writer is a daemon thread, make sure queued saves are not lost on exit
+        atexit.register(self.close)
+
+    def _write_loop(self) -> None:
+        """Perform the queued saves one by one until the stop marker (None) is received."""
+        while True:
+            task = self._queue.get()
+            if task is None:
+                self._queue.task_done()
+                return
+            write, args, on_failure = task
+            try:
+                write(*args)
+            except Exception as e:
+                # The callback is queued first, so it is there when the error is seen
+                if on_failure is not None:
+                    self._write_failures.append(on_failure)
+                self._write_error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, write: Callable[..., None], *args, on_failure: Optional[Callable[[], None]] = None) -> None:
+        """
+        Perform the save right away, or queue it for the background writer.
+        A save performed right away raises its error itself, without calling on_failure.
+        """
+        self._raise_write_error()
+        if self._writer is None:
+            write(*args)
+        else:
+            self._queue.put((write, args, on_failure))
+
+    def _raise_write_error(self) -> None:
+        if self._write_error is not None:
+            error, self._write_error = self._write_error, None
+            failures, self._write_failures = self._write_failures, []
+            for on_failure in failures:
+                on_failure()
+            raise IOError(f"Failed to save data in the background: {error}") from error
+
+    def _create_blob_store(self) -> Optional[BlobStore]:
+        """Create the blob store if it is enabled or there are stored blobs to read."""
+        blobs_path = self._get_full_path(self.BLOBS_PATH)
+        if not self.blobs and not self.strategy.exists(blobs_path):
+            return None
+        return BlobStore(self.strategy, blobs_path, int(os.getenv('BLOB_MIN_SIZE', '64')))
+
+    def _externalize(self, records: Dict[str, Optional[dict]]) -> Dict[str, Optional[dict]]:
+        """
+        Replace the long texts of the records with blob references, queueing
+        the write of the new blobs before the write of the records.
+        """
+        if not self.blobs:
+            return records
+        records = {key: self.blob_store.externalize(value) for key, value in records.items()}
+        self._write(self.blob_store.write, self.blob_store.take_pending())
+        return records
 
     def _get_full_path(self, path: str) -> str:
         """Constructs and returns a full path ensuring it's within the base directory."""
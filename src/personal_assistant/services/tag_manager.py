@@ -1,49 +1,271 @@
-from typing import Dict, List
-from collections import defaultdict
+"""
+A module that contains the TagManagerService class, the index of the tags of contacts and notes.
+
+The ids of the tagged objects are mapped to dense numbers, in the order they are first tagged,
+and every tag keeps the numbers of its objects of each type in a compressed bitmap, see
+utils.bitmap. The index of every object type is saved alongside the objects, as records of
+"tag:<normalized name>" -> the name and the base64 bitmap, and of "ids:<chunk>" -> a chunk of
+the ids in the order of their numbers, and loaded directly instead of being rebuilt from the
+tags of every object. Numbers are never reused, so a saved bitmap never refers to another object.
+
+The names are keyed in the form search compares them in, which depends on SEARCH_TRANSLITERATE,
+so the index is saved with a "mode" record of the normalization; an index saved in another mode
+is rebuilt from the tags of the objects and saved anew, without its keys.
+
+The index is saved after the objects, so an index that changed with them is first marked with
+a "pending" record, which its own save removes. An index loaded with the mark was left behind
+its objects by an interrupted save, and is rebuilt the same way.
+"""
+from typing import Dict, Iterable, Optional, Set
 from personal_assistant.enums.entity_type import EntityType
 from personal_assistant.models.tag import Tag
+from personal_assistant.utils.bitmap import Bitmap
+from personal_assistant.utils.normalization import normalize, transliteration_enabled
+
+TAG_PREFIX = 'tag:'
+IDS_PREFIX = 'ids:'
+MODE_KEY = 'mode'
+PENDING_KEY = 'pending'
+# The number of ids in every saved chunk of the ids of an object type
+IDS_CHUNK_BITS = 12
 
 class TagManagerService:
     """
     A class that represents a tag manager service, which is responsible for managing tags.
+    Tags are keyed by their normalized names, so tags that differ only in case or spelling variants are one tag.
     """
     _instance: 'TagManagerService' = None
 
     def __new__(cls) -> 'TagManagerService': # check for Singleton
         if cls._instance is None:
             cls._instance = super(TagManagerService, cls).__new__(cls)
-            cls._instance.tags = defaultdict(Tag)
+            cls._instance.tags = {}
+            # The ids of every object type by their numbers, and the numbers by the ids
+            cls._instance.ids = {obj_type: [] for obj_type in EntityType}
+            cls._instance.numbers = {obj_type: {} for obj_type in EntityType}
+            # The tags and the chunks of ids of every object type changed since the last save
+            cls._instance.dirty_tags = {obj_type: set() for obj_type in EntityType}
+            cls._instance.dirty_chunks = {obj_type: set() for obj_type in EntityType}
+            # The storage service the index of every object type was loaded from
+            cls._instance.sources = {}
+            # The object types whose saved index has to be rewritten as a whole
+            cls._instance.rewrite = set()
+            # The object types whose saved index is marked as pending
+            cls._instance.pending = set()
         return cls._instance
 
     def add_tag(self, tag_name: str, obj_type: EntityType, obj_id: str) -> None:
         """
         Adds tag and associates it with an object.
         """
-        if tag_name not in self.tags:
-            self.tags[tag_name] = Tag(name=tag_name)
-        tag = self.tags[tag_name]
-        tag.associate_with(obj_type, obj_id)
+        key = normalize(tag_name)
+        if key not in self.tags:
+            self.tags[key] = Tag(name=tag_name)
+        tag = self.tags[key]
+        number = self._number(obj_type, obj_id)
+        if not tag.is_associated_with(obj_type, number):
+            tag.associate_with(obj_type, number)
+            self.dirty_tags[obj_type].add(key)
 
     def remove_tag(self, tag_name: str, obj_type: EntityType, obj_id: str) -> None:
         """
         Removes tag and dissociates it from an object.
         """
-        if tag_name in self.tags:
-            tag = self.tags[tag_name]
-            tag.dissociate_from(obj_type, obj_id)
-            if not tag.associations:
-                del self.tags[tag_name]
+        key = normalize(tag_name)
+        number = self.numbers[obj_type].get(obj_id)
+        if key in self.tags and number is not None:
+            tag = self.tags[key]
+            if tag.is_associated_with(obj_type, number):
+                tag.dissociate_from(obj_type, number)
+                self.dirty_tags[obj_type].add(key)
+            if tag.is_empty():
+                del self.tags[key]
 
-    def search_by_tag(self, tag_name: str) -> List[str]:
+    def search_by_tag(self, tag_name: str) -> Dict[EntityType, Set[str]]:
         """
         Searches for objects associated with a tag.
         """
-        if tag_name in self.tags:
-            return self.tags[tag_name].get_associations()
+        key = normalize(tag_name)
+        if key in self.tags:
+            return {
+                obj_type: self._ids(obj_type, numbers)
+                for obj_type, numbers in self.tags[key].get_associations().items()
+            }
         return {}
 
+    def search_by_tags(self, tag_names: Iterable[str], obj_type: EntityType, match_all: bool = True) -> Set[str]:
+        """
+        Searches for objects of a type associated with all the tags, or with any of them.
+        The bitmaps of the tags are intersected or joined before any id is looked up.
+        """
+        result: Optional[Bitmap] = None
+        for tag_name in tag_names:
+            tag = self.tags.get(normalize(tag_name))
+            numbers = tag.associations[obj_type] if tag is not None else Bitmap()
+            if result is None:
+                result = numbers
+            else:
+                result = result & numbers if match_all else result | numbers
+            if match_all and not result:
+                break
+        return self._ids(obj_type, result or Bitmap())
+
+    def load(self, storage_service, obj_type: EntityType, path: str) -> bool:
+        """
+        Load the index of an object type from the storage service, unless it is already loaded from it.
+        The tags registered before the load are kept. Returns whether the index is stored and up to date;
+        if not, it has to be rebuilt from the tags of the objects.
+        """
+        if self.sources.get(obj_type) is storage_service:
+            return True
+        # Tags registered before the first load are objects created in this session
+        registered = [] if obj_type in self.sources else [
+            (tag.name, self._ids(obj_type, tag.associations[obj_type])) for tag in self.tags.values()
+        ]
+        self._reset(obj_type)
+
+        data = storage_service.load_data(path)
+        if data.get(MODE_KEY) != self._mode() or PENDING_KEY in data:
+            # Not saved yet, keyed in another normalization mode or older than the objects: the stored keys are left out
+            data = {}
+            self.rewrite.add(obj_type)
+        ids = self.ids[obj_type]
+        chunks = sorted(int(key[len(IDS_PREFIX):]) for key in data if key.startswith(IDS_PREFIX))
+        for chunk in chunks:
+            ids.extend(data[IDS_PREFIX + str(chunk)]["ids"])
+        self.numbers[obj_type] = {obj_id: number for number, obj_id in enumerate(ids)}
+        for key, tag_dict in data.items():
+            if key.startswith(TAG_PREFIX):
+                key = key[len(TAG_PREFIX):]
+                if key not in self.tags:
+                    self.tags[key] = Tag(name=tag_dict["name"])
+                self.tags[key].update_from_dict(obj_type, tag_dict)
+
+        if not data:
+            # The index is written as a whole with the next save, even if no object is tagged
+            self.dirty_chunks[obj_type].add(0)
+        for tag_name, obj_ids in registered:
+            for obj_id in obj_ids:
+                self.add_tag(tag_name, obj_type, obj_id)
+        self.sources[obj_type] = storage_service
+        return bool(data)
+
+    def begin_save(self, storage_service, obj_type: EntityType, path: str) -> None:
+        """
+        Mark the saved index of an object type as pending before the objects are saved,
+        if it changed since the last save. save() removes the mark.
+        """
+        if not self.dirty_tags[obj_type] and not self.dirty_chunks[obj_type]:
+            return
+        if storage_service.supports_changes:
+            storage_service.save_changes({PENDING_KEY: {"pending": True}}, path)
+        else:
+            storage_service.save_data({**self._index_records(obj_type), PENDING_KEY: {"pending": True}}, path)
+        self.pending.add(obj_type)
+
+    def save(self, storage_service, obj_type: EntityType, path: str) -> int:
+        """
+        Save the index of an object type to the storage service if it changed.
+        Storage strategies that support incremental saves receive only the changed tags and chunks of ids.
+        If the save fails in the background, the index is written as a whole with the next save.
+        Returns the number of written records.
+        """
+        dirty_tags, dirty_chunks = self.dirty_tags[obj_type], self.dirty_chunks[obj_type]
+        if not dirty_tags and not dirty_chunks:
+            return 0
+
+        def rewrite() -> None:
+            # The saved index misses the changes of a save failed in the background
+            self.rewrite.add(obj_type)
+            self.dirty_chunks[obj_type].add(0)
+
+        if storage_service.supports_changes and obj_type not in self.rewrite:
+            changes = {
+                TAG_PREFIX + key: self._tag_record(key, obj_type) for key in dirty_tags
+            }
+            changes.update((IDS_PREFIX + str(chunk), self._ids_record(obj_type, chunk)) for chunk in dirty_chunks)
+            if obj_type in self.pending:
+                changes[PENDING_KEY] = None
+            storage_service.save_changes(changes, path, on_failure=rewrite)
+        else:
+            changes = self._index_records(obj_type)
+            storage_service.save_data(changes, path, on_failure=rewrite)
+            self.rewrite.discard(obj_type)
+
+        self.pending.discard(obj_type)
+        dirty_tags.clear()
+        dirty_chunks.clear()
+        return len(changes)
+
+    def clear(self, obj_type: EntityType) -> None:
+        """
+        Forget the index of an object type, so the next load reads it from the storage again.
+        """
+        self.sources.pop(obj_type, None)
+        self._reset(obj_type)
+
+    def _index_records(self, obj_type: EntityType) -> dict:
+        """
+        Return all the records of the saved index of an object type
+        """
+        records = {
+            TAG_PREFIX + key: tag.to_dict(obj_type) for key, tag in self.tags.items() if tag.associations[obj_type]
+        }
+        # The first chunk is written even if empty, so the saved index is found by the next load
+        chunks = (len(self.ids[obj_type]) >> IDS_CHUNK_BITS) + 1
+        records.update((IDS_PREFIX + str(chunk), self._ids_record(obj_type, chunk)) for chunk in range(chunks))
+        records[MODE_KEY] = self._mode()
+        return records
+
+    def _number(self, obj_type: EntityType, obj_id: str) -> int:
+        """
+        Return the number of an object, numbering it if it has none
+        """
+        numbers = self.numbers[obj_type]
+        number = numbers.get(obj_id)
+        if number is None:
+            number = numbers[obj_id] = len(self.ids[obj_type])
+            self.ids[obj_type].append(obj_id)
+            self.dirty_chunks[obj_type].add(number >> IDS_CHUNK_BITS)
+        return number
+
+    @staticmethod
+    def _mode() -> dict:
+        """
+        Return the normalization mode of the keys of the tags
+        """
+        return {"transliterate": transliteration_enabled()}
+
+    def _ids(self, obj_type: EntityType, numbers: Bitmap) -> Set[str]:
+        ids = self.ids[obj_type]
+        return {ids[number] for number in numbers}
+
+    def _tag_record(self, key: str, obj_type: EntityType) -> Optional[dict]:
+        """
+        Return the saved record of a tag, or None if the tag has no objects of the type
+        """
+        tag = self.tags.get(key)
+        return tag.to_dict(obj_type) if tag is not None and tag.associations[obj_type] else None
+
+    def _ids_record(self, obj_type: EntityType, chunk: int) -> dict:
+        start = chunk << IDS_CHUNK_BITS
+        return {"ids": self.ids[obj_type][start:start + (1 << IDS_CHUNK_BITS)]}
+
+    def _reset(self, obj_type: EntityType) -> None:
+        """
+        Forget the index of an object type
+        """
+        for key, tag in list(self.tags.items()):
+            tag.associations[obj_type] = Bitmap()
+            if tag.is_empty():
+                del self.tags[key]
+        self.ids[obj_type] = []
+        self.numbers[obj_type] = {}
+        self.dirty_tags[obj_type].clear()
+        self.dirty_chunks[obj_type].clear()
+
     def __str__(self) -> str:
-        return f"TagManagerService(tags={dict(self.tags)})"
+        return f"TagManagerService(tags={self.tags})"
 
     def __repr__(self) -> str:
         return self.__str__()
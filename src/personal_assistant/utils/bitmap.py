@@ -0,0 +1,230 @@
+"""
+This module contains the Bitmap class, a compressed set of small non-negative integers
+(the dense numbers of records) in the style of Roaring bitmaps.
+
+The numbers are split by their high 16 bits into containers of 65536 numbers. A container
+with few numbers is a sorted array of their low 16 bits, 2 bytes per number; a container
+with more than ARRAY_LIMIT numbers is a bitmap of 65536 bits held in a Python int, 8 KB
+whatever the count. Intersections, unions and differences are computed container by
+container: bitwise operators for two bitmaps, and array or set operations otherwise.
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, Union
+
+CONTAINER_BITS = 16
+LOW_MASK = (1 << CONTAINER_BITS) - 1
+# Above this count a bitmap container is smaller than an array container
+ARRAY_LIMIT = 4096
+BITMAP_BYTES = (1 << CONTAINER_BITS) // 8
+
+HEADER = struct.Struct('<I')
+CONTAINER_HEADER = struct.Struct('<HBH')
+ARRAY_KIND = 0
+BITMAP_KIND = 1
+
+Container = Union[array, int]
+
+def _bits_to_array(bits: int) -> array:
+    """
+    Return the positions of the set bits, in ascending order
+    """
+    low = array('H')
+    words = array('Q', bits.to_bytes(BITMAP_BYTES, 'little'))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    # Only the words with set bits are looked into, and only their set bits
+    for position, word in enumerate(words):
+        base = position * 64
+        while word:
+            lowest = word & -word
+            low.append(base + lowest.bit_length() - 1)
+            word ^= lowest
+    return low
+
+def _array_to_bits(low: Iterable[int]) -> int:
+    bits = bytearray(BITMAP_BYTES)
+    for value in low:
+        bits[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(bits, 'little')
+
+def _size(container: Container) -> int:
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+def _compact(container: Container) -> Container:
+    """
+    Return the container in its smaller form, or an empty array if it has no numbers
+    """
+    if isinstance(container, int):
+        return _bits_to_array(container) if container.bit_count() <= ARRAY_LIMIT else container
+    return _array_to_bits(container) if len(container) > ARRAY_LIMIT else container
+
+class Bitmap:
+    """
+    Compressed set of integers from 0 to 2^32 - 1: high 16 bits -> array or bitmap container.
+    """
+    __slots__ = ('_containers',)
+
+    def __init__(self, numbers: Iterable[int] = ()) -> None:
+        self._containers: Dict[int, Container] = {}
+        for number in numbers:
+            self.add(number)
+
+    def add(self, number: int) -> None:
+        """
+        Add a number to the set
+        """
+        high, low = number >> CONTAINER_BITS, number & LOW_MASK
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = array('H', (low,))
+        elif isinstance(container, int):
+            self._containers[high] = container | 1 << low
+        else:
+            position = bisect_left(container, low)
+            if position == len(container) or container[position] != low:
+                container.insert(position, low)
+                if len(container) > ARRAY_LIMIT:
+                    self._containers[high] = _array_to_bits(container)
+
+    def discard(self, number: int) -> None:
+        """
+        Remove a number from the set if it is present
+        """
+        high, low = number >> CONTAINER_BITS, number & LOW_MASK
+        container = self._containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = _compact(container & ~(1 << low))
+        else:
+            position = bisect_left(container, low)
+            if position < len(container) and container[position] == low:
+                del container[position]
+        if _size(container):
+            self._containers[high] = container
+        else:
+            del self._containers[high]
+
+    def __contains__(self, number: int) -> bool:
+        container = self._containers.get(number >> CONTAINER_BITS)
+        if container is None:
+            return False
+        low = number & LOW_MASK
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        position = bisect_left(container, low)
+        return position < len(container) and container[position] == low
+
+    def __len__(self) -> int:
+        return sum(_size(container) for container in self._containers.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._containers)
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            if isinstance(container, int):
+                container = _bits_to_array(container)
+            base = high << CONTAINER_BITS
+            for low in container:
+                yield base | low
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Bitmap) and list(self) == list(other)
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        result = Bitmap()
+        for high in self._containers.keys() & other._containers.keys():
+            first, second = self._containers[high], other._containers[high]
+            if isinstance(first, int) and isinstance(second, int):
+                container = _compact(first & second)
+            elif isinstance(first, int) or isinstance(second, int):
+                bits, low = (first, second) if isinstance(first, int) else (second, first)
+                bits = bits.to_bytes(BITMAP_BYTES, 'little')
+                container = array('H', (value for value in low if bits[value >> 3] >> (value & 7) & 1))
+            else:
+                container = array('H', sorted(set(first).intersection(second)))
+            if _size(container):
+                result._containers[high] = container
+        return result
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        result = Bitmap()
+        for high in self._containers.keys() | other._containers.keys():
+            first, second = self._containers.get(high), other._containers.get(high)
+            if first is None or second is None:
+                container = first if second is None else second
+                result._containers[high] = container if isinstance(container, int) else array('H', container)
+            elif isinstance(first, int) or isinstance(second, int):
+                bits = first if isinstance(first, int) else _array_to_bits(first)
+                bits |= second if isinstance(second, int) else _array_to_bits(second)
+                result._containers[high] = bits
+            else:
+                result._containers[high] = _compact(array('H', sorted(set(first).union(second))))
+        return result
+
+    def __sub__(self, other: 'Bitmap') -> 'Bitmap':
+        result = Bitmap()
+        for high, first in self._containers.items():
+            second = other._containers.get(high)
+            if second is None:
+                container = first if isinstance(first, int) else array('H', first)
+            elif isinstance(first, int):
+                container = _compact(first & ~(second if isinstance(second, int) else _array_to_bits(second)))
+            elif isinstance(second, int):
+                bits = second.to_bytes(BITMAP_BYTES, 'little')
+                container = array('H', (value for value in first if not bits[value >> 3] >> (value & 7) & 1))
+            else:
+                removed = set(second)
+                container = array('H', (value for value in first if value not in removed))
+            if _size(container):
+                result._containers[high] = container
+        return result
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the set: the number of containers, then every container with its key,
+        kind and count, followed by its 16-bit numbers or its bits
+        """
+        parts = [HEADER.pack(len(self._containers))]
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            if isinstance(container, int):
+                parts.append(CONTAINER_HEADER.pack(high, BITMAP_KIND, 0))
+                parts.append(container.to_bytes(BITMAP_BYTES, 'little'))
+            else:
+                parts.append(CONTAINER_HEADER.pack(high, ARRAY_KIND, len(container)))
+                low = array('H', container)
+                if sys.byteorder == 'big':
+                    low.byteswap()
+                parts.append(low.tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Bitmap':
+        """
+        Deserialize a set written by to_bytes
+        """
+        bitmap = cls()
+        (count,), position = HEADER.unpack_from(data), HEADER.size
+        for _ in range(count):
+            high, kind, size = CONTAINER_HEADER.unpack_from(data, position)
+            position += CONTAINER_HEADER.size
+            if kind == BITMAP_KIND:
+                bitmap._containers[high] = int.from_bytes(data[position:position + BITMAP_BYTES], 'little')
+                position += BITMAP_BYTES
+            else:
+                low = array('H')
+                low.frombytes(data[position:position + 2 * size])
+                if sys.byteorder == 'big':
+                    low.byteswap()
+                bitmap._containers[high] = low
+                position += 2 * size
+        return bitmap
+
+    def __repr__(self) -> str:
+        return f"Bitmap({list(self)!r})"
@@ -13,7 +13,9 @@ from colorama import init, Fore, Back
 from pyfiglet import Figlet
 from personal_assistant.commands.contact_commands import handle_contact_commands
 from personal_assistant.commands.note_commands import handle_note_commands
+from personal_assistant.commands.storage_commands import handle_storage_commands
 from personal_assistant.enums.military_command_types import Entity
+from personal_assistant.services import StorageContext
 
 init(autoreset=True)
 load_dotenv()
@@ -22,6 +24,7 @@ module_path = f'personal_assistant.enums.{commands_parser}'
 command_module = importlib.import_module(module_path)
 
 Entity = command_module.Entity
+Messages = command_module.Messages
 
 def setup_parsers() -> Tuple[argparse.ArgumentParser, Dict[str, argparse.ArgumentParser]]:
     """
@@ -44,6 +47,11 @@ def setup_parsers() -> Tuple[argparse.ArgumentParser, Dict[str, argparse.Argumen
     handle_note_commands(note_parser)
     parsers[Entity.NOTE.value] = note_parser
 
+    # Storage maintenance parser
+    storage_parser = subparsers.add_parser(Entity.STORAGE.value, description='Обслуговування сховища даних')
+    handle_storage_commands(storage_parser)
+    parsers[Entity.STORAGE.value] = storage_parser
+
     return parser, parsers
 
 def handle_command(args: argparse.Namespace) -> None:
@@ -56,6 +64,15 @@ def handle_command(args: argparse.Namespace) -> None:
         # Handle unknown command or show help
         print("Unknown command. Use 'help' to see available commands.")
 
+def flush_data() -> None:
+    """
+    Write all pending changes of the address book and the notebook
+    and wait until the background writer has stored them.
+    """
+    contacts_saved, notes_saved = StorageContext().close()
+    if contacts_saved or notes_saved:
+        print(Messages.DATA_SAVED.value.format(contacts_saved, notes_saved))
+
 def get_terminal_size() -> Tuple[int, int]:
     """
     Get the terminal size.
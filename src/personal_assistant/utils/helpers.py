@@ -3,7 +3,8 @@ Helper functions for the Personal Assistant.
 """
 
 import argparse
-from typing import Dict
+from datetime import datetime
+from typing import Dict, Union
 
 def get_commands(parsers: Dict[str, argparse.ArgumentParser]) -> list[str]:
     """
@@ -36,3 +37,12 @@ def to_comma_separated_string(items):
         return ""
 
     return ", ".join(str(item) for item in items)
+
+def to_datetime(value: Union[str, datetime]) -> datetime:
+    """
+    Return the value as a datetime, parsing it if it's an ISO formatted string.
+    """
+    if isinstance(value, datetime):
+        return value
+
+    return datetime.fromisoformat(value)
@@ -0,0 +1,91 @@
+"""
+Text normalization for search.
+
+Texts and queries go through the same pipeline, so they compare as equal regardless of
+case, Unicode composition, the apostrophe character and the letters that Ukrainian users
+swap when typing: Unicode NFKC, casefolding, one apostrophe, ґ/г, є/е and ї/і folded,
+and, optionally, Cyrillic transliterated to Latin (SEARCH_TRANSLITERATE). Ranked search
+also cuts the inflection endings of Ukrainian words with a light suffix stemmer.
+
+The models cache their normalized texts, so they are normalized once per change.
+"""
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional
+from dotenv import load_dotenv
+
+APOSTROPHES = str.maketrans({'’': "'", 'ʼ': "'", '‘': "'", '`': "'", '′': "'"})
+FOLDED_LETTERS = str.maketrans({'ґ': 'г', 'є': 'е', 'ї': 'і'})
+
+# Ukrainian national transliteration of the folded letters, with the Russian letters that occur in names
+TRANSLITERATION = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z', 'и': 'y',
+    'і': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', 'ы': 'y', 'э': 'e', 'ё': 'e', 'ъ': '',
+})
+
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*")
+CYRILLIC_END = re.compile(r'[а-яёі]$')
+
+# Inflection endings of folded Ukrainian words, the longest are tried first
+SUFFIXES = sorted((
+    # Adjectives and participles
+    'ими', 'ого', 'ому', 'ій', 'ий', 'ою', 'ім', 'их', 'ая',
+    # Nouns
+    'ами', 'ями', 'ах', 'ях', 'ам', 'ям', 'ом', 'ем', 'ею', 'ів', 'ей', 'ові', 'еві',
+    'а', 'я', 'о', 'е', 'и', 'і', 'у', 'ю', 'ь',
+    # Verbs, with є folded to е; the shorter endings of verbs are the endings of nouns too
+    'ювати', 'увати', 'юемо', 'уемо', 'ити', 'ати', 'яти', 'іти', 'ути', 'тися', 'ться',
+    'емо', 'ете', 'ють', 'ять', 'уть', 'ать', 'ить',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+@lru_cache(maxsize=None)
+def transliteration_enabled() -> bool:
+    """
+    Whether search compares texts transliterated to Latin (SEARCH_TRANSLITERATE)
+    """
+    load_dotenv()
+    return os.getenv('SEARCH_TRANSLITERATE', 'false').lower() in ('1', 'true', 'yes')
+
+def transliterate(text: str) -> str:
+    """
+    Return the folded text with its Cyrillic letters replaced by Latin ones
+    """
+    return text.translate(TRANSLITERATION)
+
+def normalize(text: str, to_latin: Optional[bool] = None) -> str:
+    """
+    Return the text in the form it is compared in by search.
+    Cyrillic is transliterated if `to_latin` is set or, by default, if SEARCH_TRANSLITERATE is.
+    """
+    text = unicodedata.normalize('NFKC', text).casefold().translate(APOSTROPHES).translate(FOLDED_LETTERS)
+    if to_latin is None:
+        to_latin = transliteration_enabled()
+    return transliterate(text) if to_latin else text
+
+def stem(word: str) -> str:
+    """
+    Return the word without its inflection ending, if it is a Cyrillic word long enough to have one
+    """
+    if not CYRILLIC_END.search(word):
+        return word
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+def words(text: str, to_latin: Optional[bool] = None) -> List[str]:
+    """
+    Return the normalized words of the text
+    """
+    return WORD_PATTERN.findall(normalize(text, to_latin))
+
+def stemmed_words(text: str) -> List[str]:
+    """
+    Return the normalized and stemmed words of the text, the terms of ranked search
+    """
+    return [stem(word) for word in words(text, to_latin=False)]